@@ -0,0 +1,138 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Nombre de lignes envoyées au navigateur par page de tableau
+LIGNES_PAR_PAGE = 500
+
+# Nombre maximal de fichiers lus simultanément
+NOMBRE_MAX_LECTURES = 8
+
+# Fonction pour afficher un grand tableau page par page (seule la page courante est envoyée au navigateur)
+def afficher_tableau_pagine(tableau, cle, lignes_par_page=LIGNES_PAR_PAGE):
+    nombre_pages = max(math.ceil(len(tableau) / lignes_par_page), 1)
+    page = 1
+    if nombre_pages > 1:
+        page = st.number_input(f'Page (sur {nombre_pages})', min_value=1, max_value=nombre_pages, value=1, step=1, key=cle)
+    debut = (page - 1) * lignes_par_page
+    fin = min(debut + lignes_par_page, len(tableau))
+    st.dataframe(tableau.iloc[debut:fin])
+    st.caption(f"Lignes {debut + 1} à {fin} sur {len(tableau)}")
+
+# Fonction pour afficher la synthèse d'un export trop volumineux pour être chargé (agrégats calculés par blocs)
+def afficher_synthese_par_blocs(nom, agregats):
+    documents = agregats.documents()
+    st.subheader(f"Synthèse de {nom}")
+    st.caption(f"{agregats.lignes} lignes et {len(documents)} documents agrégés par blocs : l'export n'est pas chargé en entier, les onglets détaillés ne l'incluent pas")
+    onglet_lots, onglet_types, onglet_documents = st.tabs(["Calendrier par lot", "Types de documents", "Documents"])
+    with onglet_lots:
+        st.dataframe(agregats.calendrier('LOT'))
+    with onglet_types:
+        types = agregats.calendrier('TYPE DE DOCUMENT').merge(agregats.nombre_indices_par_type('mean'), on='TYPE DE DOCUMENT', how='left')
+        types = types.merge(agregats.durees_par_type()[['TYPE DE DOCUMENT', 'Durée moyenne entre versions']], on='TYPE DE DOCUMENT', how='left')
+        st.dataframe(types)
+    with onglet_documents:
+        afficher_tableau_pagine(documents, cle=f"synthese_{nom}")
+
+# Fonction pour indiquer la mémoire libérée par le compactage des colonnes d'un export
+def afficher_compactage(donnees):
+    description = donnees.attrs.get('compactage')
+    if description is None:
+        return
+    st.sidebar.caption(
+        f"Mémoire libérée au chargement : {description.octets_liberes / 1e6:.1f} Mo "
+        f"({len(description.colonnes_vides)} colonnes vides retirées, {len(description.colonnes_creuses)} colonnes creuses)"
+    )
+
+# Fonction pour afficher dans la barre latérale la mémoire de chaque colonne avant et après optimisation des types
+def afficher_rapport_memoire(donnees):
+    optimisation = donnees.attrs.get('optimisation')
+    if optimisation is None:
+        return
+    avant, apres = optimisation.totaux()
+    with st.sidebar.expander("Mémoire du projet"):
+        st.metric("Mémoire après optimisation", f"{apres / 1e6:.1f} Mo", delta=f"{(apres - avant) / 1e6:.1f} Mo", delta_color='inverse')
+        st.dataframe(optimisation.rapport.sort_values('Octets avant', ascending=False), use_container_width=True)
+
+# Fonction pour afficher dans la barre latérale les succès et échecs du cache des calculs
+def afficher_statistiques_cache(statistiques):
+    if statistiques.empty:
+        return
+    with st.sidebar.expander("Cache des calculs"):
+        col1, col2 = st.columns(2)
+        col1.metric("Succès", int(statistiques['Succès'].sum()))
+        col2.metric("Échecs", int(statistiques['Échecs'].sum()))
+        st.caption(f"Temps de calcul économisé : {statistiques['Temps économisé (s)'].sum():.2f} s")
+        st.dataframe(statistiques, use_container_width=True)
+
+# Fonction pour afficher l'avancement du précalcul des onglets (état, durée et erreur éventuelle de chaque onglet).
+# Rafraîchi périodiquement tant que le précalcul est en cours, l'affichage relance la page dès qu'il est fini
+# (ou annulé) pour arrêter le rafraîchissement
+def afficher_avancement_precalcul(precalcul, rafraichi=False):
+    avancement = precalcul.avancement()
+    erreurs = precalcul.erreurs_par_onglet()
+    termines = sum(etat in ('terminé', 'erreur') for _, etat, _ in avancement)
+    with st.expander("Précalcul des onglets", expanded=not precalcul.termine() or bool(erreurs)):
+        st.progress(precalcul.fraction_terminee(), text=f"{termines}/{len(avancement)} onglets prêts")
+        for onglet, etat, duree in avancement:
+            st.caption(f"{onglet} : {etat}" + (f" ({duree * 1000:.0f} ms)" if duree is not None else ""))
+            # L'onglet reste consultable : son calcul est repris à l'affichage, où l'erreur se reproduit le cas échéant
+            if onglet in erreurs:
+                st.error(erreurs[onglet])
+    if rafraichi and precalcul.termine():
+        st.rerun()
+
+# Fonction pour afficher dans la barre latérale les mesures de l'exécution en cours (durées, lignes, cache et figures)
+def afficher_traces(execution):
+    mesures = execution.tableau()
+    with st.sidebar.expander("Performances de l'exécution"):
+        col1, col2 = st.columns(2)
+        col1.metric("Temps mesuré", f"{time.perf_counter() - execution.debut:.2f} s")
+        col2.metric("Succès du cache", f"{execution.succes_cache}/{execution.succes_cache + execution.echecs_cache}")
+        st.dataframe(mesures, use_container_width=True)
+
+# Fonction pour choisir une plage de dates de dépôt entre le premier et le dernier dépôt du projet (index des dates).
+# Rend les bornes retenues, ou None lorsque toute la période est sélectionnée
+def choisir_plage_dates(index_dates, cle, libelle='Sélectionnez les dates de dépôt'):
+    if pd.isna(index_dates.premier) or index_dates.premier == index_dates.dernier:
+        return None
+    premier, dernier = index_dates.premier.date(), index_dates.dernier.date()
+    debut, fin = st.slider(libelle, min_value=premier, max_value=dernier, value=(premier, dernier), format='DD/MM/YYYY', key=cle)
+    if (debut, fin) == (premier, dernier):
+        return None
+    return pd.Timestamp(debut), pd.Timestamp(fin)
+
+# Fonction pour choisir le nombre de classes d'une segmentation des dates (coude de la courbe d'inertie par défaut)
+def choisir_nombre_classes(segmentation, cle, libelle='Nombre de classes'):
+    coude = segmentation.coude()
+    options = ['Automatique'] + list(range(1, segmentation.nombre_max_classes + 1))
+    choix = st.selectbox(libelle, options, format_func=lambda option: f"Automatique ({coude}, coude de l'inertie)" if option == 'Automatique' else str(option), key=cle)
+    return coude if choix == 'Automatique' else choix
+
+# Fonction pour charger plusieurs fichiers téléchargés en parallèle en affichant l'avancement fichier par fichier
+def charger_fichiers_en_parallele(fichiers, chargeur, nombre_workers=None):
+    if not fichiers:
+        return {}
+    nombre_workers = nombre_workers or min(len(fichiers), os.cpu_count() or 1, NOMBRE_MAX_LECTURES)
+    contexte = get_script_run_ctx()
+
+    # Le contexte Streamlit est transmis aux threads pour que le cache de chargeur reste partagé
+    def charger(fichier):
+        add_script_run_ctx(threading.current_thread(), contexte)
+        return chargeur(fichier)
+
+    progression = st.progress(0.0, text=f"Chargement de {len(fichiers)} fichier(s)...")
+    projets = {}
+    with ThreadPoolExecutor(max_workers=nombre_workers) as executeur:
+        futurs = {executeur.submit(charger, fichier): fichier.name for fichier in fichiers}
+        for termines, futur in enumerate(as_completed(futurs), start=1):
+            projets[futurs[futur]] = futur.result()
+            progression.progress(termines / len(fichiers), text=f"{futurs[futur]} chargé ({termines}/{len(fichiers)})")
+    progression.empty()
+    # Les projets sont rendus dans l'ordre de téléchargement
+    return {fichier.name: projets[fichier.name] for fichier in fichiers}
@@ -0,0 +1,489 @@
+import os
+import numpy as np
+import pandas as pd
+from chargement import COLONNE_DATE, ENCODAGE, SEPARATEUR, lire_entete, parser_dates_jjmmaaaa
+from pretraitement import NAT_ENTIER, min_max_par_groupe
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
+# Taille des blocs lus (en octets pour pyarrow, en lignes pour pandas) : le pic mémoire de la lecture vaut environ
+# cinq fois la taille d'un bloc (transcodage latin1), quelle que soit la taille de l'export
+TAILLE_BLOC = 4 * 1024 * 1024
+LIGNES_PAR_BLOC = 5000
+
+# Taille d'export (en octets) à partir de laquelle l'application agrège par blocs au lieu de charger le tableau complet.
+# Elle doit rester sous la taille maximale des téléchargements de Streamlit (server.maxUploadSize, 200 Mo par défaut)
+TAILLE_MIN_PAR_BLOCS = int(os.environ.get('GED_TAILLE_MIN_PAR_BLOCS', 64 * 1024 * 1024))
+
+# Colonnes nécessaires aux agrégats partiels
+COLONNES_AGREGATS = ['LOT', 'TYPE DE DOCUMENT', 'INDICE', 'Libellé du document', COLONNE_DATE]
+
+# Dimensions du cube de comptage et clés des documents (un libellé déposé sous un type et un LOT)
+DIMENSIONS_COMPTAGE = ['LOT', 'TYPE DE DOCUMENT', 'INDICE', 'Mois']
+CLES_DOCUMENTS = ['TYPE DE DOCUMENT', 'LOT', 'Libellé du document']
+CLES_LIBELLES = ['Libellé du document', 'TYPE DE DOCUMENT']
+
+# Préfixe des colonnes de masque des indices déposés (64 valeurs d'indice par colonne)
+PREFIXE_MASQUE = '_indices_'
+
+# Dimensions du cube de comptage d'un projet chargé en mémoire
+DIMENSIONS_CUBE = ['LOT', 'TYPE DE DOCUMENT', 'INDICE', 'EMET', 'Mois']
+
+# Fonction pour lire les premiers octets d'une source (chemin ou fichier) afin d'en extraire l'en-tête
+def lire_entete_source(source):
+    if hasattr(source, 'read'):
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        debut = source.read(1 << 16)
+        if hasattr(source, 'seek'):
+            source.seek(0)
+    else:
+        with open(source, 'rb') as fichier:
+            debut = fichier.read(1 << 16)
+    return lire_entete(debut)
+
+# Fonction pour lire un export par blocs bornés, chaque bloc étant typé comme par charger_export
+def lire_par_blocs(source, colonnes=COLONNES_AGREGATS, taille_bloc=TAILLE_BLOC, moteur='auto'):
+    if moteur == 'auto':
+        moteur = 'pyarrow' if pa is not None else 'pandas'
+    colonnes = [colonne for colonne in lire_entete_source(source) if colonne in colonnes]
+    fichier = source if hasattr(source, 'read') else open(source, 'rb')
+    try:
+        if moteur == 'pyarrow':
+            lecteur = pa_csv.open_csv(
+                fichier,
+                read_options=pa_csv.ReadOptions(encoding='latin1', block_size=taille_bloc),
+                parse_options=pa_csv.ParseOptions(delimiter=SEPARATEUR, newlines_in_values=True),
+                convert_options=pa_csv.ConvertOptions(column_types={colonne: pa.string() for colonne in colonnes}, include_columns=colonnes)
+            )
+            # Chaînes en catégories : les valeurs répétées d'un bloc ne sont pas dupliquées en objets Python
+            blocs = (lot.to_pandas(strings_to_categorical=True) for lot in lecteur)
+        elif moteur == 'pandas':
+            blocs = pd.read_csv(fichier, encoding=ENCODAGE, sep=SEPARATEUR, dtype=str, usecols=colonnes, chunksize=LIGNES_PAR_BLOC)
+        else:
+            raise ValueError(f"Moteur de lecture inconnu : {moteur}")
+        for bloc in blocs:
+            bloc[COLONNE_DATE] = parser_dates_categorie(bloc[COLONNE_DATE])
+            yield bloc
+    finally:
+        if fichier is not source:
+            fichier.close()
+
+# Fonction pour analyser les dates d'un bloc, une seule fois par valeur distincte pour une colonne catégorielle
+def parser_dates_categorie(valeurs):
+    if not isinstance(valeurs.dtype, pd.CategoricalDtype):
+        return parser_dates_jjmmaaaa(valeurs)
+    # Date manquante ajoutée en dernier pour le code -1 des valeurs manquantes
+    dates = np.append(parser_dates_jjmmaaaa(pd.Series(valeurs.cat.categories)).to_numpy(dtype='datetime64[ns]'), np.datetime64('NaT', 'ns'))
+    return pd.Series(dates[valeurs.cat.codes.to_numpy()], index=valeurs.index)
+
+# Fonction pour remplacer les colonnes catégorielles d'une table par leurs valeurs (ordre de tri indépendant des blocs)
+def decategoriser(table):
+    return table.astype({colonne: object for colonne, type_colonne in table.dtypes.items() if isinstance(type_colonne, pd.CategoricalDtype)})
+
+# Agrégats partiels fusionnables d'un export : une ligne par document quel que soit son nombre de versions, les
+# indices déposés étant gardés sous forme de masque de bits
+class AgregatsGED:
+    def __init__(self):
+        self.lignes = 0
+        # Nombre de lignes par LOT, type, indice et mois de dépôt
+        self.comptages = pd.Series(dtype=np.int64, index=pd.MultiIndex.from_arrays([[]] * len(DIMENSIONS_COMPTAGE), names=DIMENSIONS_COMPTAGE))
+        # Dates extrêmes, nombre de lignes et de dépôts datés et masque des indices déposés par document
+        self.par_document = pd.DataFrame(columns=CLES_DOCUMENTS + ['_empreinte', 'Date min', 'Date max', 'Lignes', 'Dépôts datés'])
+        # Valeurs d'indice rencontrées, dans l'ordre des bits des masques (None pour un indice manquant)
+        self.indices = []
+        # Agrégats partiels pas encore fusionnés : la fusion est différée pour rester en O(n log n)
+        self.en_attente = []
+
+    # Fonction pour intégrer un bloc de lignes aux agrégats
+    def ajouter_bloc(self, bloc):
+        partiel = AgregatsGED()
+        partiel.lignes = len(bloc)
+        bloc = bloc.assign(**{'Mois': bloc[COLONNE_DATE].dt.to_period('M').dt.to_timestamp()})
+        comptages = bloc.groupby(DIMENSIONS_COMPTAGE, dropna=False, observed=True, sort=False).size()
+        partiel.comptages = pd.Series(comptages.to_numpy(), index=pd.MultiIndex.from_frame(decategoriser(comptages.index.to_frame(index=False))))
+        dates = bloc[COLONNE_DATE].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        codes_indice, valeurs_indice = pd.factorize(bloc['INDICE'], use_na_sentinel=False)
+        partiel.indices = [None if pd.isna(valeur) else valeur for valeur in valeurs_indice]
+        table = bloc[CLES_DOCUMENTS].assign(**{
+            '_empreinte': empreintes_cles(bloc, CLES_DOCUMENTS), 'Date min': dates, 'Date max': dates, 'Lignes': 1,
+            'Dépôts datés': (dates != NAT_ENTIER).astype(np.int64)
+        })
+        masques = masques_indices(codes_indice, len(partiel.indices))
+        partiel.par_document = decategoriser(fusionner_extremes([table.assign(**masques)], CLES_DOCUMENTS, ['Lignes', 'Dépôts datés'], list(masques)))
+        self.fusionner(partiel)
+        return self
+
+    # Fonction pour fusionner d'autres agrégats partiels (blocs ou fichiers traités séparément)
+    def fusionner(self, autre):
+        autre.compacter()
+        autre.par_document = self.traduire_masques(autre)
+        self.lignes += autre.lignes
+        self.en_attente.append(autre)
+        # Compactage dès que les partiels en attente dépassent la taille des agrégats déjà fusionnés
+        if sum(len(partiel.par_document) for partiel in self.en_attente) >= len(self.par_document):
+            self.compacter()
+        return self
+
+    # Fonction pour exprimer les masques d'indices d'autres agrégats avec les bits de ces agrégats (valeurs ajoutées au besoin)
+    def traduire_masques(self, autre):
+        rangs = {valeur: rang for rang, valeur in enumerate(self.indices)}
+        positions = []
+        for valeur in autre.indices:
+            if valeur not in rangs:
+                rangs[valeur] = len(self.indices)
+                self.indices.append(valeur)
+            positions.append(rangs[valeur])
+        if positions == list(range(len(positions))):
+            return autre.par_document
+        anciens = autre.par_document[colonnes_masques(autre.par_document)].to_numpy(dtype=np.uint64)
+        nouveaux = np.zeros((len(anciens), nombre_mots(len(self.indices))), dtype=np.uint64)
+        for ancien, nouveau in enumerate(positions):
+            bits = (anciens[:, ancien // 64] >> np.uint64(ancien % 64)) & np.uint64(1)
+            nouveaux[:, nouveau // 64] |= bits << np.uint64(nouveau % 64)
+        masques = {f"{PREFIXE_MASQUE}{mot}": nouveaux[:, mot] for mot in range(nouveaux.shape[1])}
+        return autre.par_document.drop(columns=colonnes_masques(autre.par_document)).assign(**masques)
+
+    # Fonction pour fusionner les agrégats partiels en attente
+    def compacter(self):
+        if not self.en_attente:
+            return self
+        partiels = [self] + self.en_attente
+        self.en_attente = []
+        comptages = [partiel.comptages for partiel in partiels if len(partiel.comptages)]
+        if comptages:
+            comptages = pd.concat(comptages)
+            self.comptages = comptages.groupby(level=list(range(comptages.index.nlevels)), dropna=False, sort=False).sum()
+        tables = [partiel.par_document for partiel in partiels]
+        masques = [f"{PREFIXE_MASQUE}{mot}" for mot in range(nombre_mots(len(self.indices)))]
+        self.par_document = fusionner_extremes(tables, CLES_DOCUMENTS, ['Lignes', 'Dépôts datés'], masques)
+        return self
+
+    # Fonction pour compter les lignes selon certaines dimensions du cube (valeurs manquantes exclues)
+    def comptages_par(self, colonnes):
+        self.compacter()
+        comptages = self.comptages.groupby(level=colonnes, observed=True).sum()
+        return comptages.reset_index(name='Nombre de documents')
+
+    # Fonction pour calculer les agrégats par document (première et dernière version, indices utilisés)
+    def documents(self):
+        self.compacter()
+        par_document = dates_extremes(self.par_document).dropna(subset=CLES_DOCUMENTS).sort_values(CLES_DOCUMENTS)
+        masques = par_document[colonnes_masques(par_document)].to_numpy(dtype=np.uint64)
+        presences = np.column_stack([(masques[:, rang // 64] >> np.uint64(rang % 64)) & np.uint64(1) for rang in range(len(self.indices))] or [np.zeros(len(masques), dtype=np.uint64)]).astype(bool)
+        connus = np.array([valeur is not None for valeur in self.indices] or [False])
+        # Liste des indices calculée une fois par combinaison d'indices distincte
+        combinaisons, inverses = np.unique(masques, axis=0, return_inverse=True)
+        listes = np.array([', '.join(sorted('' if valeur is None else valeur for rang, valeur in enumerate(self.indices) if int(combinaison[rang // 64]) >> (rang % 64) & 1)) for combinaison in combinaisons], dtype=object)
+        documents = par_document[CLES_DOCUMENTS].reset_index(drop=True).assign(**{
+            'Date première version': par_document['Date min'].to_numpy(),
+            'Date dernière version': par_document['Date max'].to_numpy(),
+            'Nombre d\'indices': (presences & connus).sum(axis=1),
+            'Indices utilisés': listes[inverses.reshape(-1)],
+            'Lignes': par_document['Lignes'].to_numpy()
+        })
+        documents['Différence en jours'] = (documents['Date dernière version'] - documents['Date première version']).dt.days
+        return documents
+
+    # Fonction pour calculer le nombre moyen (pondéré par les lignes) ou maximum d'indices par type de document
+    def nombre_indices_par_type(self, type_calcul='mean'):
+        documents = self.documents()
+        groupes = documents.groupby('TYPE DE DOCUMENT', observed=True)
+        if type_calcul == 'max':
+            return groupes['Nombre d\'indices'].max().reset_index()
+        ponderes = documents['Nombre d\'indices'] * documents['Lignes']
+        moyennes = ponderes.groupby(documents['TYPE DE DOCUMENT']).sum() / groupes['Lignes'].sum()
+        return moyennes.rename('Nombre d\'indices').reset_index()
+
+    # Fonction pour calculer la durée moyenne entre versions par type (somme télescopique max - min par libellé et type :
+    # l'écart entre deux versions d'un même libellé déposées sous des types différents n'est pas compté)
+    def durees_par_type(self, remplir_durees=False):
+        self.compacter()
+        par_document = dates_extremes(self.par_document)
+        libelles = par_document[par_document['Libellé du document'].notna()].groupby(CLES_LIBELLES, dropna=False, sort=False).agg(**{
+            'Date min': ('Date min', 'min'),
+            'Date max': ('Date max', 'max'),
+            'Dépôts datés': ('Dépôts datés', 'sum')
+        }).reset_index()
+        libelles['Durée totale'] = (libelles['Date max'] - libelles['Date min']).dt.days.fillna(0)
+        libelles['Intervalles'] = (libelles['Dépôts datés'] - 1).clip(lower=0)
+        durees = libelles.groupby('TYPE DE DOCUMENT', observed=True)[['Durée totale', 'Intervalles']].sum()
+        if remplir_durees:
+            lignes = self.comptages_par(['TYPE DE DOCUMENT']).set_index('TYPE DE DOCUMENT')['Nombre de documents']
+            durees['Durée moyenne entre versions'] = durees['Durée totale'] / lignes.reindex(durees.index)
+        else:
+            durees['Durée moyenne entre versions'] = durees['Durée totale'] / durees['Intervalles'].replace(0, np.nan)
+        return durees.reset_index()
+
+    # Fonction pour construire le calendrier (début, fin, nombre de documents) par LOT ou type de document
+    def calendrier(self, categorie='LOT'):
+        self.compacter()
+        par_document = dates_extremes(self.par_document)
+        par_document['Lignes nommées'] = par_document['Lignes'].where(par_document['Libellé du document'].notna(), 0)
+        calendrier = par_document.groupby(categorie, observed=True).agg(**{
+            'Date début': ('Date min', 'min'),
+            'Date fin': ('Date max', 'max'),
+            'Nombre de documents': ('Lignes nommées', 'sum')
+        }).reset_index()
+        calendrier['Durée en jours'] = (calendrier['Date fin'] - calendrier['Date début']).dt.days
+        return calendrier
+
+# Fonctions disponibles pour les mesures des ensembles de regroupement
+FONCTIONS_ENSEMBLES = ['size', 'count', 'sum', 'mean', 'min', 'max']
+
+# Colonnes mesurées par défaut (lorsqu'elles existent) : indicateurs numériques, dates de dépôt et libellés
+MESURES_ENSEMBLES = ['Nombre d\'indices', 'Nombre moyen d\'indices', 'Durée entre versions', COLONNE_DATE, 'Libellé du document']
+
+# Fonction pour lister les colonnes lues par des mesures nommées ({nom: (colonne, fonction)} ou {colonne: fonction})
+def colonnes_mesurees(mesures):
+    colonnes = []
+    for nom, mesure in (mesures or {}).items():
+        colonne, fonction = mesure if isinstance(mesure, tuple) else (nom, mesure)
+        if fonction != 'size':
+            colonnes.append(colonne)
+    return list(dict.fromkeys(colonnes))
+
+# Fonction pour combiner des codes entiers en un seul code par ligne, dans l'ordre lexicographique des colonnes
+# (les codes sont renumérotés en cours de route si le nombre de combinaisons dépasse les entiers 64 bits)
+def combiner_codes(codes, tailles, nombre_lignes):
+    positions = np.zeros(nombre_lignes, dtype=np.int64)
+    combinaisons = 1
+    for code, taille in zip(codes, tailles):
+        if combinaisons * taille >= 1 << 62:
+            _, positions = np.unique(positions, return_inverse=True)
+            combinaisons = int(positions.max(initial=-1)) + 1
+        positions = positions * taille + code
+        combinaisons *= taille
+    return positions
+
+# Fonction pour calculer le minimum et le maximum de valeurs réelles par groupe (NaN pour les groupes sans valeur)
+def extremes_par_groupe(codes, valeurs, nombre_groupes):
+    valides = ~np.isnan(valeurs)
+    minimums = np.full(nombre_groupes, np.inf)
+    maximums = np.full(nombre_groupes, -np.inf)
+    np.minimum.at(minimums, codes[valides], valeurs[valides])
+    np.maximum.at(maximums, codes[valides], valeurs[valides])
+    vides = np.bincount(codes[valides], minlength=nombre_groupes) == 0
+    minimums[vides] = np.nan
+    maximums[vides] = np.nan
+    return minimums, maximums
+
+# Agrégats d'une colonne mesurée par cellule : nombre de valeurs, somme, minimum et maximum (fusionnables entre cellules)
+class MesureCellules:
+    def __init__(self, serie, inverses, nombre_cellules):
+        self.type = serie.dtype
+        self.dates = pd.api.types.is_datetime64_any_dtype(self.type)
+        self.numerique = self.dates or (pd.api.types.is_numeric_dtype(self.type) and not pd.api.types.is_bool_dtype(self.type))
+        # Entiers et réels nullables (Int16, Float64...) produits par optimiser_types
+        self.nullable = self.numerique and not self.dates and not isinstance(self.type, np.dtype)
+        if self.dates:
+            valeurs = serie.to_numpy(dtype='datetime64[ns]').view(np.int64)
+            self.effectifs = np.bincount(inverses[valeurs != NAT_ENTIER], minlength=nombre_cellules)
+            self.minimums, self.maximums = min_max_par_groupe(inverses, valeurs, nombre_cellules)
+            self.sommes = None
+        elif self.numerique:
+            valeurs = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+            connues = ~np.isnan(valeurs)
+            self.effectifs = np.bincount(inverses[connues], minlength=nombre_cellules)
+            self.sommes = np.bincount(inverses[connues], weights=valeurs[connues], minlength=nombre_cellules)
+            self.minimums, self.maximums = extremes_par_groupe(inverses, valeurs, nombre_cellules)
+        else:
+            self.effectifs = np.bincount(inverses[serie.notna().to_numpy()], minlength=nombre_cellules)
+            self.sommes = self.minimums = self.maximums = None
+
+    # Fonction pour agréger la mesure sur des groupes de cellules (groupe de chaque cellule retenue)
+    def agreger(self, fonction, cellules, groupes, nombre_groupes):
+        effectifs = np.bincount(groupes, weights=self.effectifs[cellules], minlength=nombre_groupes).astype(np.int64)
+        if fonction == 'count':
+            return effectifs
+        if not self.numerique or (self.dates and fonction in ('sum', 'mean')):
+            raise ValueError(f"La fonction {fonction} ne s'applique pas à une colonne de type {self.type}")
+        if fonction in ('sum', 'mean'):
+            sommes = np.bincount(groupes, weights=self.sommes[cellules], minlength=nombre_groupes)
+            if fonction == 'sum':
+                return pd.array(sommes, dtype=self.type) if self.nullable else sommes
+            with np.errstate(invalid='ignore', divide='ignore'):
+                moyennes = np.where(effectifs > 0, sommes / effectifs, np.nan)
+            return pd.array(moyennes, dtype=self.type if self.type.kind == 'f' else 'Float64') if self.nullable else moyennes
+        extremes_cellules = (self.minimums if fonction == 'min' else self.maximums)[cellules]
+        if self.dates:
+            return min_max_par_groupe(groupes, extremes_cellules, nombre_groupes)[0 if fonction == 'min' else 1].view('datetime64[ns]')
+        extremes = extremes_par_groupe(groupes, extremes_cellules, nombre_groupes)[0 if fonction == 'min' else 1]
+        # Comme pandas, un type nullable est conservé (groupes sans valeur à <NA>) et un extremum d'entiers reste entier
+        # lorsque chaque groupe a une valeur
+        if self.nullable:
+            return pd.array(extremes, dtype=self.type)
+        if self.type.kind in 'iu' and not np.isnan(extremes).any():
+            return extremes.astype(self.type)
+        return extremes
+
+# Ensembles de regroupement d'un projet (équivalent des GROUPING SETS et du ROLLUP de SQL) : les clés sont factorisées
+# et les lignes réparties en cellules en un seul passage, avec le nombre de lignes et les agrégats fusionnables de chaque
+# colonne mesurée. Chaque regroupement demandé (sous-ensemble des dimensions, éventuellement filtré) est ensuite une
+# agrégation des cellules, dont le nombre ne dépend pas du nombre de lignes
+class EnsemblesRegroupement:
+    def __init__(self, donnees, dimensions=DIMENSIONS_CUBE, mesures=None):
+        self.dimensions = [dimension for dimension in dimensions if dimension == 'Mois' or dimension in donnees.columns]
+        mesures = MESURES_ENSEMBLES if mesures is None else mesures
+        self.modalites = {}
+        self.types = {}
+        codes = []
+        for dimension in self.dimensions:
+            if dimension == 'Mois':
+                mois = donnees[COLONNE_DATE].to_numpy(dtype='datetime64[ns]').astype('datetime64[M]')
+                codes_dimension, modalites = pd.factorize(mois, sort=True)
+                self.modalites[dimension] = pd.Index(modalites.astype('datetime64[ns]'))
+            elif isinstance(donnees[dimension].dtype, pd.CategoricalDtype):
+                codes_dimension = donnees[dimension].cat.codes.to_numpy()
+                self.modalites[dimension] = donnees[dimension].cat.categories
+                self.types[dimension] = donnees[dimension].dtype
+            else:
+                codes_dimension, modalites = pd.factorize(donnees[dimension], sort=True)
+                self.modalites[dimension] = pd.Index(modalites)
+            codes.append(codes_dimension.astype(np.int64))
+
+        # Les codes manquants (-1) sont décalés pour que chaque ligne ait une cellule
+        tailles = [len(self.modalites[dimension]) + 1 for dimension in self.dimensions]
+        positions = combiner_codes([code + 1 for code in codes], tailles, len(donnees))
+        _, premieres, inverses, self.nombres = np.unique(positions, return_index=True, return_inverse=True, return_counts=True)
+        self.cellules = {dimension: code[premieres].astype(np.int32) for dimension, code in zip(self.dimensions, codes)}
+        self.mesures = {colonne: MesureCellules(donnees[colonne], inverses, len(self.nombres)) for colonne in mesures if colonne in donnees.columns}
+        self.lignes = len(donnees)
+
+    # Fonction pour vérifier qu'un regroupement et ses filtres peuvent être calculés à partir des cellules
+    def couvre(self, colonnes, filtres=None, mesures=None):
+        return (all(colonne in self.cellules for colonne in list(colonnes) + list(filtres or {}))
+                and all(colonne in self.mesures for colonne in colonnes_mesurees(mesures)))
+
+    # Fonction pour sélectionner les cellules correspondant à des filtres (valeurs retenues par dimension)
+    def selection(self, filtres=None):
+        masque = np.ones(len(self.nombres), dtype=bool)
+        for dimension, valeurs in (filtres or {}).items():
+            if valeurs is None:
+                continue
+            codes = self.modalites[dimension].get_indexer(pd.Index(list(valeurs), dtype=object if dimension != 'Mois' else None))
+            masque &= np.isin(self.cellules[dimension], codes[codes >= 0])
+        return masque
+
+    # Fonction pour agréger les lignes par combinaison des colonnes demandées (mêmes lignes, ordre et types qu'un groupby).
+    # Les mesures sont nommées comme dans groupby().agg : {nom: (colonne, fonction)} ou {colonne: fonction} ;
+    # sans mesure, le nombre de lignes est rendu dans la colonne « Nombre de documents »
+    def agreger(self, colonnes, mesures=None, filtres=None):
+        colonnes = list(colonnes)
+        mesures = mesures or {'Nombre de documents': (None, 'size')}
+        masque = self.selection(filtres)
+        for colonne in colonnes:
+            masque &= self.cellules[colonne] >= 0
+        cellules = np.flatnonzero(masque)
+        codes = [self.cellules[colonne][cellules].astype(np.int64) for colonne in colonnes]
+        positions = combiner_codes(codes, [len(self.modalites[colonne]) for colonne in colonnes], len(cellules))
+        _, premieres, groupes = np.unique(positions, return_index=True, return_inverse=True)
+        nombre_groupes = len(premieres)
+        resultat = {}
+        for colonne, codes_colonne in zip(colonnes, codes):
+            if colonne in self.types:
+                resultat[colonne] = pd.Categorical.from_codes(codes_colonne[premieres], dtype=self.types[colonne])
+            else:
+                resultat[colonne] = self.modalites[colonne].take(codes_colonne[premieres])
+        for nom, mesure in mesures.items():
+            colonne, fonction = mesure if isinstance(mesure, tuple) else (nom, mesure)
+            if fonction not in FONCTIONS_ENSEMBLES:
+                raise ValueError(f"Fonction d'agrégation inconnue : {fonction}")
+            if fonction == 'size':
+                resultat[nom] = np.bincount(groupes, weights=self.nombres[cellules], minlength=nombre_groupes).astype(np.int64)
+            else:
+                resultat[nom] = self.mesures[colonne].agreger(fonction, cellules, groupes, nombre_groupes)
+        return pd.DataFrame(resultat)
+
+    # Fonction pour calculer plusieurs regroupements avec les mêmes mesures (un tableau par ensemble de colonnes)
+    def ensembles(self, ensembles, mesures=None, filtres=None):
+        return {tuple(ensemble): self.agreger(ensemble, mesures, filtres) for ensemble in ensembles}
+
+# Fonction pour lister les ensembles d'un ROLLUP : les colonnes, puis leurs préfixes jusqu'au total général
+def ensembles_rollup(colonnes):
+    colonnes = list(colonnes)
+    return [colonnes[:taille] for taille in range(len(colonnes), -1, -1)]
+
+# Fonction pour calculer des ensembles de regroupement en un seul passage sur les lignes
+def agreger_ensembles(donnees, ensembles, mesures=None, filtres=None):
+    dimensions = list(dict.fromkeys(colonne for ensemble in ensembles for colonne in list(ensemble) + list(filtres or {})))
+    regroupement = EnsemblesRegroupement(donnees, dimensions, colonnes_mesurees(mesures))
+    return regroupement.ensembles(ensembles, mesures, filtres)
+
+# Cube de comptage d'un projet : ensembles de regroupement sans mesure, dont on ne lit que le nombre de lignes
+class CubeComptages(EnsemblesRegroupement):
+    def __init__(self, donnees, dimensions=DIMENSIONS_CUBE):
+        super().__init__(donnees, dimensions, mesures=[])
+
+    # Fonction pour compter les lignes par combinaison des colonnes demandées (mêmes lignes, ordre et types qu'un groupby)
+    def comptages(self, colonnes, filtres=None):
+        return self.agreger(colonnes, filtres=filtres)
+
+# Fonction pour calculer une empreinte entière des clés de chaque ligne (les regroupements se font sur des entiers)
+def empreintes_cles(donnees, cles):
+    return pd.util.hash_pandas_object(donnees[cles], index=False).to_numpy()
+
+# Fonction pour compter les mots de 64 bits nécessaires aux masques d'un nombre de valeurs d'indice
+def nombre_mots(nombre_indices):
+    return max(1, -(-nombre_indices // 64))
+
+# Fonction pour lister les colonnes de masque d'indices d'une table
+def colonnes_masques(table):
+    return [colonne for colonne in table.columns if colonne.startswith(PREFIXE_MASQUE)]
+
+# Fonction pour construire le masque d'indices de chaque ligne à partir du code de son indice
+def masques_indices(codes_indice, nombre_indices):
+    masques = np.zeros((len(codes_indice), nombre_mots(nombre_indices)), dtype=np.uint64)
+    masques[np.arange(len(codes_indice)), codes_indice // 64] = np.left_shift(np.uint64(1), (codes_indice % 64).astype(np.uint64))
+    return {f"{PREFIXE_MASQUE}{mot}": masques[:, mot] for mot in range(masques.shape[1])}
+
+# Fonction pour fusionner des tables de dates extrêmes (en nanosecondes) sur l'empreinte de leurs clés : sommes des
+# compteurs et union des masques d'indices (mots absents d'une table : aucun bit). Sans aucune ligne (export réduit à
+# son en-tête), la table fusionnée est vide
+def fusionner_extremes(tables, cles, colonnes_somme, colonnes_masque=()):
+    tables = [table.assign(**{colonne: np.uint64(0) for colonne in colonnes_masque if colonne not in table.columns}) for table in tables if len(table)]
+    if not tables:
+        return pd.DataFrame({
+            **{cle: pd.Series(dtype=object) for cle in cles},
+            '_empreinte': pd.Series(dtype=np.uint64), 'Date min': pd.Series(dtype=np.int64), 'Date max': pd.Series(dtype=np.int64),
+            **{colonne: pd.Series(dtype=np.int64) for colonne in colonnes_somme},
+            **{colonne: pd.Series(dtype=np.uint64) for colonne in colonnes_masque}
+        })
+    combinees = pd.concat(tables, ignore_index=True)
+    codes, empreintes = pd.factorize(combinees['_empreinte'].to_numpy(dtype=np.uint64))
+    codes = codes.astype(np.int64)
+    nombre_cles = len(empreintes)
+    minimums, _ = min_max_par_groupe(codes, combinees['Date min'].to_numpy(dtype=np.int64), nombre_cles)
+    _, maximums = min_max_par_groupe(codes, combinees['Date max'].to_numpy(dtype=np.int64), nombre_cles)
+    premieres = np.empty(nombre_cles, dtype=np.int64)
+    premieres[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+    fusion = combinees[cles].take(premieres).reset_index(drop=True)
+    fusion['_empreinte'] = empreintes
+    fusion['Date min'] = minimums
+    fusion['Date max'] = maximums
+    for colonne in colonnes_somme:
+        fusion[colonne] = np.bincount(codes, weights=combinees[colonne].to_numpy(dtype=np.float64), minlength=nombre_cles).astype(np.int64)
+    for colonne in colonnes_masque:
+        masques = np.zeros(nombre_cles, dtype=np.uint64)
+        np.bitwise_or.at(masques, codes, combinees[colonne].to_numpy(dtype=np.uint64))
+        fusion[colonne] = masques
+    return fusion
+
+# Fonction pour convertir les dates extrêmes d'une table en dates pandas
+def dates_extremes(table):
+    return table.assign(**{
+        'Date min': table['Date min'].to_numpy(dtype=np.int64).view('datetime64[ns]'),
+        'Date max': table['Date max'].to_numpy(dtype=np.int64).view('datetime64[ns]')
+    })
+
+# Fonction pour agréger un export bloc par bloc sans jamais le charger en entier
+def agreger_export_par_blocs(source, taille_bloc=TAILLE_BLOC, moteur='auto'):
+    agregats = AgregatsGED()
+    for bloc in lire_par_blocs(source, taille_bloc=taille_bloc, moteur=moteur):
+        agregats.ajouter_bloc(bloc)
+    return agregats.compacter()
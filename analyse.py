@@ -3,48 +3,23 @@ import streamlit as st
 import plotly.express as px
 import seaborn as sns
 import matplotlib.pyplot as plt
+from chargement import charger_export
+from pretraitement import pretraiter_donnees_vectorise
+from agregats import EnsemblesRegroupement
+from cache_memoire import cache_par_empreinte
 
 # Configurer le thème Streamlit
 st.set_page_config(layout="wide")
 
-# Fonction pour charger les données depuis un fichier
-@st.cache_data
+# Fonction pour charger les données depuis un fichier (mis en cache selon l'empreinte du contenu)
+@cache_par_empreinte
 def charger_donnees(chemin_fichier):
-    spec_types = {
-        'Date dépôt GED': str,
-        'TYPE DE DOCUMENT': str,
-        'PROJET': str,
-        'EMET': str,
-        'LOT': str,
-        'INDICE': str,
-        'Libellé du document': str
-    }
-    donnees = pd.read_csv(chemin_fichier, encoding='iso-8859-1', sep=';', dtype=spec_types, low_memory=False)
-    donnees['Date dépôt GED'] = pd.to_datetime(donnees['Date dépôt GED'], format='%d/%m/%Y', errors='coerce')
-    return donnees
+    return charger_export(chemin_fichier, categoriser=False)
 
 # Fonction pour prétraiter les données
-@st.cache_data
+@cache_par_empreinte
 def pretraiter_donnees(donnees):
-    donnees = donnees.sort_values(by=['TYPE DE DOCUMENT', 'Date dépôt GED'])
-    group = donnees.groupby(['TYPE DE DOCUMENT', 'LOT', 'Libellé du document'])
-    donnees['Date première version'] = group['Date dépôt GED'].transform('min')
-    donnees['Date dernière version'] = group['Date dépôt GED'].transform('max')
-    donnees['Différence en jours'] = (donnees['Date dernière version'] - donnees['Date première version']).dt.days
-    donnees['Nombre d\'indices'] = group['INDICE'].transform('nunique')
-    
-    # Remplir les valeurs manquantes avant la transformation
-    donnees['INDICE'] = donnees['INDICE'].fillna('')
-    donnees['Indices utilisés'] = group['INDICE'].transform(lambda x: ', '.join(sorted(set(x))))
-
-    # Calculer les durées entre chaque version pour chaque document
-    donnees = donnees.sort_values(by=['Libellé du document', 'Date dépôt GED'])
-    donnees['Durée entre versions'] = donnees.groupby('Libellé du document')['Date dépôt GED'].diff().dt.days
-
-    # Remplacer les valeurs manquantes dans 'Durée entre versions' par 0
-    donnees['Durée entre versions'] = donnees['Durée entre versions'].fillna(0)
-
-    return donnees
+    return pretraiter_donnees_vectorise(donnees, dates_lot=False, remplir_durees=True)
 
 # Charger les données
 chemin_fichier = st.file_uploader("Téléchargez votre fichier CSV", type=["csv"])
@@ -54,13 +29,15 @@ if chemin_fichier is not None:
 
     st.header("Statistiques descriptives")
     
-    # Calcul des statistiques descriptives
-    nombre_documents = donnees.groupby('TYPE DE DOCUMENT').size().reset_index(name='Nombre de documents')
-    moyenne_indices = donnees.groupby('TYPE DE DOCUMENT')['Nombre d\'indices'].mean().reset_index(name='Nombre moyen d\'indices')
-    duree_moyenne_versions = donnees.groupby('TYPE DE DOCUMENT')['Durée entre versions'].mean().reset_index(name='Durée moyenne entre versions (jours)')
-    
-    stats_description = pd.merge(nombre_documents, moyenne_indices, on='TYPE DE DOCUMENT')
-    stats_description = pd.merge(stats_description, duree_moyenne_versions, on='TYPE DE DOCUMENT')
+    # Calcul des statistiques descriptives (les trois mesures par type de document en un seul passage sur les lignes)
+    stats_description = EnsemblesRegroupement(donnees, ['TYPE DE DOCUMENT']).agreger(['TYPE DE DOCUMENT'], {
+        'Nombre de documents': (None, 'size'),
+        'Nombre moyen d\'indices': ('Nombre d\'indices', 'mean'),
+        'Durée moyenne entre versions (jours)': ('Durée entre versions', 'mean')
+    })
+    nombre_documents = stats_description[['TYPE DE DOCUMENT', 'Nombre de documents']]
+    moyenne_indices = stats_description[['TYPE DE DOCUMENT', 'Nombre moyen d\'indices']]
+    duree_moyenne_versions = stats_description[['TYPE DE DOCUMENT', 'Durée moyenne entre versions (jours)']]
     
     st.dataframe(stats_description)
     
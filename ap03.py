@@ -6,6 +6,14 @@ from streamlit_option_menu import option_menu
 from datetime import timedelta
 from PIL import Image
 import os
+from chargement import charger_export
+from pretraitement import pretraiter_donnees_vectorise, durees_entre_indices
+from consolidation import consolider_projets, masse_documents_par_projet
+from affichage import afficher_tableau_pagine, charger_fichiers_en_parallele
+from flux import agreger_flux
+from agregats import EnsemblesRegroupement
+from index_projet import IndexBitmaps
+from cache_memoire import cache_par_empreinte
 
 # Configurer le thème Streamlit
 st.set_page_config(layout="wide")
@@ -62,53 +70,51 @@ def style_entete():
         </div>
         """, unsafe_allow_html=True)
 
-# Fonction pour charger les données depuis un fichier
-@st.cache_data
+# Fonction pour charger les données depuis un fichier (mis en cache selon l'empreinte du contenu)
+@cache_par_empreinte
 def charger_donnees(chemin_fichier):
-    spec_types = {
-        'Date dépôt GED': str,
-        'TYPE DE DOCUMENT': str,
-        'PROJET': str,
-        'EMET': str,
-        'LOT': str,
-        'INDICE': str,
-        'Libellé du document': str
-    }
-    donnees = pd.read_csv(chemin_fichier, encoding='iso-8859-1', sep=';', dtype=spec_types, low_memory=False)
-    donnees['Date dépôt GED'] = pd.to_datetime(donnees['Date dépôt GED'], format='%d/%m/%Y', errors='coerce')
-    return donnees
+    return charger_export(chemin_fichier, categoriser=False)
 
 # Fonction pour charger les données depuis un fichier téléchargé
-@st.cache_data
 def charger_donnees_uploaded(file):
     return charger_donnees(file)
 
 # Fonction pour prétraiter les données
-@st.cache_data
+@cache_par_empreinte
 def pretraiter_donnees(donnees):
-    donnees = donnees.sort_values(by=['TYPE DE DOCUMENT', 'Date dépôt GED'])
-    group = donnees.groupby(['TYPE DE DOCUMENT', 'LOT', 'Libellé du document'])
-    donnees['Date première version'] = group['Date dépôt GED'].transform('min')
-    donnees['Date dernière version'] = group['Date dépôt GED'].transform('max')
-    donnees['Différence en jours'] = (donnees['Date dernière version'] - donnees['Date première version']).dt.days
-    donnees['Nombre d\'indices'] = group['INDICE'].transform('nunique')
-    
-    # Remplir les valeurs manquantes avant la transformation
-    donnees['INDICE'] = donnees['INDICE'].fillna('')
-    donnees['Indices utilisés'] = group['INDICE'].transform(lambda x: ', '.join(sorted(set(x))))
-
-    # Ajouter les colonnes Date début et Date fin pour chaque LOT
-    donnees['Date début'] = donnees.groupby('LOT')['Date dépôt GED'].transform('min')
-    donnees['Date fin'] = donnees.groupby('LOT')['Date dépôt GED'].transform('max')
-    
-    # Calculer les durées entre chaque version pour chaque document
-    donnees = donnees.sort_values(by=['Libellé du document', 'Date dépôt GED'])
-    donnees['Durée entre versions'] = donnees.groupby('Libellé du document')['Date dépôt GED'].diff().dt.days
-
-    # Remplacer les valeurs manquantes dans 'Durée entre versions' par 0
-    donnees['Durée entre versions'] = donnees['Durée entre versions'].fillna(0)
-
-    return donnees
+    return pretraiter_donnees_vectorise(donnees, remplir_durees=True)
+
+# Fonction pour construire les ensembles de regroupement du projet (un seul passage sur les lignes pour toutes les agrégations des onglets)
+@cache_par_empreinte
+def construire_regroupements(donnees):
+    return EnsemblesRegroupement(donnees)
+
+# Fonction pour indexer les lignes du projet par valeur des colonnes filtrées (un bitmap par valeur, calculé une fois par projet)
+@cache_par_empreinte
+def indexer_lignes(donnees):
+    return IndexBitmaps(donnees)
+
+# Fonction pour consolider les dates de dépôt de tous les projets en une seule table
+@cache_par_empreinte
+def consolider_donnees_projets(dates_projets):
+    return consolider_projets(dates_projets)
+
+# Fonction pour agréger les flux du diagramme de Sankey (par projet et nombre de valeurs affichées)
+@cache_par_empreinte
+def calculer_flux(donnees, nombre_max_noeuds):
+    return agreger_flux(donnees, nombre_max_noeuds=nombre_max_noeuds)
+
+# Fonction pour calculer les durées entre indices successifs des documents
+@cache_par_empreinte
+def calculer_durees_indices(donnees):
+    return durees_entre_indices(donnees)
+
+# Mesures du calendrier : dates du premier et du dernier dépôt et nombre de documents nommés
+MESURES_CALENDRIER = {
+    'Date début': ('Date dépôt GED', 'min'),
+    'Date fin': ('Date dépôt GED', 'max'),
+    'Nombre de documents': ('Libellé du document', 'count')
+}
 
 # Fonction pour afficher le menu latéral
 def afficher_menu():
@@ -126,11 +132,7 @@ def afficher_menu():
 # Fonction pour gérer le téléchargement de fichiers
 def gerer_telechargement():
     uploaded_files = st.file_uploader("Téléchargez vos fichiers CSV", type=["csv"], accept_multiple_files=True)
-    projets = {}
-    if uploaded_files:
-        for uploaded_file in uploaded_files:
-            projets[uploaded_file.name] = charger_donnees_uploaded(uploaded_file)
-    return projets
+    return charger_fichiers_en_parallele(uploaded_files, charger_donnees_uploaded)
 
 # Fonction pour synchroniser les filtres entre les onglets
 def synchroniser_filtres(projets):
@@ -147,6 +149,8 @@ def generate_dynamic_colors(n):
 
 # Fonction pour afficher les graphiques selon l'onglet sélectionné
 def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
+    regroupements = construire_regroupements(donnees)
+
     # Onglet 1: Répartition des Catégories de documents
     if selectionne == "Répartition des Catégories de documents":
         st.header("Répartition des Catégories de documents")
@@ -174,18 +178,18 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
         representation = st.selectbox('Sélectionnez le type de représentation', ['Graphique barre', 'Tableau'], key='rep_versions_type', index=0)
         if representation == "Tableau":
             if type_calcul == 'mean':
-                resultats = donnees.groupby('TYPE DE DOCUMENT')['Nombre d\'indices'].mean().reset_index()
+                resultats = regroupements.agreger(['TYPE DE DOCUMENT'], {'Nombre d\'indices': 'mean'})
                 resultats.columns = ['TYPE DE DOCUMENT', 'Nombre moyen d\'indices']
             elif type_calcul == 'max':
-                resultats = donnees.groupby('TYPE DE DOCUMENT')['Nombre d\'indices'].max().reset_index()
+                resultats = regroupements.agreger(['TYPE DE DOCUMENT'], {'Nombre d\'indices': 'max'})
                 resultats.columns = ['TYPE DE DOCUMENT', 'Nombre maximum d\'indices']
             st.dataframe(resultats)
         elif representation == "Graphique barre":
             if type_calcul == 'mean':
-                resultats = donnees.groupby('TYPE DE DOCUMENT')['Nombre d\'indices'].mean().reset_index()
+                resultats = regroupements.agreger(['TYPE DE DOCUMENT'], {'Nombre d\'indices': 'mean'})
                 title = 'Nombre moyen d\'indices par Type de Document'
             elif type_calcul == 'max':
-                resultats = donnees.groupby('TYPE DE DOCUMENT')['Nombre d\'indices'].max().reset_index()
+                resultats = regroupements.agreger(['TYPE DE DOCUMENT'], {'Nombre d\'indices': 'max'})
                 title = 'Nombre maximum d\'indices par Type de Document'
             resultats = resultats.sort_values(by=resultats.columns[1], ascending=False)
             
@@ -206,19 +210,19 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
         
         if representation == "Tableau":
             if type_calcul == 'mean':
-                resultats = donnees.groupby(categorie)['Durée entre versions'].mean().reset_index()
+                resultats = regroupements.agreger([categorie], {'Durée entre versions': 'mean'})
                 resultats.columns = [categorie, 'Durée moyenne entre versions (jours)']
             elif type_calcul == 'max':
-                resultats = donnees.groupby(categorie)['Durée entre versions'].max().reset_index()
+                resultats = regroupements.agreger([categorie], {'Durée entre versions': 'max'})
                 resultats.columns = [categorie, 'Durée maximum entre versions (jours)']
             resultats = resultats.sort_values(by=resultats.columns[1], ascending=False)
             st.dataframe(resultats)
         elif representation == "Graphique barre":
             if type_calcul == 'mean':
-                resultats = donnees.groupby(categorie)['Durée entre versions'].mean().reset_index()
+                resultats = regroupements.agreger([categorie], {'Durée entre versions': 'mean'})
                 title = f'Durée moyenne entre versions (jours) par {categorie}'
             elif type_calcul == 'max':
-                resultats = donnees.groupby(categorie)['Durée entre versions'].max().reset_index()
+                resultats = regroupements.agreger([categorie], {'Durée entre versions': 'max'})
                 title = f'Durée maximum entre versions (jours) par {categorie}'
             resultats = resultats.sort_values(by=resultats.columns[1], ascending=False)
             
@@ -232,22 +236,9 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
 
         # Calcul des durées entre indices pour chaque type de document
         st.subheader("Durées entre indices par type de document")
-        durées_indices = []
-        for doc_type, group in donnees.groupby('TYPE DE DOCUMENT'):
-            group = group.sort_values(by=['Libellé du document', 'INDICE'])
-            group['Durée entre indices'] = group.groupby('Libellé du document')['Date dépôt GED'].diff().dt.days
-            group['Passage indice'] = group.groupby('Libellé du document')['INDICE'].transform(lambda x: x.shift(1) + ' à ' + x)
-            for _, row in group.iterrows():
-                if pd.notna(row['Durée entre indices']):
-                    durées_indices.append({
-                        'Type de Document': doc_type,
-                        'Document': row['Libellé du document'],
-                        'Passage indice': row['Passage indice'],
-                        'Durée entre indices (jours)': row['Durée entre indices']
-                    })
-        df_durées_indices = pd.DataFrame(durées_indices)
+        df_durées_indices = calculer_durees_indices(donnees)
         if not df_durées_indices.empty:
-            st.dataframe(df_durées_indices)
+            afficher_tableau_pagine(df_durées_indices, 'page_durees_indices')
         else:
             st.write("Pas de données disponibles pour les durées entre indices.")
 
@@ -256,8 +247,7 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
         st.header("Évolution des types de documents")
         options_type_document = donnees['TYPE DE DOCUMENT'].unique()
         types_selectionnes = st.multiselect('Sélectionnez les types de document', options_type_document, default=options_type_document[0], key='tab1_types')
-        donnees_groupees = donnees.groupby([donnees['Date dépôt GED'].dt.to_period("M"), 'TYPE DE DOCUMENT']).size().reset_index(name='Nombre de documents')
-        donnees_groupees['Date dépôt GED'] = donnees_groupees['Date dépôt GED'].dt.to_timestamp()
+        donnees_groupees = regroupements.agreger(['Mois', 'TYPE DE DOCUMENT']).rename(columns={'Mois': 'Date dépôt GED'})
         fig = go.Figure()
         for t in types_selectionnes:
             donnees_filtrees = donnees_groupees[donnees_groupees['TYPE DE DOCUMENT'] == t]
@@ -284,28 +274,8 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
         projets_selectionnes = st.multiselect('Sélectionnez les projets', list(projets.keys()), default=list(projets.keys()))
 
         def mise_a_jour_analyse_masse_documents(projets_selectionnes, periode_selectionnee):
-            donnees_barre = []
-            for projet in projets_selectionnes:
-                df = projets[projet]
-                date_debut = df['Date dépôt GED'].min()
-                if periode_selectionnee == '6m':
-                    date_fin = date_debut + timedelta(days=180)  # 6 mois
-                elif periode_selectionnee == '12m':
-                    date_fin = date_debut + timedelta(days=365)  # 12 mois
-                else:
-                    date_fin = df['Date dépôt GED'].max()  # Toute la période
-                df_filtre = df[(df['Date dépôt GED'] >= date_debut) & (df['Date dépôt GED'] <= date_fin)]
-                total_documents = df_filtre.shape[0]
-                donnees_barre.append({
-                    'Chantier': projet,
-                    'Masse de documents': total_documents,
-                    'Date début': date_debut.strftime('%d %b %Y'),
-                    'Date fin': date_fin.strftime('%d %b %Y')
-                })
-            df_barre = pd.DataFrame(donnees_barre)
-            df_barre = df_barre.sort_values(by='Masse de documents', ascending=False)
-            mediane_masse = df_barre['Masse de documents'].median()
-            df_barre['mediane'] = mediane_masse
+            consolide = consolider_donnees_projets({projet: df[['Date dépôt GED']] for projet, df in projets.items()})
+            df_barre = masse_documents_par_projet(consolide, projets_selectionnes, periode_selectionnee)
             
             # Générer des couleurs uniques pour chaque chantier
             couleurs = generate_dynamic_colors(len(df_barre['Chantier']))
@@ -345,21 +315,11 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
     # Onglet 6: Flux des documents
     elif selectionne == "Flux des documents":
         st.header("Flux des documents")
-        total_par_indice = donnees['INDICE'].value_counts(normalize=True) * 100
-        total_par_indice = total_par_indice.reset_index()
-        total_par_indice.columns = ['INDICE', 'Pourcentage']
-        etiquettes_indices_avec_pourcentage = total_par_indice.apply(lambda row: f"{row['INDICE']} ({row['Pourcentage']:.2f}%)", axis=1)
-        map_pourcentage_indice = dict(zip(total_par_indice['INDICE'], etiquettes_indices_avec_pourcentage))
-        donnees['INDICE'] = donnees['INDICE'].map(map_pourcentage_indice)
-        tous_les_noeuds = pd.concat([donnees['PROJET'], donnees['EMET'], donnees['TYPE DE DOCUMENT'], donnees['INDICE']]).unique()
-        tous_les_noeuds = pd.Series(index=tous_les_noeuds, data=range(len(tous_les_noeuds)))
-        source = tous_les_noeuds[donnees['PROJET']].tolist() + tous_les_noeuds[donnees['EMET']].tolist() + tous_les_noeuds[donnees['TYPE DE DOCUMENT']].tolist()
-        cible = tous_les_noeuds[donnees['EMET']].tolist() + tous_les_noeuds[donnees['TYPE DE DOCUMENT']].tolist() + tous_les_noeuds[donnees['INDICE']].tolist()
-        valeur = [1] * len(donnees['PROJET']) + [1] * len(donnees['EMET']) + [1] * len(donnees['TYPE DE DOCUMENT'])
-        etiquettes_noeuds = tous_les_noeuds.index.tolist()
+        nombre_max_noeuds = st.slider('Nombre maximum de valeurs par étape (les autres sont regroupées dans « Autres »)', min_value=5, max_value=100, value=30, key='flux_nombre_max_noeuds')
+        flux = calculer_flux(donnees, nombre_max_noeuds)
         fig = go.Figure(data=[go.Sankey(
-            node=dict(pad=15, thickness=20, line=dict(color='black', width=0.5), label=etiquettes_noeuds),
-            link=dict(source=source, target=cible, value=valeur)
+            node=dict(pad=15, thickness=20, line=dict(color='black', width=0.5), label=flux['etiquettes']),
+            link=dict(source=flux['source'], target=flux['cible'], value=flux['valeur'])
         )])
         fig.add_annotation(x=0.1, y=1.1, text="Projet", showarrow=False, font=dict(size=12, color="blue"))
         fig.add_annotation(x=0.35, y=1.1, text="Émetteur", showarrow=False, font=dict(size=12, color="blue"))
@@ -385,9 +345,8 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
         st.header("Analyse des documents par lot et indice")
         options_indice = donnees['INDICE'].unique()
         indices_selectionnes = st.multiselect('Sélectionnez un ou plusieurs indices', options_indice, key='tab3_indices')
-        if indices_selectionnes:
-            donnees = donnees[donnees['INDICE'].isin(indices_selectionnes)]
-        donnees_groupees_treemap = donnees.groupby(['LOT', 'INDICE']).size().reset_index(name='Nombre de documents')
+        filtres = {'INDICE': indices_selectionnes or None}
+        donnees_groupees_treemap = regroupements.agreger(['LOT', 'INDICE'], filtres=filtres)
         fig_treemap = px.treemap(
             donnees_groupees_treemap,
             path=['LOT', 'INDICE'],
@@ -395,7 +354,7 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
             title='Répartition des documents par lot et indice'
         )
         fig_treemap.update_layout(height=500, width=1200)
-        donnees_groupees_type_indice2 = donnees.groupby(['TYPE DE DOCUMENT', 'INDICE']).size().reset_index(name='Nombre de documents')
+        donnees_groupees_type_indice2 = regroupements.agreger(['TYPE DE DOCUMENT', 'INDICE'], filtres=filtres)
         fig_type_indice2 = px.treemap(
             donnees_groupees_type_indice2,
             path=['TYPE DE DOCUMENT', 'INDICE'],
@@ -403,7 +362,7 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
             title='Répartition des documents par type de documents et indice'
         )
         fig_type_indice2.update_layout(height=550, width=1200)
-        donnees_groupees_type_indice = donnees.groupby(['LOT', 'TYPE DE DOCUMENT', 'INDICE']).size().reset_index(name='Nombre de documents')
+        donnees_groupees_type_indice = regroupements.agreger(['LOT', 'TYPE DE DOCUMENT', 'INDICE'], filtres=filtres)
         fig_type_indice = px.treemap(
             donnees_groupees_type_indice,
             path=['LOT', 'TYPE DE DOCUMENT', 'INDICE'],
@@ -411,7 +370,7 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
             title='Répartition des documents par type de documents, lot et indice'
         )
         fig_type_indice.update_layout(height=800, width=1200)
-        documents_par_lot = donnees.groupby('LOT').size().reset_index(name='Nombre de documents')
+        documents_par_lot = regroupements.agreger(['LOT'], filtres=filtres)
         
         # Générer des couleurs uniques pour chaque lot
         couleurs = generate_dynamic_colors(len(documents_par_lot['LOT']))
@@ -428,7 +387,7 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
         )
         fig_bar_lot.update_layout(yaxis={'categoryorder': 'total ascending'}, height=850, width=1000)
         
-        documents_par_type = donnees.groupby('TYPE DE DOCUMENT').size().reset_index(name='Nombre de documents')
+        documents_par_type = regroupements.agreger(['TYPE DE DOCUMENT'], filtres=filtres)
         
         # Générer des couleurs uniques pour chaque type de document
         couleurs = generate_dynamic_colors(len(documents_par_type['TYPE DE DOCUMENT']))
@@ -457,16 +416,12 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
         categorie_gantt = st.selectbox('Sélectionnez la catégorie', ['LOT', 'TYPE DE DOCUMENT'], key='categorie_gantt')
 
         # Préparer les données pour le diagramme de Gantt
-        donnees_gantt = donnees.groupby(categorie_gantt).agg({
-            'Date dépôt GED': ['min', 'max'],
-            'Libellé du document': 'count'
-        }).reset_index()
-        donnees_gantt.columns = [categorie_gantt, 'Date début', 'Date fin', 'Nombre de documents']
+        donnees_gantt = regroupements.agreger([categorie_gantt], MESURES_CALENDRIER)
         donnees_gantt['Durée en jours'] = (donnees_gantt['Date fin'] - donnees_gantt['Date début']).dt.days
 
         # Ajouter les types de documents utilisés pour chaque lot dans l'ordre d'apparition
         donnees_sorted = donnees.sort_values(by='Date dépôt GED')
-        donnees_gantt['Types de documents'] = donnees_sorted.groupby(categorie_gantt)['TYPE DE DOCUMENT'].apply(lambda x: ', '.join(x.drop_duplicates())).reset_index(drop=True)
+        donnees_gantt['Types de documents'] = donnees_sorted.groupby(categorie_gantt, observed=True)['TYPE DE DOCUMENT'].apply(lambda x: ', '.join(x.drop_duplicates())).reset_index(drop=True)
 
         # Trier les catégories par date de début
         donnees_gantt = donnees_gantt.sort_values('Date début')
@@ -508,17 +463,13 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
     elif selectionne == "Calendrier par Lot":
         st.header("Calendrier par Lot")
         lot_selectionne = st.selectbox('Sélectionnez un Lot', donnees['LOT'].unique())
-        donnees_filtrees = donnees[donnees['LOT'] == lot_selectionne]
+        donnees_filtrees = indexer_lignes(donnees).filtrer(donnees, {'LOT': [lot_selectionne]})
 
-        donnees_gantt = donnees_filtrees.groupby('TYPE DE DOCUMENT').agg({
-            'Date dépôt GED': ['min', 'max'],
-            'Libellé du document': 'count'
-        }).reset_index()
-        donnees_gantt.columns = ['TYPE DE DOCUMENT', 'Date début', 'Date fin', 'Nombre de documents']
+        donnees_gantt = regroupements.agreger(['TYPE DE DOCUMENT'], MESURES_CALENDRIER, {'LOT': [lot_selectionne]})
         donnees_gantt['Durée en jours'] = (donnees_gantt['Date fin'] - donnees_gantt['Date début']).dt.days
 
         donnees_sorted = donnees_filtrees.sort_values(by='Date dépôt GED')
-        donnees_gantt['Types de documents'] = donnees_sorted.groupby('TYPE DE DOCUMENT')['TYPE DE DOCUMENT'].apply(lambda x: ', '.join(x.drop_duplicates())).reset_index(drop=True)
+        donnees_gantt['Types de documents'] = donnees_sorted.groupby('TYPE DE DOCUMENT', observed=True)['TYPE DE DOCUMENT'].apply(lambda x: ', '.join(x.drop_duplicates())).reset_index(drop=True)
         donnees_gantt = donnees_gantt.sort_values('Date début')
         
         # Utiliser une palette de couleurs dynamique pour éviter les répétitions
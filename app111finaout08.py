@@ -6,6 +6,20 @@ from streamlit_option_menu import option_menu
 from datetime import timedelta
 from PIL import Image
 import os
+from cache_disque import charger_export_application, lire_etat_pretraitement, ecrire_etat_pretraitement
+from pretraitement import pretraiter_donnees_incremental, durees_entre_indices, colonnes_cle
+from consolidation import consolider_projets, masse_documents_par_projet
+from affichage import afficher_tableau_pagine, afficher_synthese_par_blocs, afficher_compactage, afficher_rapport_memoire, afficher_statistiques_cache, afficher_avancement_precalcul, afficher_traces, charger_fichiers_en_parallele, choisir_plage_dates
+from memoire import optimiser_types
+from flux import agreger_flux
+from visas import visas_format_long, statistiques_visas, repartition_statuts, etats_visas
+from requetes import creer_requetes, enregistrer_table_polars, RequetesMemorisees, COLONNES_REQUETES, MOTEURS_REQUETES
+from agregats import CubeComptages, agreger_export_par_blocs, TAILLE_MIN_PAR_BLOCS
+from index_projet import IndexDates
+from moteur_polars import charger_export_polars, pretraiter_donnees_polars
+from cache_memoire import CACHE, cache_par_empreinte, cle_argument, empreinte_donnees
+from precalcul import lancer_precalcul
+from instrumentation import instrumenter, mesurer, suivre_execution, taille_figure
 
 # Configurer le thème Streamlit
 st.set_page_config(layout="wide")
@@ -72,50 +86,299 @@ def afficher_logo_sidebar():
     except FileNotFoundError:
         st.sidebar.error(f"Le fichier logo n'a pas été trouvé à l'emplacement : {chemin_logo}")
 
-# Fonction pour charger les données depuis un fichier
-@st.cache_data
+# Fonction pour charger les données depuis un fichier (mis en cache selon l'empreinte du contenu)
+@instrumenter('chargement')
+@cache_par_empreinte
 def charger_donnees(chemin_fichier):
-    spec_types = {
-        'Date dépôt GED': str,
-        'TYPE DE DOCUMENT': str,
-        'PROJET': str,
-        'EMET': str,
-        'LOT': str,
-        'INDICE': str,
-        'Libellé du document': str
-    }
-    donnees = pd.read_csv(chemin_fichier, encoding='iso-8859-1', sep=';', dtype=spec_types, low_memory=False)
-    donnees['Date dépôt GED'] = pd.to_datetime(donnees['Date dépôt GED'], format='%d/%m/%Y', errors='coerce')
-    return donnees
+    return optimiser_types(charger_export_application(chemin_fichier))
 
 # Fonction pour charger les données depuis un fichier téléchargé
-@st.cache_data
 def charger_donnees_uploaded(file):
     return charger_donnees(file)
 
-# Fonction pour prétraiter les données
-@st.cache_data
-def pretraiter_donnees(donnees):
-    donnees = donnees.sort_values(by=['TYPE DE DOCUMENT', 'Date dépôt GED'])
-    group = donnees.groupby(['TYPE DE DOCUMENT', 'LOT', 'Libellé du document'])
-    donnees['Date première version'] = group['Date dépôt GED'].transform('min')
-    donnees['Date dernière version'] = group['Date dépôt GED'].transform('max')
-    donnees['Différence en jours'] = (donnees['Date dernière version'] - donnees['Date première version']).dt.days
-    donnees['Nombre d\'indices'] = group['INDICE'].transform('nunique')
-    
-    # Remplir les valeurs manquantes avant la transformation
-    donnees['INDICE'] = donnees['INDICE'].fillna('')
-    donnees['Indices utilisés'] = group['INDICE'].transform(lambda x: ', '.join(sorted(set(x))))
-
-    # Ajouter les colonnes Date début et Date fin pour chaque LOT
-    donnees['Date début'] = donnees.groupby('LOT')['Date dépôt GED'].transform('min')
-    donnees['Date fin'] = donnees.groupby('LOT')['Date dépôt GED'].transform('max')
-    
-    # Calculer les durées entre chaque version pour chaque document
-    donnees = donnees.sort_values(by=['Libellé du document', 'Date dépôt GED'])
-    donnees['Durée entre versions'] = donnees.groupby('Libellé du document')['Date dépôt GED'].diff().dt.days
-
-    return donnees
+# Fonction pour agréger par blocs un export trop volumineux pour être chargé (mis en cache selon l'empreinte du contenu)
+@instrumenter('chargement')
+@cache_par_empreinte
+def agreger_export(fichier):
+    return agreger_export_par_blocs(fichier)
+
+# Fonction pour prétraiter les données (pour les grands exports, seuls les documents modifiés depuis l'export précédent du projet sont recalculés)
+@instrumenter('pretraitement')
+@cache_par_empreinte
+def pretraiter_donnees(donnees, nom_projet):
+    etat_precedent = lire_etat_pretraitement(nom_projet, colonnes_cle(donnees), {})
+    donnees, etat = pretraiter_donnees_incremental(donnees, etat_precedent)
+    ecrire_etat_pretraitement(nom_projet, etat)
+    return optimiser_types(donnees)
+
+# Fonction pour prétraiter un export avec le plan polars, lu par polars (colonnes des agrégations uniquement) : la table
+# reste en polars pour les requêtes du moteur, seuls leurs résultats sont convertis en pandas
+@instrumenter('pretraitement')
+@cache_par_empreinte
+def pretraiter_export_polars(fichier):
+    return pretraiter_donnees_polars(charger_export_polars(fichier, COLONNES_REQUETES)).collect()
+
+# Fonction pour consolider les dates de dépôt de tous les projets en une seule table
+@cache_par_empreinte
+def consolider_donnees_projets(projets):
+    return consolider_projets(projets)
+
+# Fonction pour agréger les flux du diagramme de Sankey (par projet et nombre de valeurs affichées)
+@cache_par_empreinte
+def calculer_flux(donnees, nombre_max_noeuds):
+    return agreger_flux(donnees, nombre_max_noeuds=nombre_max_noeuds)
+
+# Fonction pour calculer les durées entre indices successifs des documents
+@cache_par_empreinte
+def calculer_durees_indices(donnees):
+    return durees_entre_indices(donnees)
+
+# Fonction pour transformer les visas du projet en table longue (partagée par les sessions, filtrée localement)
+@cache_par_empreinte
+def calculer_visas(donnees):
+    return visas_format_long(donnees)
+
+# Fonction pour ouvrir les agrégations du projet avec le moteur de calcul choisi (base DuckDB conservée entre les exécutions,
+# résultats des requêtes mis en cache)
+@cache_par_empreinte
+def ouvrir_requetes(donnees, moteur):
+    return RequetesMemorisees(creer_requetes(donnees, moteur), (empreinte_donnees(donnees), moteur))
+
+# Fonction pour construire le cube de comptage du projet (LOT, type, indice, émetteur et mois de dépôt)
+@cache_par_empreinte
+def construire_cube(donnees):
+    return CubeComptages(donnees)
+
+# Fonction pour indexer les dates de dépôt du projet (dates triées, premier et dernier dépôt)
+@cache_par_empreinte
+def indexer_dates(donnees):
+    return IndexDates(donnees)
+
+# Fonction pour construire les figures de l'onglet lot et indice (mises en cache par projet et indices sélectionnés)
+@cache_par_empreinte
+def figures_lot_indice(donnees, indices_selectionnes):
+    filtres = {'INDICE': indices_selectionnes} if indices_selectionnes else None
+    # Comptages obtenus en agrégeant ou en découpant le cube du projet (indépendants du nombre de lignes)
+    cube = construire_cube(donnees)
+    donnees_groupees_treemap = cube.comptages(['LOT', 'INDICE'], filtres)
+    fig_treemap = px.treemap(
+        donnees_groupees_treemap,
+        path=['LOT', 'INDICE'],
+        values='Nombre de documents',
+        title='Répartition des documents par lot et indice'
+    )
+    fig_treemap.update_layout(height=500, width=1200)
+    donnees_groupees_type_indice2 = cube.comptages(['TYPE DE DOCUMENT', 'INDICE'], filtres)
+    fig_type_indice2 = px.treemap(
+        donnees_groupees_type_indice2,
+        path=['TYPE DE DOCUMENT', 'INDICE'],
+        values='Nombre de documents',
+        title='Répartition des documents par type de documents et indice'
+    )
+    fig_type_indice2.update_layout(height=550, width=1200)
+    donnees_groupees_type_indice = cube.comptages(['LOT', 'TYPE DE DOCUMENT', 'INDICE'], filtres)
+    fig_type_indice = px.treemap(
+        donnees_groupees_type_indice,
+        path=['LOT', 'TYPE DE DOCUMENT', 'INDICE'],
+        values='Nombre de documents',
+        title='Répartition des documents par type de documents, lot et indice'
+    )
+    fig_type_indice.update_layout(height=800, width=1200)
+    documents_par_lot = cube.comptages(['LOT'], filtres)
+    fig_bar_lot = px.bar(
+        documents_par_lot,
+        y='LOT',
+        x='Nombre de documents',
+        orientation='h',
+        title="Nombre de documents par lot",
+        labels={"LOT": "Lot", "Nombre de documents": "Nombre de documents"},
+        color='Nombre de documents',
+        color_continuous_scale=px.colors.sequential.Viridis
+    )
+    fig_bar_lot.update_layout(yaxis={'categoryorder': 'total ascending'}, height=850, width=1000)
+    documents_par_type = cube.comptages(['TYPE DE DOCUMENT'], filtres)
+    fig_bar_type = px.bar(
+        documents_par_type,
+        y='TYPE DE DOCUMENT',
+        x='Nombre de documents',
+        orientation='h',
+        title="Nombre de documents par type de documents",
+        labels={"TYPE DE DOCUMENT": "Type de documents", "Nombre de documents": "Nombre de documents"},
+        color='Nombre de documents',
+        color_continuous_scale=px.colors.sequential.Viridis
+    )
+    fig_bar_type.update_layout(yaxis={'categoryorder': 'total ascending'}, height=850, width=1200)
+    return fig_treemap, fig_type_indice2, fig_type_indice, fig_bar_lot, fig_bar_type
+
+# Fonction pour construire les figures de l'onglet des acteurs principaux
+@cache_par_empreinte
+def figures_acteurs(donnees, moteur):
+    cube = construire_cube(donnees)
+    fig_emetteur = px.treemap(cube.comptages(['EMET', 'TYPE DE DOCUMENT']), path=['EMET', 'TYPE DE DOCUMENT'], values='Nombre de documents', title='Répartition des types de documents par émetteur')
+    fig_emetteur.update_layout(margin=dict(l=20, r=20, t=40, b=20), height=480, width=1200)
+    fig_ajoute_par = px.treemap(ouvrir_requetes(donnees, moteur).comptages(['Ajouté par', 'TYPE DE DOCUMENT']), path=['Ajouté par', 'TYPE DE DOCUMENT'], values='Nombre de documents', title='Répartition des types de documents par acteur (Ajouté par)')
+    fig_ajoute_par.update_layout(margin=dict(l=20, r=20, t=40, b=20), height=480, width=1200)
+    return fig_emetteur, fig_ajoute_par
+
+# Fonction pour construire le graphique du nombre moyen ou maximum d'indices par type de document
+@cache_par_empreinte
+def figure_nombre_indices(donnees, moteur, type_calcul):
+    requetes = ouvrir_requetes(donnees, moteur)
+    if type_calcul == 'mean':
+        resultats = requetes.indicateur_par_categorie('TYPE DE DOCUMENT', 'Nombre d\'indices', 'mean')
+        title = 'Nombre moyen d\'indices par Type de Document'
+    elif type_calcul == 'max':
+        resultats = requetes.indicateur_par_categorie('TYPE DE DOCUMENT', 'Nombre d\'indices', 'max')
+        title = 'Nombre maximum d\'indices par Type de Document'
+    resultats = resultats.sort_values(by=resultats.columns[1], ascending=False)
+    fig = px.bar(resultats, x='TYPE DE DOCUMENT', y=resultats.columns[1], title=title, color='TYPE DE DOCUMENT', color_discrete_sequence=generate_dynamic_colors(len(resultats)))
+    fig.update_layout(showlegend=True, legend_title_text='Type de Document')
+    fig.update_traces(texttemplate='%{y:.2f}', textposition='outside')
+    return fig
+
+# Fonction pour construire le graphique de la durée moyenne ou maximum entre versions par type de document ou LOT
+@cache_par_empreinte
+def figure_durees_versions(donnees, moteur, type_calcul, categorie):
+    requetes = ouvrir_requetes(donnees, moteur)
+    if type_calcul == 'mean':
+        resultats = requetes.indicateur_par_categorie(categorie, 'Durée entre versions', 'mean')
+        title = f'Durée moyenne entre versions (jours) par {categorie}'
+    elif type_calcul == 'max':
+        resultats = requetes.indicateur_par_categorie(categorie, 'Durée entre versions', 'max')
+        title = f'Durée maximum entre versions (jours) par {categorie}'
+    resultats = resultats.sort_values(by=resultats.columns[1], ascending=False)
+    fig = px.bar(resultats, x=categorie, y=resultats.columns[1], title=title, color=categorie, color_discrete_sequence=generate_dynamic_colors(len(resultats)))
+    fig.update_layout(showlegend=True, legend_title_text=categorie)
+    fig.update_traces(texttemplate='%{y:.2f}', textposition='outside')
+    return fig
+
+# Fonction pour construire le diagramme de Gantt et le tableau récapitulatif du calendrier par LOT ou type de document
+@cache_par_empreinte
+def calendrier_projets(donnees, moteur, categorie_gantt):
+    # Préparer les données pour le diagramme de Gantt
+    # Dates extrêmes, nombre de documents et types de documents utilisés pour chaque catégorie dans l'ordre d'apparition
+    donnees_gantt = ouvrir_requetes(donnees, moteur).calendrier(categorie_gantt)
+
+    # Trier les catégories par date de début
+    donnees_gantt = donnees_gantt.sort_values('Date début')
+
+    # Utiliser une palette de couleurs dynamique pour éviter les répétitions
+    couleurs = generate_dynamic_colors(len(donnees_gantt))
+
+    # S'assurer que les barres sont affichées même si la durée est nulle
+    donnees_gantt['Date fin'] = donnees_gantt.apply(lambda x: x['Date fin'] if x['Durée en jours'] > 0 else x['Date début'] + pd.Timedelta(days=1), axis=1)
+
+    fig_gantt = px.timeline(
+        donnees_gantt,
+        x_start='Date début',
+        x_end='Date fin',
+        y=categorie_gantt,
+        color=categorie_gantt,
+        hover_data=['Durée en jours', 'Nombre de documents', 'Types de documents'],
+        color_discrete_sequence=couleurs,
+        title=f'Calendrier des Projets par {categorie_gantt}'
+    )
+    fig_gantt.update_layout(
+        xaxis_title='Date',
+        yaxis_title=categorie_gantt,
+        height=600,
+        width=1000
+    )
+    fig_gantt.update_traces(
+        hovertemplate=f'<b>{categorie_gantt}:</b> %{{y}}<br><b>Début:</b> %{{base|%d %b %Y}}<br><b>Fin:</b> %{{x|%d %b %Y}}<br><b>Durée:</b> %{{customdata[0]}} jours<br><b>Nombre de documents:</b> %{{customdata[1]}}<br><b>Types de documents:</b> %{{customdata[2]}}'
+    )
+    # Dates du tableau récapitulatif mises en forme
+    donnees_gantt['Date début'] = donnees_gantt['Date début'].dt.strftime('%d %b %Y')
+    donnees_gantt['Date fin'] = donnees_gantt['Date fin'].dt.strftime('%d %b %Y')
+    return fig_gantt, donnees_gantt
+
+# Fonction pour construire le diagramme de Gantt et le tableau récapitulatif des types de documents d'un LOT
+@cache_par_empreinte
+def calendrier_lot(donnees, moteur, lot_selectionne):
+    donnees_gantt = ouvrir_requetes(donnees, moteur).calendrier('TYPE DE DOCUMENT', {'LOT': [lot_selectionne]})
+    donnees_gantt = donnees_gantt.sort_values('Date début')
+    couleurs = generate_dynamic_colors(len(donnees_gantt))
+
+    donnees_gantt['Date fin'] = donnees_gantt.apply(lambda x: x['Date fin'] if x['Durée en jours'] > 0 else x['Date début'] + pd.Timedelta(days=1), axis=1)
+
+    fig_gantt = px.timeline(
+        donnees_gantt,
+        x_start='Date début',
+        x_end='Date fin',
+        y='TYPE DE DOCUMENT',
+        color='TYPE DE DOCUMENT',
+        hover_data=['Durée en jours', 'Nombre de documents', 'Types de documents'],
+        color_discrete_sequence=couleurs,
+        title=f'Calendrier par Lot: {lot_selectionne}'
+    )
+    fig_gantt.update_layout(
+        xaxis_title='Date',
+        yaxis_title='TYPE DE DOCUMENT',
+        height=600,
+        width=1000
+    )
+    fig_gantt.update_traces(
+        hovertemplate=f'<b>Type de Document:</b> %{{y}}<br><b>Début:</b> %{{base|%d %b %Y}}<br><b>Fin:</b> %{{x|%d %b %Y}}<br><b>Durée:</b> %{{customdata[0]}} jours<br><b>Nombre de documents:</b> %{{customdata[1]}}<br><b>Types de documents:</b> %{{customdata[2]}}'
+    )
+    donnees_gantt['Date début'] = donnees_gantt['Date début'].dt.strftime('%d %b %Y')
+    donnees_gantt['Date fin'] = donnees_gantt['Date fin'].dt.strftime('%d %b %Y')
+    return fig_gantt, donnees_gantt
+
+# Fonction pour construire les indicateurs et les graphiques des visas (mis en cache par projet et intervenants sélectionnés)
+@cache_par_empreinte
+def figures_visas(donnees, intervenants_selectionnes):
+    visas = calculer_visas(donnees)
+    if intervenants_selectionnes:
+        visas = visas[visas['Intervenant'].isin(intervenants_selectionnes)]
+    statistiques = statistiques_visas(visas)
+
+    fig_delais = px.bar(
+        statistiques.sort_values('Délai moyen (jours)', ascending=False),
+        x='Intervenant', y='Délai moyen (jours)',
+        title='Délai moyen de réponse par intervenant (jours)',
+        color='Intervenant', color_discrete_sequence=generate_dynamic_colors(len(statistiques))
+    )
+    fig_delais.update_traces(texttemplate='%{y:.1f}', textposition='outside')
+
+    etats = visas.assign(**{'État': etats_visas(visas)}).groupby(['Intervenant', 'État'], observed=True).size().reset_index(name='Nombre de visas')
+    fig_etats = px.bar(
+        etats, x='Intervenant', y='Nombre de visas', color='État',
+        title='Visas répondus, en attente et en retard par intervenant',
+        color_discrete_map={'Répondu': 'green', 'En attente': 'orange', 'En retard': 'red'}
+    )
+
+    repartition = repartition_statuts(visas).reset_index().melt(id_vars='Intervenant', var_name='Statut', value_name='Nombre de visas')
+    fig_statuts = px.bar(
+        repartition[repartition['Nombre de visas'] > 0], x='Intervenant', y='Nombre de visas', color='Statut',
+        title='Répartition des statuts de visa par intervenant'
+    )
+    return statistiques, (fig_delais, fig_etats, fig_statuts)
+
+# Fonction pour lister les calculs de chaque onglet avec les valeurs par défaut de ses widgets
+# (mêmes appels que afficher_graphique, pour que l'onglet retrouve les résultats précalculés dans le cache). Les figures
+# Plotly sont comprises : leur construction représente l'essentiel du temps d'affichage des onglets
+def calculs_onglets(donnees, projets, moteur):
+    requetes = ouvrir_requetes(donnees, moteur)
+    lots = donnees['LOT'].unique()
+    return {
+        "Flux des documents": lambda: calculer_flux(donnees, 30),
+        "Évolution des types de documents": lambda: (indexer_dates(donnees), requetes.evolution_mensuelle()),
+        "Analyse des documents par lot et indice": lambda: figures_lot_indice(donnees, []),
+        "Identification des acteurs principaux": lambda: figures_acteurs(donnees, moteur),
+        "Analyse de la masse de documents par projet": lambda: consolider_donnees_projets(projets),
+        "Nombre d'indices par type de document": lambda: [figure_nombre_indices(donnees, moteur, type_calcul) for type_calcul in ('mean', 'max')],
+        "Durée entre versions de documents": lambda: [figure_durees_versions(donnees, moteur, type_calcul, 'TYPE DE DOCUMENT') for type_calcul in ('mean', 'max')] + [calculer_durees_indices(donnees)],
+        "Calendrier des Projets": lambda: calendrier_projets(donnees, moteur, 'LOT'),
+        "Calendrier par Lot": lambda: calendrier_lot(donnees, moteur, lots[0]) if len(lots) else None,
+        "Suivi des visas": lambda: figures_visas(donnees, []) if not calculer_visas(donnees).empty else None
+    }
+
+# Fonction pour lancer en arrière-plan le précalcul des onglets du projet (l'onglet affiché est calculé en dernier)
+def precalculer_onglets(donnees, projets, moteur, selectionne):
+    def construire_taches():
+        taches = calculs_onglets(donnees, projets, moteur)
+        return {**{onglet: tache for onglet, tache in taches.items() if onglet != selectionne}, selectionne: taches[selectionne]}
+    return lancer_precalcul((empreinte_donnees(donnees), moteur, cle_argument(projets)), construire_taches)
 
 # Fonction pour générer des couleurs dynamiques
 def generate_dynamic_colors(n):
@@ -126,22 +389,29 @@ def afficher_menu():
     with st.sidebar:
         selectionne = option_menu(
             menu_title="Menu",
-            options=["Flux des documents", "Évolution des types de documents", "Analyse des documents par lot et indice", "Identification des acteurs principaux", "Analyse de la masse de documents par projet", "Nombre d'indices par type de document", "Durée entre versions de documents", "Calendrier des Projets", "Calendrier par Lot"],
-            icons=["exchange", "line-chart", "bar-chart", "users", "chart-bar", "file-text", "clock", "calendar", "calendar"],
+            options=["Flux des documents", "Évolution des types de documents", "Analyse des documents par lot et indice", "Identification des acteurs principaux", "Analyse de la masse de documents par projet", "Nombre d'indices par type de document", "Durée entre versions de documents", "Calendrier des Projets", "Calendrier par Lot", "Suivi des visas"],
+            icons=["exchange", "line-chart", "bar-chart", "users", "chart-bar", "file-text", "clock", "calendar", "calendar", "check-square"],
             menu_icon="cast",
             default_index=0,
             orientation="vertical"
         )
     return selectionne
 
-# Fonction pour gérer le téléchargement de fichiers
+# Fonction pour choisir le moteur de calcul des agrégations (DuckDB ou polars si le paquet est installé)
+def choisir_moteur():
+    if len(MOTEURS_REQUETES) == 1:
+        return MOTEURS_REQUETES[0]
+    with st.sidebar:
+        return st.selectbox('Moteur de calcul', MOTEURS_REQUETES, key='moteur_requetes')
+
+# Fonction pour gérer le téléchargement de fichiers (les exports volumineux sont agrégés par blocs au lieu d'être chargés).
+# Les fichiers chargés sont aussi rendus par nom pour que le moteur polars les relise lui-même
 def gerer_telechargement():
-    uploaded_files = st.file_uploader("Téléchargez vos fichiers CSV", type=["csv"], accept_multiple_files=True)
-    projets = {}
-    if uploaded_files:
-        for uploaded_file in uploaded_files:
-            projets[uploaded_file.name] = charger_donnees_uploaded(uploaded_file)
-    return projets
+    uploaded_files = st.file_uploader("Téléchargez vos fichiers CSV", type=["csv"], accept_multiple_files=True) or []
+    fichiers = [fichier for fichier in uploaded_files if fichier.size < TAILLE_MIN_PAR_BLOCS]
+    grands_exports = {fichier.name: agreger_export(fichier) for fichier in uploaded_files if fichier.size >= TAILLE_MIN_PAR_BLOCS}
+    sources = {fichier.name: fichier for fichier in fichiers}
+    return charger_fichiers_en_parallele(fichiers, charger_donnees_uploaded), grands_exports, sources
 
 # Fonction pour synchroniser les filtres entre les onglets
 def synchroniser_filtres(projets):
@@ -151,41 +421,41 @@ def synchroniser_filtres(projets):
     st.session_state['projet_selectionne'] = projet_selectionne
     return projets[projet_selectionne], projet_selectionne
 
+# Fonction pour afficher une figure Plotly en mesurant son envoi (durée et taille de la figure sérialisée, calculée
+# avant l'envoi pour ne pas compter dans la durée)
+def afficher_figure(figure):
+    octets = taille_figure(figure)
+    with mesurer('figure') as mesure:
+        st.plotly_chart(figure, use_container_width=True)
+        mesure['octets_figure'] = octets
+
 # Fonction pour afficher les graphiques selon l'onglet sélectionné
-def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
+def afficher_graphique(selectionne, donnees, projets, projet_selectionne, moteur='pandas'):
+    requetes = ouvrir_requetes(donnees, moteur)
     # Onglet 1: Flux des documents
     if selectionne == "Flux des documents":
         st.header("Flux des documents")
-        total_par_indice = donnees['INDICE'].value_counts(normalize=True) * 100
-        total_par_indice = total_par_indice.reset_index()
-        total_par_indice.columns = ['INDICE', 'Pourcentage']
-        etiquettes_indices_avec_pourcentage = total_par_indice.apply(lambda row: f"{row['INDICE']} ({row['Pourcentage']:.2f}%)", axis=1)
-        map_pourcentage_indice = dict(zip(total_par_indice['INDICE'], etiquettes_indices_avec_pourcentage))
-        donnees['INDICE'] = donnees['INDICE'].map(map_pourcentage_indice)
-        tous_les_noeuds = pd.concat([donnees['PROJET'], donnees['EMET'], donnees['TYPE DE DOCUMENT'], donnees['INDICE']]).unique()
-        tous_les_noeuds = pd.Series(index=tous_les_noeuds, data=range(len(tous_les_noeuds)))
-        source = tous_les_noeuds[donnees['PROJET']].tolist() + tous_les_noeuds[donnees['EMET']].tolist() + tous_les_noeuds[donnees['TYPE DE DOCUMENT']].tolist()
-        cible = tous_les_noeuds[donnees['EMET']].tolist() + tous_les_noeuds[donnees['TYPE DE DOCUMENT']].tolist() + tous_les_noeuds[donnees['INDICE']].tolist()
-        valeur = [1] * len(donnees['PROJET']) + [1] * len(donnees['EMET']) + [1] * len(donnees['TYPE DE DOCUMENT'])
-        etiquettes_noeuds = tous_les_noeuds.index.tolist()
+        nombre_max_noeuds = st.slider('Nombre maximum de valeurs par étape (les autres sont regroupées dans « Autres »)', min_value=5, max_value=100, value=30, key='flux_nombre_max_noeuds')
+        flux = calculer_flux(donnees, nombre_max_noeuds)
         fig = go.Figure(data=[go.Sankey(
-            node=dict(pad=15, thickness=20, line=dict(color='black', width=0.5), label=etiquettes_noeuds),
-            link=dict(source=source, target=cible, value=valeur)
+            node=dict(pad=15, thickness=20, line=dict(color='black', width=0.5), label=flux['etiquettes']),
+            link=dict(source=flux['source'], target=flux['cible'], value=flux['valeur'])
         )])
         fig.add_annotation(x=0.1, y=1.1, text="Projet", showarrow=False, font=dict(size=12, color="blue"))
         fig.add_annotation(x=0.35, y=1.1, text="Émetteur", showarrow=False, font=dict(size=12, color="blue"))
         fig.add_annotation(x=0.6, y=1.1, text="Type de Document", showarrow=False, font=dict(size=12, color="blue"))
         fig.add_annotation(x=0.9, y=1.1, text="Indice", showarrow=False, font=dict(size=12, color="blue"))
         fig.update_layout(title_text="", font_size=10, margin=dict(l=0, r=0, t=40, b=0))
-        st.plotly_chart(fig, use_container_width=True)
+        afficher_figure(fig)
 
     # Onglet 2: Évolution des types de documents
     elif selectionne == "Évolution des types de documents":
         st.header("Évolution des types de documents")
         options_type_document = donnees['TYPE DE DOCUMENT'].unique()
         types_selectionnes = st.multiselect('Sélectionnez les types de document', options_type_document, default=options_type_document[0], key='tab1_types')
-        donnees_groupees = donnees.groupby([donnees['Date dépôt GED'].dt.to_period("M"), 'TYPE DE DOCUMENT']).size().reset_index(name='Nombre de documents')
-        donnees_groupees['Date dépôt GED'] = donnees_groupees['Date dépôt GED'].dt.to_timestamp()
+        # Toute la période par défaut : même appel que le précalcul de l'onglet
+        plage = choisir_plage_dates(indexer_dates(donnees), 'tab1_plage')
+        donnees_groupees = requetes.evolution_mensuelle({'periode': plage}) if plage is not None else requetes.evolution_mensuelle()
         fig = go.Figure()
         for t in types_selectionnes:
             donnees_filtrees = donnees_groupees[donnees_groupees['TYPE DE DOCUMENT'] == t]
@@ -198,80 +468,21 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
             legend_title='Type de Documents',
             height=500, width=1200
         )
-        st.plotly_chart(fig, use_container_width=True)
+        afficher_figure(fig)
 
     # Onglet 3: Analyse des documents par lot et indice
     elif selectionne == "Analyse des documents par lot et indice":
         st.header("Analyse des documents par lot et indice")
         options_indice = donnees['INDICE'].unique()
         indices_selectionnes = st.multiselect('Sélectionnez un ou plusieurs indices', options_indice, key='tab3_indices')
-        if indices_selectionnes:
-            donnees = donnees[donnees['INDICE'].isin(indices_selectionnes)]
-        donnees_groupees_treemap = donnees.groupby(['LOT', 'INDICE']).size().reset_index(name='Nombre de documents')
-        fig_treemap = px.treemap(
-            donnees_groupees_treemap,
-            path=['LOT', 'INDICE'],
-            values='Nombre de documents',
-            title='Répartition des documents par lot et indice'
-        )
-        fig_treemap.update_layout(height=500, width=1200)
-        donnees_groupees_type_indice2 = donnees.groupby(['TYPE DE DOCUMENT', 'INDICE']).size().reset_index(name='Nombre de documents')
-        fig_type_indice2 = px.treemap(
-            donnees_groupees_type_indice2,
-            path=['TYPE DE DOCUMENT', 'INDICE'],
-            values='Nombre de documents',
-            title='Répartition des documents par type de documents et indice'
-        )
-        fig_type_indice2.update_layout(height=550, width=1200)
-        donnees_groupees_type_indice = donnees.groupby(['LOT', 'TYPE DE DOCUMENT', 'INDICE']).size().reset_index(name='Nombre de documents')
-        fig_type_indice = px.treemap(
-            donnees_groupees_type_indice,
-            path=['LOT', 'TYPE DE DOCUMENT', 'INDICE'],
-            values='Nombre de documents',
-            title='Répartition des documents par type de documents, lot et indice'
-        )
-        fig_type_indice.update_layout(height=800, width=1200)
-        documents_par_lot = donnees.groupby('LOT').size().reset_index(name='Nombre de documents')
-        fig_bar_lot = px.bar(
-            documents_par_lot,
-            y='LOT',
-            x='Nombre de documents',
-            orientation='h',
-            title="Nombre de documents par lot",
-            labels={"LOT": "Lot", "Nombre de documents": "Nombre de documents"},
-            color='Nombre de documents',
-            color_continuous_scale=px.colors.sequential.Viridis
-        )
-        fig_bar_lot.update_layout(yaxis={'categoryorder': 'total ascending'}, height=850, width=1000)
-        documents_par_type = donnees.groupby('TYPE DE DOCUMENT').size().reset_index(name='Nombre de documents')
-        fig_bar_type = px.bar(
-            documents_par_type,
-            y='TYPE DE DOCUMENT',
-            x='Nombre de documents',
-            orientation='h',
-            title="Nombre de documents par type de documents",
-            labels={"TYPE DE DOCUMENT": "Type de documents", "Nombre de documents": "Nombre de documents"},
-            color='Nombre de documents',
-            color_continuous_scale=px.colors.sequential.Viridis
-        )
-        fig_bar_type.update_layout(yaxis={'categoryorder': 'total ascending'}, height=850, width=1200)
-        st.plotly_chart(fig_treemap, use_container_width=True)
-        st.plotly_chart(fig_type_indice2, use_container_width=True)
-        st.plotly_chart(fig_type_indice, use_container_width=True)
-        st.plotly_chart(fig_bar_lot, use_container_width=True)
-        st.plotly_chart(fig_bar_type, use_container_width=True)
+        for figure in figures_lot_indice(donnees, indices_selectionnes):
+            afficher_figure(figure)
 
     # Onglet 4: Identification des acteurs principaux
     elif selectionne == "Identification des acteurs principaux":
         st.header("Identification des acteurs principaux")
-        donnees['Date dépôt GED'] = pd.to_datetime(donnees['Date dépôt GED'], format='%d/%m/%Y')
-        donnees['Année'] = donnees['Date dépôt GED'].dt.year
-        fig_emetteur = px.treemap(donnees, path=['EMET', 'TYPE DE DOCUMENT'], title='Répartition des types de documents par émetteur')
-        fig_emetteur.update_layout(margin=dict(l=20, r=20, t=40, b=20), height=480, width=1200)
-        st.plotly_chart(fig_emetteur, use_container_width=True)
-        fig_ajoute_par = px.treemap(donnees, path=['Ajouté par', 'TYPE DE DOCUMENT'], title='Répartition des types de documents par acteur (Ajouté par)')
-        fig_ajoute_par.update_layout(margin=dict(l=20, r=20, t=40, b=20), height=480, width=1200)
-        st.plotly_chart(fig_ajoute_par, use_container_width=True)
+        for figure in figures_acteurs(donnees, moteur):
+            afficher_figure(figure)
 
     # Onglet 5: Analyse de la masse de documents par projet
     elif selectionne == "Analyse de la masse de documents par projet":
@@ -285,28 +496,8 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
         projets_selectionnes = st.multiselect('Sélectionnez les projets', list(projets.keys()), default=list(projets.keys()))
 
         def mise_a_jour_analyse_masse_documents(projets_selectionnes, periode_selectionnee):
-            donnees_barre = []
-            for projet in projets_selectionnes:
-                df = projets[projet]
-                date_debut = df['Date dépôt GED'].min()
-                if periode_selectionnee == '6m':
-                    date_fin = date_debut + timedelta(days=180)  # 6 mois
-                elif periode_selectionnee == '12m':
-                    date_fin = date_debut + timedelta(days=365)  # 12 mois
-                else:
-                    date_fin = df['Date dépôt GED'].max()  # Toute la période
-                df_filtre = df[(df['Date dépôt GED'] >= date_debut) & (df['Date dépôt GED'] <= date_fin)]
-                total_documents = df_filtre.shape[0]
-                donnees_barre.append({
-                    'Chantier': projet,
-                    'Masse de documents': total_documents,
-                    'Date début': date_debut.strftime('%d %b %Y'),
-                    'Date fin': date_fin.strftime('%d %b %Y')
-                })
-            df_barre = pd.DataFrame(donnees_barre)
-            df_barre = df_barre.sort_values(by='Masse de documents', ascending=False)
-            mediane_masse = df_barre['Masse de documents'].median()
-            df_barre['mediane'] = mediane_masse
+            consolide = consolider_donnees_projets(projets)
+            df_barre = masse_documents_par_projet(consolide, projets_selectionnes, periode_selectionnee)
             fig_barre = go.Figure()
             fig_barre.add_trace(go.Bar(
                 x=df_barre['Chantier'], y=df_barre['Masse de documents'],
@@ -337,7 +528,7 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
             return fig_barre
 
         fig1 = mise_a_jour_analyse_masse_documents(projets_selectionnes, periode_selectionnee)
-        st.plotly_chart(fig1, use_container_width=True)
+        afficher_figure(fig1)
 
     # Onglet 6: Nombre d'indices par type de document
     elif selectionne == "Nombre d'indices par type de document":
@@ -346,24 +537,14 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
         representation = st.selectbox('Sélectionnez le type de représentation', ['Graphique barre', 'Tableau'], key='rep_indices_type', index=0)  # Par défaut à "Graphique barre"
         if representation == "Tableau":
             if type_calcul == 'mean':
-                resultats = donnees.groupby('TYPE DE DOCUMENT')['Nombre d\'indices'].mean().reset_index()
+                resultats = requetes.indicateur_par_categorie('TYPE DE DOCUMENT', 'Nombre d\'indices', 'mean')
                 resultats.columns = ['TYPE DE DOCUMENT', 'Nombre moyen d\'indices']
             elif type_calcul == 'max':
-                resultats = donnees.groupby('TYPE DE DOCUMENT')['Nombre d\'indices'].max().reset_index()
+                resultats = requetes.indicateur_par_categorie('TYPE DE DOCUMENT', 'Nombre d\'indices', 'max')
                 resultats.columns = ['TYPE DE DOCUMENT', 'Nombre maximum d\'indices']
             st.dataframe(resultats)
         elif representation == "Graphique barre":
-            if type_calcul == 'mean':
-                resultats = donnees.groupby('TYPE DE DOCUMENT')['Nombre d\'indices'].mean().reset_index()
-                title = 'Nombre moyen d\'indices par Type de Document'
-            elif type_calcul == 'max':
-                resultats = donnees.groupby('TYPE DE DOCUMENT')['Nombre d\'indices'].max().reset_index()
-                title = 'Nombre maximum d\'indices par Type de Document'
-            resultats = resultats.sort_values(by=resultats.columns[1], ascending=False)
-            fig = px.bar(resultats, x='TYPE DE DOCUMENT', y=resultats.columns[1], title=title, color='TYPE DE DOCUMENT', color_discrete_sequence=generate_dynamic_colors(len(resultats)))
-            fig.update_layout(showlegend=True, legend_title_text='Type de Document')
-            fig.update_traces(texttemplate='%{y:.2f}', textposition='outside')
-            st.plotly_chart(fig, use_container_width=True)
+            afficher_figure(figure_nombre_indices(donnees, moteur, type_calcul))
 
     # Onglet 7: Durée entre versions de documents
     elif selectionne == "Durée entre versions de documents":
@@ -374,44 +555,21 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
         
         if representation == "Tableau":
             if type_calcul == 'mean':
-                resultats = donnees.groupby(categorie)['Durée entre versions'].mean().reset_index()
+                resultats = requetes.indicateur_par_categorie(categorie, 'Durée entre versions', 'mean')
                 resultats.columns = [categorie, 'Durée moyenne entre versions (jours)']
             elif type_calcul == 'max':
-                resultats = donnees.groupby(categorie)['Durée entre versions'].max().reset_index()
+                resultats = requetes.indicateur_par_categorie(categorie, 'Durée entre versions', 'max')
                 resultats.columns = [categorie, 'Durée maximum entre versions (jours)']
             resultats = resultats.sort_values(by=resultats.columns[1], ascending=False)
             st.dataframe(resultats)
         elif representation == "Graphique barre":
-            if type_calcul == 'mean':
-                resultats = donnees.groupby(categorie)['Durée entre versions'].mean().reset_index()
-                title = f'Durée moyenne entre versions (jours) par {categorie}'
-            elif type_calcul == 'max':
-                resultats = donnees.groupby(categorie)['Durée entre versions'].max().reset_index()
-                title = f'Durée maximum entre versions (jours) par {categorie}'
-            resultats = resultats.sort_values(by=resultats.columns[1], ascending=False)
-            fig = px.bar(resultats, x=categorie, y=resultats.columns[1], title=title, color=categorie, color_discrete_sequence=generate_dynamic_colors(len(resultats)))
-            fig.update_layout(showlegend=True, legend_title_text=categorie)
-            fig.update_traces(texttemplate='%{y:.2f}', textposition='outside')
-            st.plotly_chart(fig, use_container_width=True)
+            afficher_figure(figure_durees_versions(donnees, moteur, type_calcul, categorie))
 
         # Calcul des durées entre indices pour chaque type de document
         st.subheader("Durées entre indices par type de document")
-        durées_indices = []
-        for doc_type, group in donnees.groupby('TYPE DE DOCUMENT'):
-            group = group.sort_values(by=['Libellé du document', 'INDICE'])
-            group['Durée entre indices'] = group.groupby('Libellé du document')['Date dépôt GED'].diff().dt.days
-            group['Passage indice'] = group.groupby('Libellé du document')['INDICE'].transform(lambda x: x.shift(1) + ' à ' + x)
-            for _, row in group.iterrows():
-                if pd.notna(row['Durée entre indices']):
-                    durées_indices.append({
-                        'Type de Document': doc_type,
-                        'Document': row['Libellé du document'],
-                        'Passage indice': row['Passage indice'],
-                        'Durée entre indices (jours)': row['Durée entre indices']
-                    })
-        df_durées_indices = pd.DataFrame(durées_indices)
+        df_durées_indices = calculer_durees_indices(donnees)
         if not df_durées_indices.empty:
-            st.dataframe(df_durées_indices)
+            afficher_tableau_pagine(df_durées_indices, 'page_durees_indices')
         else:
             st.write("Pas de données disponibles pour les durées entre indices.")
 
@@ -421,51 +579,10 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
         # Ajouter le selectbox pour choisir entre "Lot" et "Type de Document"
         categorie_gantt = st.selectbox('Sélectionnez la catégorie', ['LOT', 'TYPE DE DOCUMENT'], key='categorie_gantt')  # Choix entre Lot et Type de Document
 
-        # Préparer les données pour le diagramme de Gantt
-        donnees_gantt = donnees.groupby(categorie_gantt).agg({
-            'Date dépôt GED': ['min', 'max'],
-            'Libellé du document': 'count'
-        }).reset_index()
-        donnees_gantt.columns = [categorie_gantt, 'Date début', 'Date fin', 'Nombre de documents']
-        donnees_gantt['Durée en jours'] = (donnees_gantt['Date fin'] - donnees_gantt['Date début']).dt.days
-
-        # Ajouter les types de documents utilisés pour chaque lot dans l'ordre d'apparition
-        donnees_sorted = donnees.sort_values(by='Date dépôt GED')
-        donnees_gantt['Types de documents'] = donnees_sorted.groupby(categorie_gantt)['TYPE DE DOCUMENT'].apply(lambda x: ', '.join(x.drop_duplicates())).reset_index(drop=True)
-
-        # Trier les catégories par date de début
-        donnees_gantt = donnees_gantt.sort_values('Date début')
-
-        # Utiliser une palette de couleurs dynamique pour éviter les répétitions
-        couleurs = generate_dynamic_colors(len(donnees_gantt))
-
-        # S'assurer que les barres sont affichées même si la durée est nulle
-        donnees_gantt['Date fin'] = donnees_gantt.apply(lambda x: x['Date fin'] if x['Durée en jours'] > 0 else x['Date début'] + pd.Timedelta(days=1), axis=1)
-
-        fig_gantt = px.timeline(
-            donnees_gantt,
-            x_start='Date début',
-            x_end='Date fin',
-            y=categorie_gantt,
-            color=categorie_gantt,
-            hover_data=['Durée en jours', 'Nombre de documents', 'Types de documents'],
-            color_discrete_sequence=couleurs,
-            title=f'Calendrier des Projets par {categorie_gantt}'
-        )
-        fig_gantt.update_layout(
-            xaxis_title='Date',
-            yaxis_title=categorie_gantt,
-            height=600,
-            width=1000
-        )
-        fig_gantt.update_traces(
-            hovertemplate=f'<b>{categorie_gantt}:</b> %{{y}}<br><b>Début:</b> %{{base|%d %b %Y}}<br><b>Fin:</b> %{{x|%d %b %Y}}<br><b>Durée:</b> %{{customdata[0]}} jours<br><b>Nombre de documents:</b> %{{customdata[1]}}<br><b>Types de documents:</b> %{{customdata[2]}}'
-        )
-        st.plotly_chart(fig_gantt, use_container_width=True)
+        fig_gantt, donnees_gantt = calendrier_projets(donnees, moteur, categorie_gantt)
+        afficher_figure(fig_gantt)
 
         # Afficher le tableau récapitulatif
-        donnees_gantt['Date début'] = donnees_gantt['Date début'].dt.strftime('%d %b %Y')
-        donnees_gantt['Date fin'] = donnees_gantt['Date fin'].dt.strftime('%d %b %Y')
         st.subheader("Détails des projets")
         st.dataframe(donnees_gantt)
 
@@ -473,58 +590,76 @@ def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
     elif selectionne == "Calendrier par Lot":
         st.header("Calendrier par Lot")
         lot_selectionne = st.selectbox('Sélectionnez un Lot', donnees['LOT'].unique())
-        donnees_filtrees = donnees[donnees['LOT'] == lot_selectionne]
-
-        donnees_gantt = donnees_filtrees.groupby('TYPE DE DOCUMENT').agg({
-            'Date dépôt GED': ['min', 'max'],
-            'Libellé du document': 'count'
-        }).reset_index()
-        donnees_gantt.columns = ['TYPE DE DOCUMENT', 'Date début', 'Date fin', 'Nombre de documents']
-        donnees_gantt['Durée en jours'] = (donnees_gantt['Date fin'] - donnees_gantt['Date début']).dt.days
-
-        donnees_sorted = donnees_filtrees.sort_values(by='Date dépôt GED')
-        donnees_gantt['Types de documents'] = donnees_sorted.groupby('TYPE DE DOCUMENT')['TYPE DE DOCUMENT'].apply(lambda x: ', '.join(x.drop_duplicates())).reset_index(drop=True)
-        donnees_gantt = donnees_gantt.sort_values('Date début')
-        couleurs = generate_dynamic_colors(len(donnees_gantt))
-
-        donnees_gantt['Date fin'] = donnees_gantt.apply(lambda x: x['Date fin'] if x['Durée en jours'] > 0 else x['Date début'] + pd.Timedelta(days=1), axis=1)
-
-        fig_gantt = px.timeline(
-            donnees_gantt,
-            x_start='Date début',
-            x_end='Date fin',
-            y='TYPE DE DOCUMENT',
-            color='TYPE DE DOCUMENT',
-            hover_data=['Durée en jours', 'Nombre de documents', 'Types de documents'],
-            color_discrete_sequence=couleurs,
-            title=f'Calendrier par Lot: {lot_selectionne}'
-        )
-        fig_gantt.update_layout(
-            xaxis_title='Date',
-            yaxis_title='TYPE DE DOCUMENT',
-            height=600,
-            width=1000
-        )
-        fig_gantt.update_traces(
-            hovertemplate=f'<b>Type de Document:</b> %{{y}}<br><b>Début:</b> %{{base|%d %b %Y}}<br><b>Fin:</b> %{{x|%d %b %Y}}<br><b>Durée:</b> %{{customdata[0]}} jours<br><b>Nombre de documents:</b> %{{customdata[1]}}<br><b>Types de documents:</b> %{{customdata[2]}}'
-        )
-        st.plotly_chart(fig_gantt, use_container_width=True)
+        fig_gantt, donnees_gantt = calendrier_lot(donnees, moteur, lot_selectionne)
+        afficher_figure(fig_gantt)
 
-        donnees_gantt['Date début'] = donnees_gantt['Date début'].dt.strftime('%d %b %Y')
-        donnees_gantt['Date fin'] = donnees_gantt['Date fin'].dt.strftime('%d %b %Y')
         st.subheader("Détails du Lot")
         st.dataframe(donnees_gantt)
 
+    # Onglet 10: Suivi des visas
+    elif selectionne == "Suivi des visas":
+        st.header("Suivi des visas")
+        visas = calculer_visas(donnees)
+        if visas.empty:
+            st.write("Aucune colonne de visa dans cet export.")
+            return
+        intervenants_selectionnes = st.multiselect('Sélectionnez les intervenants', visas['Intervenant'].cat.categories, key='visas_intervenants')
+        statistiques, figures = figures_visas(donnees, intervenants_selectionnes)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Visas demandés", int(statistiques['Demandes'].sum()))
+        col2.metric("Visas en attente", int(statistiques['En attente'].sum()))
+        col3.metric("Visas en retard", int(statistiques['En retard'].sum()))
+        for figure in figures:
+            afficher_figure(figure)
+
+        st.subheader("Indicateurs par intervenant")
+        st.dataframe(statistiques)
+
+# Fragment de l'onglet sélectionné : un changement de ses widgets ne réexécute que l'onglet
+# (sans rechargement des logos, des fichiers téléchargés ni recherche du prétraitement)
+@st.fragment
+def afficher_onglet(selectionne, donnees, projets, projet_selectionne, moteur='pandas'):
+    # Lors d'une réexécution du fragment seul, ses mesures forment une exécution à part dans le journal
+    with suivre_execution('fragment') as execution:
+        execution.onglet = selectionne
+        with mesurer('onglet', onglet=selectionne, lignes_entree=len(donnees)):
+            afficher_graphique(selectionne, donnees, projets, projet_selectionne, moteur)
+
+# Fonction pour exécuter l'application complète (une exécution par changement d'onglet, de projet ou de fichiers)
+def executer_application():
+    with suivre_execution('complète') as execution:
+        afficher_logo()
+        style_entete()
+        afficher_logo_sidebar()
+        selectionne = afficher_menu()
+        execution.onglet = selectionne
+        moteur = choisir_moteur()
+        projets, grands_exports, sources = gerer_telechargement()
+        for nom, agregats in grands_exports.items():
+            afficher_synthese_par_blocs(nom, agregats)
+        if projets:
+            donnees, projet_selectionne = synchroniser_filtres(projets)
+            # L'état incrémental est rattaché au projet de l'export, à défaut au nom du fichier
+            noms_projet = donnees['PROJET'].dropna() if 'PROJET' in donnees.columns else []
+            nom_projet = str(noms_projet.iloc[0]) if len(noms_projet) else projet_selectionne
+            donnees = pretraiter_donnees(donnees, nom_projet)
+            # Les onglets hors requêtes lisent le tableau pandas commun à tous les moteurs ; le moteur polars interroge
+            # sa propre table, prétraitée par polars depuis l'export sans passer par pandas
+            if moteur == 'polars':
+                enregistrer_table_polars(donnees, pretraiter_export_polars(sources[projet_selectionne]))
+            afficher_compactage(donnees)
+            afficher_rapport_memoire(donnees)
+            precalcul = precalculer_onglets(donnees, projets, moteur, selectionne)
+            afficher_onglet(selectionne, donnees, projets, projet_selectionne, moteur)
+            afficher_statistiques_cache(CACHE.statistiques())
+            # L'avancement est rafraîchi chaque seconde tant que des onglets restent à calculer
+            en_cours = not precalcul.termine()
+            with st.sidebar:
+                st.fragment(afficher_avancement_precalcul, run_every=1 if en_cours else None)(precalcul, en_cours)
+            afficher_traces(execution)
+        elif not grands_exports:
+            st.write("Veuillez télécharger des fichiers CSV pour continuer.")
+
 # Exécution principale de l'application
 if __name__ == '__main__':
-    afficher_logo()
-    style_entete()
-    afficher_logo_sidebar()
-    selectionne = afficher_menu()
-    projets = gerer_telechargement()
-    if projets:
-        donnees, projet_selectionne = synchroniser_filtres(projets)
-        donnees = pretraiter_donnees(donnees)
-        afficher_graphique(selectionne, donnees, projets, projet_selectionne)
-    else:
-        st.write("Veuillez télécharger des fichiers CSV pour continuer.")
+    executer_application()
@@ -0,0 +1,964 @@
+import argparse
+import gc
+import importlib
+import inspect
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from chargement import charger_export, memoire_colonnes, COLONNES_TABLEAU_DE_BORD, ENCODAGE, SEPARATEUR, COLONNES_NUMERO, COLONNE_DATE
+from pretraitement import pretraiter_donnees_vectorise, pretraiter_donnees_incremental, colonnes_cle, LIGNES_MIN_INCREMENTALES
+from agregats import agreger_export_par_blocs, CubeComptages, EnsemblesRegroupement, TAILLE_BLOC
+from requetes import creer_requetes, filtrer_donnees, MOTEURS_REQUETES
+from index_projet import IndexBitmaps, IndexDates
+from moteur_polars import charger_export_polars, pretraiter_donnees_polars, vers_pandas
+from precalcul import attendre_precalculs, vider_precalculs
+from cache_memoire import CheminFichier
+from cache_disque import ecrire_etat_pretraitement, lire_etat_pretraitement
+from segmentation import SegmentationDates, NOMBRE_MAX_CLASSES
+from memoire import optimiser_types
+from visas import colonnes_avec_visas
+
+try:
+    from sklearn.cluster import KMeans
+except ImportError:
+    KMeans = None
+
+# Exports fournis avec le dépôt
+FICHIERS_EXEMPLES = ['GOODLIFE.csv', 'GOODLIFE01.csv', 'LEDGER.csv', 'MDLF.csv', '40_LAFFITE.csv', 'PECM.csv']
+
+# Fonction reproduisant le chargeur historique des applications
+def charger_donnees_historique(chemin_fichier):
+    spec_types = {
+        'Date dépôt GED': str,
+        'TYPE DE DOCUMENT': str,
+        'PROJET': str,
+        'EMET': str,
+        'LOT': str,
+        'INDICE': str,
+        'Libellé du document': str
+    }
+    donnees = pd.read_csv(chemin_fichier, encoding='iso-8859-1', sep=';', dtype=spec_types, low_memory=False)
+    donnees['Date dépôt GED'] = pd.to_datetime(donnees['Date dépôt GED'], format='%d/%m/%Y', errors='coerce')
+    return donnees
+
+# Fonction reproduisant le prétraitement historique des applications (avec ses variantes)
+def pretraiter_donnees_historique(donnees, colonne_nombre_indices='Nombre d\'indices', dates_lot=True,
+                                  remplir_durees=False, duree_moyenne_par_type=False):
+    donnees = donnees.sort_values(by=['TYPE DE DOCUMENT', 'Date dépôt GED'])
+    group = donnees.groupby(['TYPE DE DOCUMENT', 'LOT', 'Libellé du document'], observed=True)
+    donnees['Date première version'] = group['Date dépôt GED'].transform('min')
+    donnees['Date dernière version'] = group['Date dépôt GED'].transform('max')
+    donnees['Différence en jours'] = (donnees['Date dernière version'] - donnees['Date première version']).dt.days
+    donnees[colonne_nombre_indices] = group['INDICE'].transform('nunique')
+
+    # Remplir les valeurs manquantes avant la transformation
+    if isinstance(donnees['INDICE'].dtype, pd.CategoricalDtype):
+        donnees['INDICE'] = donnees['INDICE'].cat.add_categories(['']).fillna('')
+    else:
+        donnees['INDICE'] = donnees['INDICE'].fillna('')
+    donnees['Indices utilisés'] = group['INDICE'].transform(lambda x: ', '.join(sorted(set(x))))
+
+    # Ajouter les colonnes Date début et Date fin pour chaque LOT
+    if dates_lot:
+        donnees['Date début'] = donnees.groupby('LOT', observed=True)['Date dépôt GED'].transform('min')
+        donnees['Date fin'] = donnees.groupby('LOT', observed=True)['Date dépôt GED'].transform('max')
+
+    # Calculer les durées entre chaque version pour chaque document
+    donnees = donnees.sort_values(by=['Libellé du document', 'Date dépôt GED'])
+    donnees['Durée entre versions'] = donnees.groupby('Libellé du document', observed=True)['Date dépôt GED'].diff().dt.days
+    if remplir_durees:
+        donnees['Durée entre versions'] = donnees['Durée entre versions'].fillna(0)
+    if duree_moyenne_par_type:
+        donnees['Durée moyenne entre versions'] = donnees.groupby('TYPE DE DOCUMENT', observed=True)['Durée entre versions'].transform('mean')
+    return donnees
+
+# Variantes du prétraitement présentes dans les applications
+VARIANTES_PRETRAITEMENT = {
+    'ap01, outil*, sal*, wahib*': {'remplir_durees': True},
+    'app111finaout08, stats*': {},
+    'ap02, ff': {'colonne_nombre_indices': 'Nombre moyen d\'indices', 'remplir_durees': True},
+    'ap04, appp01': {'colonne_nombre_indices': 'Nombre moyen d\'indices', 'remplir_durees': True, 'duree_moyenne_par_type': True},
+    'analyse': {'dates_lot': False, 'remplir_durees': True}
+}
+
+# Fonction pour mesurer le meilleur temps d'exécution sur plusieurs répétitions
+def mesurer(fonction, repetitions):
+    meilleur = None
+    resultat = None
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        duree = time.perf_counter() - debut
+        meilleur = duree if meilleur is None else min(meilleur, duree)
+    return meilleur, resultat
+
+# Fonction pour comparer le chargeur historique et le chargeur partagé
+def comparer_chargements(fichiers, repetitions=3):
+    variantes = {
+        'historique': lambda chemin: charger_donnees_historique(chemin),
+        'pandas (toutes colonnes)': lambda chemin: charger_export(chemin, moteur='pandas'),
+        'pandas (colonnes utiles)': lambda chemin: charger_export(chemin, colonnes=COLONNES_TABLEAU_DE_BORD, moteur='pandas'),
+        'pyarrow (toutes colonnes)': lambda chemin: charger_export(chemin, moteur='pyarrow'),
+        'pyarrow (colonnes utiles)': lambda chemin: charger_export(chemin, colonnes=COLONNES_TABLEAU_DE_BORD, moteur='pyarrow'),
+        'pyarrow (toutes colonnes, compactées)': lambda chemin: charger_export(chemin, moteur='pyarrow', compacter=True)
+    }
+    lignes = []
+    for chemin in fichiers:
+        for nom, chargeur in variantes.items():
+            try:
+                duree, donnees = mesurer(lambda: chargeur(chemin), repetitions)
+            except ImportError as erreur:
+                print(f"{chemin} - {nom} : ignoré ({erreur})")
+                continue
+            lignes.append({
+                'Fichier': chemin,
+                'Chargeur': nom,
+                'Temps (ms)': round(duree * 1000, 1),
+                'Mémoire (Mo)': round(memoire_colonnes(donnees).sum() / 1e6, 2),
+                'Colonnes': donnees.shape[1],
+                'Lignes': donnees.shape[0]
+            })
+    return pd.DataFrame(lignes)
+
+# Fonction pour vérifier que le prétraitement vectorisé reproduit exactement l'historique
+def verifier_pretraitement(fichiers, repetitions=3):
+    lignes = []
+    for chemin in fichiers:
+        for categoriser in (False, True):
+            donnees = charger_export(chemin, colonnes=COLONNES_TABLEAU_DE_BORD, categoriser=categoriser)
+            for nom, options in VARIANTES_PRETRAITEMENT.items():
+                duree_historique, attendu = mesurer(lambda: pretraiter_donnees_historique(donnees, **options), repetitions)
+                duree_vectorisee, obtenu = mesurer(lambda: pretraiter_donnees_vectorise(donnees, **options), repetitions)
+                try:
+                    pd.testing.assert_frame_equal(obtenu, attendu)
+                    identique = True
+                except AssertionError:
+                    identique = False
+                lignes.append({
+                    'Fichier': chemin,
+                    'Catégories': categoriser,
+                    'Variante': nom,
+                    'Historique (ms)': round(duree_historique * 1000, 1),
+                    'Vectorisé (ms)': round(duree_vectorisee * 1000, 1),
+                    'Identique': identique
+                })
+    return pd.DataFrame(lignes)
+
+# Fonction pour simuler un export précédent (dernières lignes absentes, quelques lignes modifiées ou supprimées depuis)
+def simuler_export_precedent(donnees, part_nouvelle=0.05, modifications=5, graine=0):
+    rng = np.random.default_rng(graine)
+    precedent = donnees.iloc[:int(len(donnees) * (1 - part_nouvelle))].copy()
+    lignes_modifiees = rng.choice(precedent.index, min(modifications, len(precedent)), replace=False)
+    precedent.loc[lignes_modifiees, COLONNE_DATE] -= pd.Timedelta(days=1)
+    lignes_supprimees = donnees.sample(min(modifications, len(donnees)), random_state=graine).assign(**{'Libellé du document': 'Document supprimé'})
+    precedent = pd.concat([precedent, lignes_supprimees.astype(donnees.dtypes.to_dict())])
+    return precedent.reset_index(drop=True)
+
+# Fonction pour vérifier que le prétraitement incrémental reproduit un recalcul complet, l'état précédent étant relu
+# depuis le disque. Les types optimisés diffèrent entre les deux exports (toutes les colonnes de texte de l'export
+# précédent en catégories), comme lorsque le seuil de catégories d'optimiser_types est franchi d'une semaine à l'autre
+def verifier_pretraitement_incremental(fichiers, repetitions=3):
+    lignes = []
+    with tempfile.TemporaryDirectory() as repertoire:
+        for chemin in fichiers:
+            donnees = charger_export(chemin, colonnes=COLONNES_TABLEAU_DE_BORD)
+            precedent = simuler_export_precedent(donnees)
+            exports = {
+                'chargés': (precedent, donnees),
+                'optimisés': (optimiser_types(precedent, seuil_categories=1.0), optimiser_types(donnees))
+            }
+            for types, (export_precedent, export_actuel) in exports.items():
+                for nom, options in VARIANTES_PRETRAITEMENT.items():
+                    lignes.append(comparer_incremental(chemin, types, nom, options, export_precedent, export_actuel, repertoire, repetitions))
+    return pd.DataFrame(lignes)
+
+# Fonction pour comparer le prétraitement incrémental d'un export, à partir de l'état enregistré pour l'export précédent,
+# au recalcul complet
+def comparer_incremental(chemin, types, nom, options, precedent, donnees, repertoire, repetitions):
+    _, etat_precedent = pretraiter_donnees_incremental(precedent, **options)
+    ecrire_etat_pretraitement(chemin, etat_precedent, repertoire)
+    etat_precedent = lire_etat_pretraitement(chemin, colonnes_cle(donnees), options, repertoire)
+    duree_complete, attendu = mesurer(lambda: pretraiter_donnees_vectorise(donnees, **options), repetitions)
+    duree_incrementale, (obtenu, etat) = mesurer(lambda: pretraiter_donnees_incremental(donnees, etat_precedent, lignes_min=0, **options), repetitions)
+    try:
+        pd.testing.assert_frame_equal(obtenu, attendu)
+        identique = True
+    except AssertionError:
+        identique = False
+    return {
+        'Fichier': chemin,
+        'Types': types,
+        'Variante': nom,
+        'Complet (ms)': round(duree_complete * 1000, 1),
+        'Incrémental (ms)': round(duree_incrementale * 1000, 1),
+        'Lignes recalculées': etat['statistiques']['recalculees'],
+        'Lignes': etat['statistiques']['lignes'],
+        'Chemin application': 'incrémental' if len(donnees) >= LIGNES_MIN_INCREMENTALES else 'complet',
+        'Identique': identique
+    }
+
+# Fonction pour mesurer le temps et le pic mémoire d'un traitement
+def mesurer_pic_memoire(fonction):
+    gc.collect()
+    tracemalloc.start()
+    debut = time.perf_counter()
+    resultat = fonction()
+    duree = time.perf_counter() - debut
+    pic = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duree, pic, resultat
+
+# Fonction pour vérifier les agrégats par blocs contre un chargement complet et comparer leur empreinte mémoire
+def verifier_agregats_par_blocs(fichiers, taille_bloc=TAILLE_BLOC):
+    lignes = []
+    for chemin in fichiers:
+        duree_complete, pic_complet, donnees = mesurer_pic_memoire(lambda: charger_export(chemin, colonnes=COLONNES_TABLEAU_DE_BORD, categoriser=False))
+        duree_blocs, pic_blocs, agregats = mesurer_pic_memoire(lambda: agreger_export_par_blocs(chemin, taille_bloc=taille_bloc))
+        identique = agregats.lignes == len(donnees)
+        for colonnes in (['LOT'], ['TYPE DE DOCUMENT'], ['LOT', 'TYPE DE DOCUMENT', 'INDICE']):
+            attendu = donnees.groupby(colonnes).size().reset_index(name='Nombre de documents')
+            obtenu = agregats.comptages_par(colonnes)
+            identique = identique and obtenu.astype(attendu.dtypes.to_dict()).equals(attendu)
+        attendu = donnees.groupby('LOT')['Date dépôt GED'].agg(['min', 'max'])
+        obtenu = agregats.calendrier('LOT').set_index('LOT')[['Date début', 'Date fin']]
+        identique = identique and (obtenu.to_numpy() == attendu.to_numpy()).all()
+        lignes.append({
+            'Fichier': chemin,
+            'Lignes': len(donnees),
+            'Complet (ms)': round(duree_complete * 1000, 1),
+            'Complet (Mo)': round(pic_complet / 1e6, 1),
+            'Par blocs (ms)': round(duree_blocs * 1000, 1),
+            'Par blocs (Mo)': round(pic_blocs / 1e6, 1),
+            'Documents agrégés': len(agregats.par_document),
+            'Identique': bool(identique)
+        })
+    return pd.DataFrame(lignes)
+
+# Fonction pour préparer un export comme l'application principale : colonnes de visa, compactage et types optimisés
+# avant et après le prétraitement (entiers nullables, catégories et chaînes pyarrow choisis selon l'export)
+def preparer_comme_application(chemin):
+    donnees = optimiser_types(charger_export(chemin, colonnes=colonnes_avec_visas(chemin, COLONNES_TABLEAU_DE_BORD), compacter=True))
+    return optimiser_types(pretraiter_donnees_vectorise(donnees))
+
+# Préparations des exports comparées par les vérifications des onglets : tableau brut et tableau de l'application
+PREPARATIONS = {
+    'brute': lambda chemin: pretraiter_donnees_vectorise(charger_export(chemin, colonnes=COLONNES_TABLEAU_DE_BORD)),
+    'application': preparer_comme_application
+}
+
+# Fonction pour lister les agrégations des onglets à comparer entre moteurs de calcul (avec et sans filtres)
+def lister_requetes(donnees):
+    lots = list(donnees['LOT'].dropna().unique()[:1])
+    indices = list(donnees['INDICE'].dropna().unique()[:2])
+    debut = donnees['Date dépôt GED'].median()
+    return {
+        'Lot et indice': ('comptages', (['LOT', 'INDICE'],)),
+        'Lot, type et indice (indices filtrés)': ('comptages', (['LOT', 'TYPE DE DOCUMENT', 'INDICE'], {'INDICE': indices})),
+        'Émetteur et type': ('comptages', (['EMET', 'TYPE DE DOCUMENT'],)),
+        'Acteur et type': ('comptages', (['Ajouté par', 'TYPE DE DOCUMENT'],)),
+        'Évolution mensuelle': ('evolution_mensuelle', ()),
+        'Évolution mensuelle (période filtrée)': ('evolution_mensuelle', ({'periode': (debut, None)},)),
+        'Nombre moyen d\'indices par type': ('indicateur_par_categorie', ('TYPE DE DOCUMENT', 'Nombre d\'indices', 'mean')),
+        'Durée maximum entre versions par lot': ('indicateur_par_categorie', ('LOT', 'Durée entre versions', 'max')),
+        'Durée maximum entre versions par type': ('indicateur_par_categorie', ('TYPE DE DOCUMENT', 'Durée entre versions', 'max')),
+        'Nombre maximum d\'indices par type': ('indicateur_par_categorie', ('TYPE DE DOCUMENT', 'Nombre d\'indices', 'max')),
+        'Calendrier par lot': ('calendrier', ('LOT',)),
+        'Calendrier par type': ('calendrier', ('TYPE DE DOCUMENT',)),
+        'Calendrier d\'un lot': ('calendrier', ('TYPE DE DOCUMENT', {'LOT': lots}))
+    }
+
+# Fonction pour vérifier qu'un moteur de calcul reproduit les agrégations pandas de chaque onglet
+def verifier_moteur_requetes(fichiers, moteur, repetitions=3):
+    lignes = []
+    for chemin in fichiers:
+        for preparation, preparer in PREPARATIONS.items():
+            donnees = preparer(chemin)
+            reference = creer_requetes(donnees, 'pandas')
+            duree_creation, requetes = mesurer(lambda: creer_requetes(donnees, moteur), 1)
+            lignes.append({'Fichier': chemin, 'Préparation': preparation, 'Requête': 'Création', 'pandas (ms)': 0.0, f'{moteur} (ms)': round(duree_creation * 1000, 1), 'Identique': True})
+            for nom, (methode, arguments) in lister_requetes(donnees).items():
+                duree_reference, attendu = mesurer(lambda: getattr(reference, methode)(*arguments), repetitions)
+                duree_moteur, obtenu = mesurer(lambda: getattr(requetes, methode)(*arguments), repetitions)
+                try:
+                    pd.testing.assert_frame_equal(obtenu.reset_index(drop=True), attendu.reset_index(drop=True), check_dtype=False, check_categorical=False)
+                    identique = True
+                except AssertionError:
+                    identique = False
+                lignes.append({
+                    'Fichier': chemin,
+                    'Préparation': preparation,
+                    'Requête': nom,
+                    'pandas (ms)': round(duree_reference * 1000, 1),
+                    f'{moteur} (ms)': round(duree_moteur * 1000, 1),
+                    'Identique': identique
+                })
+    return pd.DataFrame(lignes)
+
+# Fonction pour vérifier les comptages de l'onglet « Analyse des documents par lot et indice » calculés par le cube
+# contre les regroupements pandas sur les lignes (sans filtre puis avec les premiers indices sélectionnés)
+def verifier_cube(fichiers, repetitions=3):
+    lignes = []
+    for chemin in fichiers:
+        donnees = pretraiter_donnees_vectorise(charger_export(chemin, colonnes=COLONNES_TABLEAU_DE_BORD))
+        reference = creer_requetes(donnees, 'pandas')
+        duree_creation, cube = mesurer(lambda: CubeComptages(donnees), 1)
+        lignes.append({'Fichier': chemin, 'Comptage': f'Création ({len(cube.nombres)} cellules)', 'Lignes': len(donnees), 'pandas (ms)': 0.0, 'cube (ms)': round(duree_creation * 1000, 1), 'Identique': True})
+        indices = list(donnees['INDICE'].dropna().unique()[:2])
+        for filtres in (None, {'INDICE': indices}):
+            for colonnes in (['LOT', 'INDICE'], ['TYPE DE DOCUMENT', 'INDICE'], ['LOT', 'TYPE DE DOCUMENT', 'INDICE'], ['LOT'], ['TYPE DE DOCUMENT'], ['EMET', 'TYPE DE DOCUMENT']):
+                duree_reference, attendu = mesurer(lambda: reference.comptages(colonnes, filtres), repetitions)
+                duree_cube, obtenu = mesurer(lambda: cube.comptages(colonnes, filtres), repetitions)
+                try:
+                    pd.testing.assert_frame_equal(obtenu, attendu)
+                    identique = True
+                except AssertionError:
+                    identique = False
+                lignes.append({
+                    'Fichier': chemin,
+                    'Comptage': ' × '.join(colonnes) + (' (indices filtrés)' if filtres else ''),
+                    'Lignes': len(donnees),
+                    'pandas (ms)': round(duree_reference * 1000, 2),
+                    'cube (ms)': round(duree_cube * 1000, 2),
+                    'Identique': identique
+                })
+    return pd.DataFrame(lignes)
+
+# Ensembles de regroupement des onglets et mesures calculées pour chacun
+ENSEMBLES_ONGLETS = [
+    ['TYPE DE DOCUMENT'],
+    ['LOT'],
+    ['TYPE DE DOCUMENT', 'INDICE'],
+    ['LOT', 'TYPE DE DOCUMENT', 'INDICE'],
+    ['Mois', 'TYPE DE DOCUMENT'],
+    ['Mois', 'LOT']
+]
+MESURES_ONGLETS = {
+    'Nombre de documents': (None, 'size'),
+    'Libellés': ('Libellé du document', 'count'),
+    'Indices moyens': ('Nombre d\'indices', 'mean'),
+    'Indices max': ('Nombre d\'indices', 'max'),
+    'Durée moyenne': ('Durée entre versions', 'mean'),
+    'Durée min': ('Durée entre versions', 'min'),
+    'Durée max': ('Durée entre versions', 'max'),
+    'Date début': ('Date dépôt GED', 'min'),
+    'Date fin': ('Date dépôt GED', 'max')
+}
+
+# Fonction reproduisant un regroupement des onglets avec groupby (mois de dépôt en début de mois)
+def regrouper_pandas(donnees, colonnes, mesures):
+    cles = [donnees['Date dépôt GED'].dt.to_period('M').dt.to_timestamp().rename('Mois') if colonne == 'Mois' else colonne for colonne in colonnes]
+    groupes = donnees.groupby(cles, observed=True)
+    resultat = groupes.agg(**{nom: (colonne, fonction) for nom, (colonne, fonction) in mesures.items() if fonction != 'size'})
+    for nom, (_, fonction) in mesures.items():
+        if fonction == 'size':
+            resultat[nom] = groupes.size()
+    return resultat[list(mesures)].reset_index()
+
+# Fonction pour vérifier les ensembles de regroupement contre un groupby par ensemble (avec et sans filtre) et comparer
+# le temps de tous les regroupements d'un onglet : un groupby chacun, ou un passage sur les lignes puis les cellules
+def verifier_ensembles(fichiers, repetitions=3):
+    lignes = []
+    for chemin, (preparation, preparer) in ((chemin, preparation) for chemin in fichiers for preparation in PREPARATIONS.items()):
+        donnees = preparer(chemin)
+        lots = list(donnees['LOT'].dropna().unique()[:1])
+        for filtres in (None, {'LOT': lots}):
+            filtrees = donnees[donnees['LOT'].isin(lots)] if filtres else donnees
+            duree_reference, attendus = mesurer(lambda: [regrouper_pandas(filtrees, colonnes, MESURES_ONGLETS) for colonnes in ENSEMBLES_ONGLETS], repetitions)
+            duree_creation, regroupement = mesurer(lambda: EnsemblesRegroupement(donnees, ['LOT', 'TYPE DE DOCUMENT', 'INDICE', 'Mois']), repetitions)
+            duree_ensembles, obtenus = mesurer(lambda: [regroupement.agreger(colonnes, MESURES_ONGLETS, filtres) for colonnes in ENSEMBLES_ONGLETS], repetitions)
+            for colonnes, attendu, obtenu in zip(ENSEMBLES_ONGLETS, attendus, obtenus):
+                try:
+                    pd.testing.assert_frame_equal(obtenu, attendu, check_dtype=False)
+                    identique = True
+                except AssertionError:
+                    identique = False
+                lignes.append({
+                    'Fichier': chemin,
+                    'Préparation': preparation,
+                    'Ensemble': ' × '.join(colonnes) + (' (lot filtré)' if filtres else ''),
+                    'Lignes': len(donnees),
+                    'Cellules': len(regroupement.nombres),
+                    'Identique': identique
+                })
+            lignes.append({
+                'Fichier': chemin,
+                'Préparation': preparation,
+                'Ensemble': f'{len(ENSEMBLES_ONGLETS)} ensembles' + (' (lot filtré)' if filtres else ''),
+                'Lignes': len(donnees),
+                'Cellules': len(regroupement.nombres),
+                'groupby (ms)': round(duree_reference * 1000, 2),
+                'création (ms)': round(duree_creation * 1000, 2),
+                'ensembles (ms)': round(duree_ensembles * 1000, 2),
+                'Identique': True
+            })
+    return pd.DataFrame(lignes)
+
+# Fonction pour lister des filtres des onglets sur les valeurs d'un projet (une ou plusieurs valeurs et colonnes)
+def lister_filtres(donnees):
+    valeurs = lambda colonne, nombre: list(donnees[colonne].value_counts().index[:nombre])
+    debut = donnees['Date dépôt GED'].min()
+    return {
+        'Un lot': {'LOT': valeurs('LOT', 1)},
+        'Trois lots': {'LOT': valeurs('LOT', 3)},
+        'Deux indices': {'INDICE': valeurs('INDICE', 2)},
+        'Lot × type': {'LOT': valeurs('LOT', 2), 'TYPE DE DOCUMENT': valeurs('TYPE DE DOCUMENT', 3)},
+        'Émetteur × ajouté par': {'EMET': valeurs('EMET', 2), 'Ajouté par': valeurs('Ajouté par', 5)},
+        'Lot × indices × type': {'LOT': valeurs('LOT', 3), 'INDICE': valeurs('INDICE', 2), 'TYPE DE DOCUMENT': valeurs('TYPE DE DOCUMENT', 5)},
+        'Six mois': {'periode': (debut, debut + pd.Timedelta(days=180))},
+        'Depuis un an': {'periode': (debut + pd.Timedelta(days=365), None)},
+        'Plage de dates': {'periode': (debut + pd.Timedelta(days=30), debut + pd.Timedelta(days=200))},
+        'Lot et période': {'LOT': valeurs('LOT', 2), 'periode': (debut, debut + pd.Timedelta(days=365))}
+    }
+
+# Fonction pour vérifier les lignes filtrées par l'index bitmap et l'index des dates du projet contre les masques booléens
+def verifier_index(fichiers, repetitions=3):
+    lignes = []
+    for chemin in fichiers:
+        donnees = pretraiter_donnees_vectorise(charger_export(chemin, colonnes=COLONNES_TABLEAU_DE_BORD))
+        duree_creation, (index, index_dates) = mesurer(lambda: (IndexBitmaps(donnees), IndexDates(donnees)), repetitions)
+        memoire = index.memoire() + index_dates.ordre.nbytes + index_dates.dates.nbytes
+        lignes.append({'Fichier': chemin, 'Filtre': 'Création', 'Lignes': len(donnees), 'Mémoire (Ko)': round(memoire / 1024, 1),
+                       'masques (ms)': None, 'index (ms)': round(duree_creation * 1000, 2), 'Identique': True})
+        for nom, filtres in lister_filtres(donnees).items():
+            duree_reference, attendu = mesurer(lambda: filtrer_donnees(donnees, filtres), repetitions)
+            duree_index, obtenu = mesurer(lambda: filtrer_donnees(donnees, filtres, index, index_dates), repetitions)
+            try:
+                pd.testing.assert_frame_equal(obtenu, attendu)
+                identique = True
+            except AssertionError:
+                identique = False
+            lignes.append({
+                'Fichier': chemin,
+                'Filtre': nom,
+                'Lignes': len(attendu),
+                'masques (ms)': round(duree_reference * 1000, 3),
+                'index (ms)': round(duree_index * 1000, 3),
+                'Identique': identique
+            })
+    return pd.DataFrame(lignes)
+
+# Fonction pour comparer la segmentation exacte des dates de dépôt des principaux lots aux k-moyennes de scikit-learn
+# (inertie en jours², la segmentation optimale ne doit jamais être dépassée) et vérifier qu'elle est déterministe
+def verifier_segmentation(fichiers, nombre_classes=3, nombre_lots=3, repetitions=3):
+    lignes = []
+    for chemin in fichiers:
+        donnees = charger_export(chemin, colonnes=COLONNES_TABLEAU_DE_BORD)
+        for lot in list(donnees['LOT'].value_counts().index[:nombre_lots]) + [None]:
+            dates = (donnees if lot is None else donnees[donnees['LOT'] == lot])['Date dépôt GED'].to_numpy(dtype='datetime64[ns]')
+            duree_segmentation, segmentation = mesurer(lambda: SegmentationDates(dates, NOMBRE_MAX_CLASSES), repetitions)
+            classes = segmentation.classes(nombre_classes)
+            ligne = {
+                'Fichier': chemin,
+                'Lot': 'Projet entier' if lot is None else lot,
+                'Dates': len(dates),
+                'Dates distinctes': segmentation.nombre_valeurs,
+                f'{NOMBRE_MAX_CLASSES} segmentations (ms)': round(duree_segmentation * 1000, 2),
+                'Coude': segmentation.coude(),
+                'Inertie exacte': round(segmentation.inerties()[nombre_classes - 1], 1),
+                'Déterministe': bool(np.array_equal(classes, SegmentationDates(dates, NOMBRE_MAX_CLASSES).classes(nombre_classes)))
+            }
+            if KMeans is not None:
+                secondes = (dates.view(np.int64) / 1e9).reshape(-1, 1)
+                duree_kmeans, kmeans = mesurer(lambda: KMeans(n_clusters=nombre_classes).fit(secondes), repetitions)
+                ligne['KMeans (ms)'] = round(duree_kmeans * 1000, 2)
+                ligne['Inertie KMeans'] = round(kmeans.inertia_ / 86400 ** 2, 1)
+                ligne['Optimale'] = bool(segmentation.inerties()[nombre_classes - 1] <= kmeans.inertia_ / 86400 ** 2 * (1 + 1e-9))
+            lignes.append(ligne)
+    return pd.DataFrame(lignes)
+
+# Fonction pour comparer la chaîne pandas (chargement, prétraitement, onglets) à la chaîne polars paresseuse
+def comparer_chaine_polars(fichiers, repetitions=3):
+    lignes = []
+    for chemin in fichiers:
+        def chaine_pandas():
+            donnees = pretraiter_donnees_vectorise(charger_export(chemin, colonnes=COLONNES_TABLEAU_DE_BORD))
+            requetes = creer_requetes(donnees, 'pandas')
+            return donnees, {nom: getattr(requetes, methode)(*arguments) for nom, (methode, arguments) in lister_requetes(donnees).items()}
+        def chaine_polars():
+            # Le plan n'est exécuté qu'une fois ; la conversion en pandas n'a lieu qu'en sortie
+            pretraitees = pretraiter_donnees_polars(charger_export_polars(chemin, COLONNES_TABLEAU_DE_BORD)).collect()
+            requetes = creer_requetes(pretraitees, 'polars')
+            donnees = vers_pandas(pretraitees)
+            return donnees, {nom: getattr(requetes, methode)(*arguments) for nom, (methode, arguments) in lister_requetes(donnees).items()}
+        etapes = {
+            'Chargement': (lambda: charger_export(chemin, colonnes=COLONNES_TABLEAU_DE_BORD), lambda: charger_export_polars(chemin, COLONNES_TABLEAU_DE_BORD).collect()),
+            'Prétraitement': (lambda: pretraiter_donnees_vectorise(donnees_pandas), lambda: pretraiter_donnees_polars(donnees_polars).collect()),
+            'Chaîne complète': (chaine_pandas, chaine_polars)
+        }
+        donnees_pandas = charger_export(chemin, colonnes=COLONNES_TABLEAU_DE_BORD)
+        donnees_polars = charger_export_polars(chemin, COLONNES_TABLEAU_DE_BORD).collect()
+        for etape, (fonction_pandas, fonction_polars) in etapes.items():
+            duree_pandas, attendu = mesurer(fonction_pandas, repetitions)
+            duree_polars, obtenu = mesurer(fonction_polars, repetitions)
+            identique = None
+            if etape == 'Chaîne complète':
+                try:
+                    pd.testing.assert_frame_equal(obtenu[0], attendu[0].reset_index(drop=True), check_dtype=False, check_categorical=False)
+                    for nom, tableau in attendu[1].items():
+                        pd.testing.assert_frame_equal(obtenu[1][nom], tableau.reset_index(drop=True), check_dtype=False, check_categorical=False)
+                    identique = True
+                except AssertionError:
+                    identique = False
+            lignes.append({
+                'Fichier': chemin,
+                'Étape': etape,
+                'pandas (ms)': round(duree_pandas * 1000, 1),
+                'polars (ms)': round(duree_polars * 1000, 1),
+                'Identique': identique
+            })
+    return pd.DataFrame(lignes)
+
+# Remplaçant de Streamlit : widgets à leur valeur par défaut, affichages comptabilisés sans rendu
+class StreamlitSimule:
+    def __init__(self):
+        self.charge_utile = 0
+        self.session_state = {}
+        self.fichiers_telecharges = []
+
+    def __getattr__(self, nom):
+        return lambda *args, **kwargs: None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    @property
+    def sidebar(self):
+        return self
+
+    def columns(self, specification, **kwargs):
+        return [self] * (specification if isinstance(specification, int) else len(specification))
+
+    def plotly_chart(self, figure, **kwargs):
+        self.charge_utile += len(figure.to_json())
+
+    def dataframe(self, tableau, **kwargs):
+        self.charge_utile += len(tableau.to_json(date_format='iso', default_handler=str))
+
+    table = dataframe
+
+    def selectbox(self, label, options, index=0, **kwargs):
+        options = list(options)
+        return options[index] if options and index is not None else None
+
+    def radio(self, label, options, index=0, **kwargs):
+        return list(options)[index]
+
+    def multiselect(self, label, options, default=None, **kwargs):
+        if default is None:
+            return []
+        return list(default) if isinstance(default, (list, tuple, np.ndarray, pd.Index)) else [default]
+
+    def slider(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        return value if value is not None else min_value
+
+    def number_input(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        return value if value is not None else min_value
+
+    def file_uploader(self, label, **kwargs):
+        return self.fichiers_telecharges
+
+    def progress(self, valeur, **kwargs):
+        return self
+
+    def expander(self, label, **kwargs):
+        return self
+
+    def fragment(self, fonction=None, **kwargs):
+        return fonction if fonction is not None else (lambda fonction: fonction)
+
+# Fonction pour lister les onglets d'une application à partir de son menu
+def lister_onglets(module):
+    options_menu = {}
+    option_menu = module.option_menu
+    module.option_menu = lambda *args, **kwargs: options_menu.update(kwargs)
+    try:
+        module.afficher_menu()
+    finally:
+        module.option_menu = option_menu
+    return options_menu['options']
+
+# Fonction pour mesurer le temps, le pic mémoire et la taille des figures envoyées d'une étape
+def mesurer_etape(fonction, repetitions, simule=None):
+    duree, resultat = mesurer(fonction, repetitions)
+    gc.collect()
+    tracemalloc.start()
+    if simule is not None:
+        simule.charge_utile = 0
+    fonction()
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultat, {
+        'temps_ms': round(duree * 1000, 2),
+        'memoire_pic_mo': round(pic / 1e6, 2),
+        'charge_utile_ko': round(simule.charge_utile / 1e3, 1) if simule is not None else None
+    }
+
+# Fonction pour vider les caches d'une application (cache Streamlit et cache par empreinte s'il existe)
+def vider_caches(module, streamlit_reel):
+    streamlit_reel.cache_data.clear()
+    if hasattr(module, 'CACHE'):
+        module.CACHE.vider()
+
+# Fonction pour mesurer le chargement, le prétraitement et chaque onglet d'une application sans serveur Streamlit
+def mesurer_tableau_de_bord(fichiers, application='app111finaout08', repetitions=3, moteur='pandas'):
+    os.environ.setdefault('STREAMLIT_LOGGER_LEVEL', 'error')
+    module = importlib.import_module(application)
+    simule = StreamlitSimule()
+    modules_affichage = [module] + [importlib.import_module(nom) for nom in ('affichage',) if hasattr(module, 'afficher_tableau_pagine')]
+    streamlit_reel = module.st
+    onglets = lister_onglets(module)
+    arguments_moteur = [moteur] if 'moteur' in inspect.signature(module.afficher_graphique).parameters else []
+    projets = {}
+    mesures = []
+    try:
+        for chemin in fichiers:
+            # Les caches sont vidés à chaque mesure pour ne chronométrer que le calcul
+            def charger():
+                vider_caches(module, streamlit_reel)
+                return module.charger_donnees(CheminFichier(chemin))
+            donnees, mesure = mesurer_etape(charger, repetitions)
+            mesures.append({'fichier': chemin, 'etape': 'chargement', **mesure})
+            projets[os.path.basename(chemin)] = donnees
+
+            arguments = [os.path.splitext(os.path.basename(chemin))[0]] if len(inspect.signature(module.pretraiter_donnees).parameters) > 1 else []
+            def pretraiter():
+                vider_caches(module, streamlit_reel)
+                return module.pretraiter_donnees(donnees, *arguments)
+            donnees_pretraitees, mesure = mesurer_etape(pretraiter, repetitions)
+            mesures.append({'fichier': chemin, 'etape': 'pretraitement', **mesure})
+
+            # Coût d'une réexécution : le résultat est retrouvé dans le cache (recherche de l'entrée et copie éventuelle)
+            module.pretraiter_donnees(donnees, *arguments)
+            _, mesure = mesurer_etape(lambda: module.pretraiter_donnees(donnees, *arguments), repetitions)
+            mesures.append({'fichier': chemin, 'etape': 'pretraitement (cache)', **mesure})
+
+            for module_affichage in modules_affichage:
+                module_affichage.st = simule
+            for onglet in onglets:
+                def afficher():
+                    vider_caches(module, streamlit_reel)
+                    simule.charge_utile = 0
+                    module.afficher_graphique(onglet, donnees_pretraitees, dict(projets), os.path.basename(chemin), *arguments_moteur)
+                _, mesure = mesurer_etape(afficher, repetitions, simule)
+                mesures.append({'fichier': chemin, 'etape': onglet, **mesure})
+            for module_affichage in modules_affichage:
+                module_affichage.st = streamlit_reel
+    finally:
+        for module_affichage in modules_affichage:
+            module_affichage.st = streamlit_reel
+    return mesures
+
+# Fonction pour comparer, onglet par onglet, la réexécution complète de l'application à celle du seul fragment de l'onglet
+# (changement d'un widget de l'onglet, caches déjà remplis)
+def mesurer_fragments(fichiers, application='app111finaout08', repetitions=3):
+    os.environ.setdefault('STREAMLIT_LOGGER_LEVEL', 'error')
+    module = importlib.import_module(application)
+    modules_affichage = [module, importlib.import_module('affichage')]
+    streamlit_reel = module.st
+    option_menu = module.option_menu
+    afficher_onglet = module.afficher_onglet
+    simule = StreamlitSimule()
+    for chemin in fichiers:
+        with open(chemin, 'rb') as fichier:
+            telecharge = io.BytesIO(fichier.read())
+        # Nom et taille comme les fichiers téléchargés de Streamlit (la taille choisit le chargement complet ou par blocs)
+        telecharge.name = os.path.basename(chemin)
+        telecharge.size = len(telecharge.getbuffer())
+        simule.fichiers_telecharges.append(telecharge)
+
+    # Hors serveur Streamlit un fragment ne s'exécute pas : l'onglet est appelé directement et ses arguments conservés
+    arguments_onglet = []
+    def appeler_onglet(*arguments):
+        arguments_onglet[:] = arguments
+        module.afficher_graphique(*arguments)
+
+    lignes = []
+    try:
+        for module_affichage in modules_affichage:
+            module_affichage.st = simule
+        module.afficher_onglet = appeler_onglet
+        for onglet in lister_onglets(module):
+            module.option_menu = lambda *args, **kwargs: onglet
+            module.executer_application()
+            attendre_precalculs()
+            duree_complete, _ = mesurer(module.executer_application, repetitions)
+            duree_fragment, _ = mesurer(lambda: module.afficher_graphique(*arguments_onglet), repetitions)
+            lignes.append({
+                'Onglet': onglet,
+                'Réexécution complète (ms)': round(duree_complete * 1000, 1),
+                'Fragment (ms)': round(duree_fragment * 1000, 1),
+                'Gain (%)': round((1 - duree_fragment / duree_complete) * 100, 1)
+            })
+    finally:
+        for module_affichage in modules_affichage:
+            module_affichage.st = streamlit_reel
+        module.option_menu = option_menu
+        module.afficher_onglet = afficher_onglet
+    return pd.DataFrame(lignes)
+
+# Fonction pour mesurer le premier affichage de chaque onglet, sans précalcul puis après le précalcul en arrière-plan
+def mesurer_precalcul(chemin, application='app111finaout08', moteur='pandas'):
+    os.environ.setdefault('STREAMLIT_LOGGER_LEVEL', 'error')
+    module = importlib.import_module(application)
+    modules_affichage = [module, importlib.import_module('affichage')]
+    streamlit_reel = module.st
+    simule = StreamlitSimule()
+    nom_projet = os.path.splitext(os.path.basename(chemin))[0]
+
+    # Fonction pour repartir de caches vides avec le projet chargé et prétraité
+    def preparer():
+        vider_caches(module, streamlit_reel)
+        vider_precalculs()
+        donnees = module.charger_donnees(CheminFichier(chemin))
+        projets = {os.path.basename(chemin): donnees}
+        return module.pretraiter_donnees(donnees, nom_projet), projets
+
+    lignes = {}
+    try:
+        for module_affichage in modules_affichage:
+            module_affichage.st = simule
+        onglets = lister_onglets(module)
+        for onglet in onglets:
+            donnees, projets = preparer()
+            debut = time.perf_counter()
+            module.afficher_graphique(onglet, donnees, projets, nom_projet, moteur)
+            lignes[onglet] = {'Onglet': onglet, 'Sans précalcul (ms)': round((time.perf_counter() - debut) * 1000, 1)}
+        donnees, projets = preparer()
+        debut = time.perf_counter()
+        precalcul = module.precalculer_onglets(donnees, projets, moteur, onglets[0])
+        precalcul.attendre()
+        duree_precalcul = time.perf_counter() - debut
+        durees_taches = {onglet: duree for onglet, _, duree in precalcul.avancement()}
+        for onglet in onglets:
+            debut = time.perf_counter()
+            module.afficher_graphique(onglet, donnees, projets, nom_projet, moteur)
+            lignes[onglet]['Précalcul (ms)'] = round(durees_taches[onglet] * 1000, 1)
+            lignes[onglet]['Après précalcul (ms)'] = round((time.perf_counter() - debut) * 1000, 1)
+    finally:
+        for module_affichage in modules_affichage:
+            module_affichage.st = streamlit_reel
+    resultats = pd.DataFrame(list(lignes.values()))
+    resultats.attrs['duree_precalcul'] = duree_precalcul
+    return resultats
+
+# Fonction pour mesurer la mémoire retenue lorsque plusieurs sessions consultent le même projet
+# (chaque session garde le projet chargé, prétraité et une colonne dérivée propre à un onglet)
+def mesurer_sessions(chemin, nombre_sessions, application='app111finaout08', nombre_max_entrees=None):
+    os.environ.setdefault('STREAMLIT_LOGGER_LEVEL', 'error')
+    module = importlib.import_module(application)
+    module.st.cache_data.clear()
+    module.CACHE.vider()
+    if nombre_max_entrees is not None:
+        module.CACHE.nombre_max_entrees = nombre_max_entrees
+    nom_projet = os.path.splitext(os.path.basename(chemin))[0]
+    sessions = []
+    mesures = []
+    gc.collect()
+    tracemalloc.start()
+    for numero in range(1, nombre_sessions + 1):
+        donnees = module.charger_donnees(CheminFichier(chemin))
+        pretraitees = module.pretraiter_donnees(donnees, nom_projet)
+        locale = pretraitees.assign(**{'Mois': pretraitees['Date dépôt GED'].dt.to_period('M')})
+        sessions.append((donnees, pretraitees, locale))
+        gc.collect()
+        mesures.append({
+            'Sessions': numero,
+            'Mémoire retenue (Mo)': round(tracemalloc.get_traced_memory()[0] / 1e6, 2),
+            'Tableaux partagés': module.CACHE.nombre_tableaux_partages()
+        })
+    tracemalloc.stop()
+    return pd.DataFrame(mesures)
+
+# Fonction pour générer un export synthétique plus volumineux en dupliquant les documents d'un export réel
+def generer_export_synthetique(chemin, facteur, repertoire):
+    donnees = pd.read_csv(chemin, encoding=ENCODAGE, sep=SEPARATEUR, dtype=str, keep_default_na=False)
+    copies = []
+    for numero in range(facteur):
+        copie = donnees.copy()
+        if numero:
+            # Chaque copie forme de nouveaux documents pour conserver la cardinalité par document
+            for colonne in ['Libellé du document'] + COLONNES_NUMERO:
+                if colonne in copie.columns:
+                    copie[colonne] = copie[colonne] + f" #{numero}"
+        copies.append(copie)
+    chemin_synthetique = os.path.join(repertoire, f"{os.path.splitext(os.path.basename(chemin))[0]}_x{facteur}.csv")
+    pd.concat(copies, ignore_index=True).to_csv(chemin_synthetique, sep=SEPARATEUR, encoding=ENCODAGE, index=False)
+    return chemin_synthetique
+
+# Exécution principale du banc d'essai
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Banc d'essai des traitements GED")
+    parser.add_argument('--repetitions', type=int, default=3, help="Nombre de répétitions par mesure")
+    sous_commandes = parser.add_subparsers(dest='commande', required=True)
+    commande_chargement = sous_commandes.add_parser('chargement', help="Comparer les chargeurs d'exports")
+    commande_chargement.add_argument('fichiers', nargs='*', default=FICHIERS_EXEMPLES, help="Exports CSV à mesurer")
+    commande_pretraitement = sous_commandes.add_parser('pretraitement', help="Vérifier et mesurer le prétraitement vectorisé")
+    commande_pretraitement.add_argument('fichiers', nargs='*', default=FICHIERS_EXEMPLES, help="Exports CSV à vérifier")
+    commande_incremental = sous_commandes.add_parser('incremental', help="Vérifier et mesurer le prétraitement incrémental")
+    commande_incremental.add_argument('fichiers', nargs='*', default=FICHIERS_EXEMPLES, help="Exports CSV à vérifier")
+    commande_incremental.add_argument('--facteurs', type=int, nargs='*', default=[], help="Facteurs d'agrandissement des exports synthétiques (ex. 10 100)")
+    commande_blocs = sous_commandes.add_parser('blocs', help="Vérifier et mesurer l'agrégation d'exports par blocs")
+    commande_blocs.add_argument('fichiers', nargs='*', default=FICHIERS_EXEMPLES, help="Exports CSV à vérifier")
+    commande_blocs.add_argument('--taille-bloc', type=int, default=TAILLE_BLOC, help="Taille des blocs lus (octets)")
+    commande_blocs.add_argument('--facteurs', type=int, nargs='*', default=[], help="Facteurs d'agrandissement des exports synthétiques (ex. 10 100)")
+    commande_requetes = sous_commandes.add_parser('requetes', help="Vérifier un moteur de calcul des onglets contre pandas")
+    commande_requetes.add_argument('fichiers', nargs='*', default=FICHIERS_EXEMPLES, help="Exports CSV à vérifier")
+    commande_requetes.add_argument('--moteur', choices=MOTEURS_REQUETES, default=MOTEURS_REQUETES[-1], help="Moteur de calcul à comparer à pandas")
+    commande_requetes.add_argument('--facteurs', type=int, nargs='*', default=[], help="Facteurs d'agrandissement des exports synthétiques (ex. 10 100)")
+    commande_cube = sous_commandes.add_parser('cube', help="Vérifier et mesurer les comptages du cube contre pandas")
+    commande_cube.add_argument('fichiers', nargs='*', default=FICHIERS_EXEMPLES, help="Exports CSV à vérifier")
+    commande_cube.add_argument('--facteurs', type=int, nargs='*', default=[], help="Facteurs d'agrandissement des exports synthétiques (ex. 10 100)")
+    commande_ensembles = sous_commandes.add_parser('ensembles', help="Vérifier et mesurer les ensembles de regroupement contre groupby")
+    commande_ensembles.add_argument('fichiers', nargs='*', default=FICHIERS_EXEMPLES, help="Exports CSV à vérifier")
+    commande_ensembles.add_argument('--facteurs', type=int, nargs='*', default=[], help="Facteurs d'agrandissement des exports synthétiques (ex. 10 100)")
+    commande_index = sous_commandes.add_parser('index', help="Vérifier et mesurer les filtres servis par l'index bitmap et l'index des dates contre les masques")
+    commande_index.add_argument('fichiers', nargs='*', default=FICHIERS_EXEMPLES, help="Exports CSV à vérifier")
+    commande_index.add_argument('--facteurs', type=int, nargs='*', default=[], help="Facteurs d'agrandissement des exports synthétiques (ex. 10 100)")
+    commande_segmentation = sous_commandes.add_parser('segmentation', help="Comparer la segmentation exacte des dates de dépôt aux k-moyennes")
+    commande_segmentation.add_argument('fichiers', nargs='*', default=FICHIERS_EXEMPLES, help="Exports CSV à segmenter")
+    commande_segmentation.add_argument('--classes', type=int, default=3, help="Nombre de classes comparé")
+    commande_segmentation.add_argument('--facteurs', type=int, nargs='*', default=[], help="Facteurs d'agrandissement des exports synthétiques (ex. 10 100)")
+    commande_polars = sous_commandes.add_parser('polars', help="Comparer la chaîne pandas à la chaîne polars paresseuse")
+    commande_polars.add_argument('fichiers', nargs='*', default=['GOODLIFE.csv', 'LEDGER.csv'], help="Exports CSV à mesurer")
+    commande_polars.add_argument('--facteurs', type=int, nargs='*', default=[], help="Facteurs d'agrandissement des exports synthétiques (ex. 10 100)")
+    commande_tableau = sous_commandes.add_parser('tableau-de-bord', help="Mesurer le chargement, le prétraitement et chaque onglet d'une application")
+    commande_tableau.add_argument('fichiers', nargs='*', default=FICHIERS_EXEMPLES, help="Exports CSV à mesurer")
+    commande_tableau.add_argument('--application', default='app111finaout08', help="Module de l'application à mesurer")
+    commande_tableau.add_argument('--facteurs', type=int, nargs='*', default=[], help="Facteurs d'agrandissement des exports synthétiques (ex. 10 100)")
+    commande_tableau.add_argument('--moteur', choices=MOTEURS_REQUETES, default='pandas', help="Moteur de calcul des agrégations des onglets")
+    commande_tableau.add_argument('--sortie', default=None, help="Fichier JSON des mesures (sortie standard par défaut)")
+    commande_fragments = sous_commandes.add_parser('fragments', help="Comparer la réexécution complète de l'application à celle du fragment de chaque onglet")
+    commande_fragments.add_argument('fichiers', nargs='*', default=FICHIERS_EXEMPLES, help="Exports CSV téléchargés")
+    commande_fragments.add_argument('--application', default='app111finaout08', help="Module de l'application à mesurer")
+    commande_precalcul = sous_commandes.add_parser('precalcul', help="Mesurer le premier affichage des onglets avec et sans précalcul en arrière-plan")
+    commande_precalcul.add_argument('fichier', nargs='?', default='LEDGER.csv', help="Export CSV du projet")
+    commande_precalcul.add_argument('--application', default='app111finaout08', help="Module de l'application à mesurer")
+    commande_precalcul.add_argument('--moteur', choices=MOTEURS_REQUETES, default='pandas', help="Moteur de calcul des agrégations des onglets")
+    commande_sessions = sous_commandes.add_parser('sessions', help="Mesurer la mémoire retenue selon le nombre de sessions consultant un projet")
+    commande_sessions.add_argument('fichier', nargs='?', default='LEDGER.csv', help="Export CSV consulté par les sessions")
+    commande_sessions.add_argument('--sessions', type=int, default=10, help="Nombre de sessions simulées")
+    commande_sessions.add_argument('--application', default='app111finaout08', help="Module de l'application à mesurer")
+    commande_sessions.add_argument('--entrees', type=int, default=None, help="Taille du cache en mémoire (0 : entrées évincées aussitôt)")
+    arguments = parser.parse_args()
+
+    if arguments.commande == 'chargement':
+        resultats = comparer_chargements(arguments.fichiers, arguments.repetitions)
+        print(resultats.to_string(index=False))
+    elif arguments.commande == 'pretraitement':
+        resultats = verifier_pretraitement(arguments.fichiers, arguments.repetitions)
+        print(resultats.to_string(index=False))
+        if not resultats['Identique'].all():
+            raise SystemExit("Le prétraitement vectorisé diffère de l'historique.")
+    elif arguments.commande == 'incremental':
+        with tempfile.TemporaryDirectory() as repertoire:
+            fichiers = list(arguments.fichiers)
+            for facteur in arguments.facteurs:
+                fichiers += [generer_export_synthetique(chemin, facteur, repertoire) for chemin in arguments.fichiers]
+            resultats = verifier_pretraitement_incremental(fichiers, arguments.repetitions)
+        resultats['Fichier'] = resultats['Fichier'].map(os.path.basename)
+        print(resultats.to_string(index=False))
+        if not resultats['Identique'].all():
+            raise SystemExit("Le prétraitement incrémental diffère du recalcul complet.")
+    elif arguments.commande == 'blocs':
+        with tempfile.TemporaryDirectory() as repertoire:
+            fichiers = list(arguments.fichiers)
+            for facteur in arguments.facteurs:
+                fichiers += [generer_export_synthetique(chemin, facteur, repertoire) for chemin in arguments.fichiers]
+            resultats = verifier_agregats_par_blocs(fichiers, arguments.taille_bloc)
+        resultats['Fichier'] = resultats['Fichier'].map(os.path.basename)
+        print(resultats.to_string(index=False))
+        if not resultats['Identique'].all():
+            raise SystemExit("Les agrégats par blocs diffèrent du chargement complet.")
+    elif arguments.commande == 'requetes':
+        with tempfile.TemporaryDirectory() as repertoire:
+            fichiers = list(arguments.fichiers)
+            for facteur in arguments.facteurs:
+                fichiers += [generer_export_synthetique(chemin, facteur, repertoire) for chemin in arguments.fichiers]
+            resultats = verifier_moteur_requetes(fichiers, arguments.moteur, arguments.repetitions)
+        resultats['Fichier'] = resultats['Fichier'].map(os.path.basename)
+        print(resultats.to_string(index=False))
+        if not resultats['Identique'].all():
+            raise SystemExit(f"Le moteur {arguments.moteur} diffère des agrégations pandas.")
+    elif arguments.commande == 'cube':
+        with tempfile.TemporaryDirectory() as repertoire:
+            fichiers = list(arguments.fichiers)
+            for facteur in arguments.facteurs:
+                fichiers += [generer_export_synthetique(chemin, facteur, repertoire) for chemin in arguments.fichiers]
+            resultats = verifier_cube(fichiers, arguments.repetitions)
+        resultats['Fichier'] = resultats['Fichier'].map(os.path.basename)
+        print(resultats.to_string(index=False))
+        if not resultats['Identique'].all():
+            raise SystemExit("Les comptages du cube diffèrent des regroupements pandas.")
+    elif arguments.commande == 'ensembles':
+        with tempfile.TemporaryDirectory() as repertoire:
+            fichiers = list(arguments.fichiers)
+            for facteur in arguments.facteurs:
+                fichiers += [generer_export_synthetique(chemin, facteur, repertoire) for chemin in arguments.fichiers]
+            resultats = verifier_ensembles(fichiers, arguments.repetitions)
+        resultats['Fichier'] = resultats['Fichier'].map(os.path.basename)
+        print(resultats.fillna('').to_string(index=False))
+        if not resultats['Identique'].all():
+            raise SystemExit("Les ensembles de regroupement diffèrent des regroupements pandas.")
+    elif arguments.commande == 'index':
+        with tempfile.TemporaryDirectory() as repertoire:
+            fichiers = list(arguments.fichiers)
+            for facteur in arguments.facteurs:
+                fichiers += [generer_export_synthetique(chemin, facteur, repertoire) for chemin in arguments.fichiers]
+            resultats = verifier_index(fichiers, arguments.repetitions)
+        resultats['Fichier'] = resultats['Fichier'].map(os.path.basename)
+        print(resultats.fillna('').to_string(index=False))
+        if not resultats['Identique'].all():
+            raise SystemExit("Les filtres des index du projet diffèrent des masques.")
+    elif arguments.commande == 'segmentation':
+        with tempfile.TemporaryDirectory() as repertoire:
+            fichiers = list(arguments.fichiers)
+            for facteur in arguments.facteurs:
+                fichiers += [generer_export_synthetique(chemin, facteur, repertoire) for chemin in arguments.fichiers]
+            resultats = verifier_segmentation(fichiers, arguments.classes, repetitions=arguments.repetitions)
+        resultats['Fichier'] = resultats['Fichier'].map(os.path.basename)
+        print(resultats.to_string(index=False))
+        if not resultats['Déterministe'].all() or resultats.get('Optimale', pd.Series(True)).eq(False).any():
+            raise SystemExit("La segmentation exacte est dépassée par les k-moyennes ou n'est pas déterministe.")
+    elif arguments.commande == 'polars':
+        with tempfile.TemporaryDirectory() as repertoire:
+            fichiers = list(arguments.fichiers)
+            for facteur in arguments.facteurs:
+                fichiers += [generer_export_synthetique(chemin, facteur, repertoire) for chemin in arguments.fichiers]
+            resultats = comparer_chaine_polars(fichiers, arguments.repetitions)
+        resultats['Fichier'] = resultats['Fichier'].map(os.path.basename)
+        print(resultats.to_string(index=False))
+        if resultats['Identique'].eq(False).any():
+            raise SystemExit("La chaîne polars diffère de la chaîne pandas.")
+    elif arguments.commande == 'tableau-de-bord':
+        with tempfile.TemporaryDirectory() as repertoire:
+            fichiers = list(arguments.fichiers)
+            for facteur in arguments.facteurs:
+                fichiers += [generer_export_synthetique(chemin, facteur, repertoire) for chemin in arguments.fichiers]
+            mesures = mesurer_tableau_de_bord(fichiers, arguments.application, arguments.repetitions, arguments.moteur)
+        for mesure in mesures:
+            mesure['fichier'] = os.path.basename(mesure['fichier'])
+        resultat = json.dumps({'application': arguments.application, 'moteur': arguments.moteur, 'repetitions': arguments.repetitions, 'mesures': mesures}, ensure_ascii=False, indent=2)
+        if arguments.sortie:
+            with open(arguments.sortie, 'w', encoding='utf-8') as fichier:
+                fichier.write(resultat)
+            print(pd.DataFrame(mesures).to_string(index=False))
+        else:
+            print(resultat)
+    elif arguments.commande == 'fragments':
+        resultats = mesurer_fragments(arguments.fichiers, arguments.application, arguments.repetitions)
+        print(resultats.to_string(index=False))
+    elif arguments.commande == 'precalcul':
+        resultats = mesurer_precalcul(arguments.fichier, arguments.application, arguments.moteur)
+        print(resultats.to_string(index=False))
+        print(f"Précalcul de tous les onglets : {resultats.attrs['duree_precalcul'] * 1000:.0f} ms")
+    elif arguments.commande == 'sessions':
+        resultats = mesurer_sessions(arguments.fichier, arguments.sessions, arguments.application, arguments.entrees)
+        print(resultats.to_string(index=False))
@@ -0,0 +1,172 @@
+import argparse
+import glob
+import hashlib
+import os
+import time
+from chargement import charger_export, compacter_colonnes, densifier_colonnes, lire_octets, VERSION_CHARGEUR, COLONNES_TABLEAU_DE_BORD
+from visas import colonnes_avec_visas
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+# Emplacement et taille maximale du cache disque (modifiables par variables d'environnement)
+REPERTOIRE_CACHE = os.environ.get('GED_CACHE_REPERTOIRE', '.cache_ged')
+TAILLE_MAX_CACHE = int(os.environ.get('GED_CACHE_TAILLE_MAX', 512 * 1024 * 1024))
+EXTENSION = '.feather'
+
+# Colonnes techniques ajoutées à l'état de prétraitement incrémental enregistré
+COLONNES_ETAT = ['_empreinte', '_cle', '_libelle']
+
+# Version du format de l'état de prétraitement (les états d'un ancien format ne sont plus relus)
+VERSION_ETAT = 2
+
+# Fonction pour calculer l'empreinte du contenu d'un export
+def empreinte_contenu(contenu):
+    return hashlib.sha256(contenu).hexdigest()
+
+# Fonction pour construire la clé de cache (contenu, version du chargeur et options de lecture)
+def cle_cache(empreinte, colonnes=None, categoriser=True):
+    options = f"{VERSION_CHARGEUR}|{sorted(colonnes) if colonnes is not None else '*'}|{categoriser}"
+    return f"{empreinte[:32]}-{hashlib.sha1(options.encode('utf-8')).hexdigest()[:12]}"
+
+# Fonction pour obtenir le chemin du fichier de cache d'une clé
+def chemin_cache(cle, repertoire=None):
+    return os.path.join(repertoire or REPERTOIRE_CACHE, cle + EXTENSION)
+
+# Fonction pour lire une entrée du cache en mémoire projetée
+def lire_cache(cle, repertoire=None):
+    chemin = chemin_cache(cle, repertoire)
+    if feather is None or not os.path.exists(chemin):
+        return None
+    table = feather.read_table(chemin, memory_map=True)
+    # Marquer l'entrée comme récemment utilisée pour l'éviction LRU
+    os.utime(chemin, None)
+    return table.to_pandas()
+
+# Fonction pour écrire une entrée du cache de façon atomique
+def ecrire_cache(cle, donnees, repertoire=None, taille_max=None):
+    if feather is None:
+        return None
+    repertoire = repertoire or REPERTOIRE_CACHE
+    os.makedirs(repertoire, exist_ok=True)
+    chemin = chemin_cache(cle, repertoire)
+    chemin_temporaire = f"{chemin}.{os.getpid()}.tmp"
+    table = densifier_colonnes(donnees).reset_index(drop=True)
+    # Attributs non enregistrés : compactage, optimisation et empreinte décrivent le tableau en mémoire et sont
+    # recalculés après relecture (ils ne sont pas sérialisables en JSON)
+    table.attrs = {}
+    # Sans compression pour que la relecture puisse être projetée en mémoire (Feather n'a pas de type creux)
+    feather.write_feather(table, chemin_temporaire, compression='uncompressed')
+    os.replace(chemin_temporaire, chemin)
+    evincer_cache(repertoire, taille_max)
+    return chemin
+
+# Fonction pour lister les entrées du cache, de la plus ancienne à la plus récente
+def lister_cache(repertoire=None):
+    entrees = []
+    for chemin in glob.glob(os.path.join(repertoire or REPERTOIRE_CACHE, '*' + EXTENSION)):
+        try:
+            statut = os.stat(chemin)
+        except FileNotFoundError:
+            continue
+        entrees.append((statut.st_mtime, statut.st_size, chemin))
+    return sorted(entrees)
+
+# Fonction pour supprimer les entrées les moins récemment utilisées au-delà de la taille maximale
+def evincer_cache(repertoire=None, taille_max=None):
+    taille_max = TAILLE_MAX_CACHE if taille_max is None else taille_max
+    entrees = lister_cache(repertoire)
+    taille_totale = sum(taille for _, taille, _ in entrees)
+    supprimes = []
+    for _, taille, chemin in entrees:
+        if taille_totale <= taille_max:
+            break
+        try:
+            os.remove(chemin)
+        except FileNotFoundError:
+            pass
+        taille_totale -= taille
+        supprimes.append(chemin)
+    return supprimes
+
+# Fonction pour charger un export en passant par le cache disque (le compactage des colonnes a lieu après relecture)
+def charger_export_en_cache(source, colonnes=None, categoriser=True, repertoire=None, taille_max=None, compacter=False):
+    contenu = lire_octets(source)
+    cle = cle_cache(empreinte_contenu(contenu), colonnes, categoriser)
+    donnees = lire_cache(cle, repertoire)
+    if donnees is None:
+        donnees = charger_export(contenu, colonnes=colonnes, categoriser=categoriser)
+        ecrire_cache(cle, donnees, repertoire, taille_max)
+    if compacter:
+        donnees, _ = compacter_colonnes(donnees)
+    return donnees
+
+# Fonction pour charger un export avec les colonnes de l'application (tableau de bord et visas de l'export) : le
+# préremplissage du cache passe par la même fonction pour produire les mêmes clés
+def charger_export_application(source, repertoire=None, taille_max=None):
+    contenu = lire_octets(source)
+    colonnes = colonnes_avec_visas(contenu, COLONNES_TABLEAU_DE_BORD)
+    return charger_export_en_cache(contenu, colonnes=colonnes, repertoire=repertoire, taille_max=taille_max, compacter=True)
+
+# Fonction pour construire la clé de l'état de prétraitement d'un projet (colonnes de la clé métier et options comprises)
+def cle_etat_pretraitement(nom_projet, colonnes, options):
+    description = f"{VERSION_CHARGEUR}|{VERSION_ETAT}|{nom_projet}|{list(colonnes)}|{sorted(options.items())}"
+    return f"etat-{hashlib.sha1(description.encode('utf-8')).hexdigest()[:32]}"
+
+# Fonction pour relire l'état de prétraitement incrémental enregistré pour un projet
+def lire_etat_pretraitement(nom_projet, colonnes, options, repertoire=None):
+    table = lire_cache(cle_etat_pretraitement(nom_projet, colonnes, options), repertoire)
+    if table is None:
+        return None
+    return {
+        'derivees': table.drop(columns=COLONNES_ETAT),
+        'empreintes': table['_empreinte'].to_numpy(),
+        'cles': table['_cle'].to_numpy(),
+        'libelles': table['_libelle'].to_numpy(),
+        'options': options,
+        'colonnes': list(colonnes)
+    }
+
+# Fonction pour enregistrer l'état de prétraitement incrémental d'un projet
+def ecrire_etat_pretraitement(nom_projet, etat, repertoire=None, taille_max=None):
+    table = etat['derivees'].assign(_empreinte=etat['empreintes'], _cle=etat['cles'], _libelle=etat['libelles'])
+    return ecrire_cache(cle_etat_pretraitement(nom_projet, etat['colonnes'], etat['options']), table, repertoire, taille_max)
+
+# Fonction pour préremplir le cache à partir d'un répertoire d'exports (colonnes chargées par l'application par défaut)
+def chauffer_cache(repertoire_exports, toutes_colonnes=False, repertoire=None, taille_max=None):
+    resultats = []
+    for chemin in sorted(glob.glob(os.path.join(repertoire_exports, '*.csv'))):
+        debut = time.perf_counter()
+        if toutes_colonnes:
+            donnees = charger_export_en_cache(chemin, repertoire=repertoire, taille_max=taille_max)
+        else:
+            donnees = charger_export_application(chemin, repertoire, taille_max)
+        resultats.append((chemin, donnees.shape[0], time.perf_counter() - debut))
+    return resultats
+
+# Exécution principale de l'outil de gestion du cache
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gestion du cache disque des exports GED")
+    parser.add_argument('--repertoire', default=None, help="Répertoire du cache")
+    parser.add_argument('--taille-max', type=int, default=None, help="Taille maximale du cache en octets")
+    sous_commandes = parser.add_subparsers(dest='commande', required=True)
+    commande_chauffer = sous_commandes.add_parser('chauffer', help="Préremplir le cache depuis un répertoire d'exports")
+    commande_chauffer.add_argument('exports', help="Répertoire contenant les exports CSV")
+    commande_chauffer.add_argument('--toutes-colonnes', action='store_true', help="Mettre en cache toutes les colonnes")
+    sous_commandes.add_parser('etat', help="Afficher le contenu du cache")
+    sous_commandes.add_parser('vider', help="Supprimer toutes les entrées du cache")
+    arguments = parser.parse_args()
+
+    if arguments.commande == 'chauffer':
+        for chemin, lignes, duree in chauffer_cache(arguments.exports, arguments.toutes_colonnes, arguments.repertoire, arguments.taille_max):
+            print(f"{chemin} : {lignes} lignes en {duree * 1000:.1f} ms")
+    elif arguments.commande == 'etat':
+        entrees = lister_cache(arguments.repertoire)
+        for date_acces, taille, chemin in entrees:
+            print(f"{time.strftime('%d/%m/%Y %H:%M:%S', time.localtime(date_acces))}  {taille / 1e6:8.2f} Mo  {chemin}")
+        print(f"Total : {len(entrees)} entrées, {sum(taille for _, taille, _ in entrees) / 1e6:.2f} Mo")
+    elif arguments.commande == 'vider':
+        supprimes = evincer_cache(arguments.repertoire, taille_max=0)
+        print(f"{len(supprimes)} entrées supprimées")
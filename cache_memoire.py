@@ -0,0 +1,224 @@
+import functools
+import hashlib
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from chargement import VERSION_CHARGEUR
+
+# Copy-on-write pour toute l'application : les tableaux du cache sont partagés sans copie, une modification copie
+# la colonne concernée (les scripts l'activent en important le cache)
+pd.set_option('mode.copy_on_write', True)
+
+# Nombre maximal de résultats conservés en mémoire (modifiable par variable d'environnement)
+NOMBRE_MAX_ENTREES = int(os.environ.get('GED_CACHE_MEMOIRE_ENTREES', 256))
+
+# Taille des morceaux lus pour calculer l'empreinte d'un fichier (le contenu n'est jamais recopié en entier)
+TAILLE_MORCEAU_EMPREINTE = 1024 * 1024
+
+# Empreinte d'un tableau conservée dans ses attributs : elle n'est valable que pour le tableau qui l'a reçue
+# (même index et mêmes colonnes), un tableau filtré, trié ou enrichi retombe sur le calcul complet.
+# Partagée par toutes les vues du tableau, elle les relie aussi à leur entrée du cache
+class EmpreinteDonnees:
+    def __init__(self, valeur, index, colonnes):
+        self.valeur = valeur
+        self.index = index
+        self.colonnes = colonnes
+        self.entree = None
+
+    def __deepcopy__(self, memo):
+        return self
+
+    # Fonction pour vérifier que l'empreinte décrit bien ce tableau
+    def correspond(self, donnees):
+        return donnees.index.is_(self.index) and tuple(donnees.columns) == self.colonnes
+
+# Fonction pour rattacher une empreinte à un tableau
+def marquer_empreinte(donnees, valeur):
+    donnees.attrs['empreinte'] = EmpreinteDonnees(valeur, donnees.index, tuple(donnees.columns))
+    return donnees
+
+# Fonction pour obtenir l'empreinte d'un tableau (celle de ses attributs si elle est valable, sinon hachage des valeurs)
+def empreinte_donnees(donnees):
+    empreinte = donnees.attrs.get('empreinte')
+    if isinstance(empreinte, EmpreinteDonnees) and empreinte.correspond(donnees):
+        return empreinte.valeur
+    hachage = hashlib.sha256(str(list(donnees.columns)).encode('utf-8'))
+    hachage.update(pd.util.hash_pandas_object(donnees, index=True).to_numpy().tobytes())
+    return hachage.hexdigest()
+
+# Fonction pour calculer l'empreinte du contenu d'un fichier (chemin, fichier ouvert ou octets) en le lisant par morceaux
+def empreinte_fichier(source):
+    hachage = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        hachage.update(source)
+        return hachage.hexdigest()
+    fichier = source if hasattr(source, 'read') else open(source, 'rb')
+    try:
+        if hasattr(fichier, 'seek'):
+            fichier.seek(0)
+        for morceau in iter(lambda: fichier.read(TAILLE_MORCEAU_EMPREINTE), b''):
+            hachage.update(morceau)
+    finally:
+        if fichier is not source:
+            fichier.close()
+        elif hasattr(fichier, 'seek'):
+            fichier.seek(0)
+    return hachage.hexdigest()
+
+# Chemin d'un fichier dont le contenu sert de clé de cache (un texte ordinaire reste une valeur, même s'il nomme un fichier)
+class CheminFichier(str):
+    pass
+
+# Fonction pour construire la partie de clé d'un argument (tableaux, tableaux numpy et fichiers par empreinte, le reste tel quel)
+def cle_argument(argument):
+    if isinstance(argument, pd.DataFrame):
+        return ('donnees', empreinte_donnees(argument))
+    if isinstance(argument, np.ndarray):
+        return ('tableau', str(argument.dtype), argument.shape, hashlib.sha256(pd.util.hash_array(argument.ravel()).tobytes()).hexdigest())
+    if isinstance(argument, dict):
+        return tuple((cle, cle_argument(valeur)) for cle, valeur in argument.items())
+    if isinstance(argument, (list, tuple)):
+        return tuple(cle_argument(valeur) for valeur in argument)
+    if hasattr(argument, 'read') or isinstance(argument, (bytes, bytearray, CheminFichier)):
+        return ('fichier', empreinte_fichier(argument))
+    return argument
+
+# Fonction pour rendre un résultat partagé : les tableaux sont des copies superficielles qui ne recopient aucune donnée
+# (avec le copy-on-write de pandas, une modification par l'appelant copie la colonne au lieu d'altérer l'entrée du cache)
+def partager(valeur):
+    if isinstance(valeur, pd.DataFrame):
+        return valeur.copy(deep=False)
+    if isinstance(valeur, tuple):
+        return tuple(partager(element) for element in valeur)
+    return valeur
+
+# Fonction pour libérer un résultat qui quitte le cache (évincé, vidé ou remplacé par un calcul concurrent) :
+# les moteurs de calcul ferment leur base
+def liberer(valeur):
+    fermer = None if isinstance(valeur, pd.DataFrame) else getattr(valeur, 'fermer', None)
+    if callable(fermer):
+        fermer()
+
+# Résultat conservé avec la durée de son calcul (pour estimer le temps économisé à chaque succès)
+class EntreeCache:
+    def __init__(self, valeur, duree):
+        self.valeur = valeur
+        self.duree = duree
+
+# Cache en mémoire du processus indexé par empreintes, avec éviction LRU et compteurs de succès et d'échecs par fonction.
+# Un tableau évincé reste réutilisable tant qu'une session en garde une vue : chaque tableau n'existe qu'une fois
+# en mémoire, quel que soit le nombre de sessions qui le consultent
+class CacheEmpreintes:
+    def __init__(self, nombre_max_entrees=NOMBRE_MAX_ENTREES):
+        self.nombre_max_entrees = nombre_max_entrees
+        self.entrees = OrderedDict()
+        self.partages = weakref.WeakValueDictionary()
+        self.compteurs = {}
+        # Fonctions appelées à chaque succès ou échec (nom de la fonction, succès), par exemple pour l'instrumentation
+        self.observateurs = []
+        self.verrou = threading.Lock()
+
+    # Fonction pour mettre à jour les compteurs d'une fonction
+    def compter(self, nom, succes, duree):
+        compteur = self.compteurs.setdefault(nom, {'Succès': 0, 'Échecs': 0, 'Temps de calcul (s)': 0.0, 'Temps économisé (s)': 0.0})
+        if succes:
+            compteur['Succès'] += 1
+            compteur['Temps économisé (s)'] += duree
+        else:
+            compteur['Échecs'] += 1
+            compteur['Temps de calcul (s)'] += duree
+        for observateur in self.observateurs:
+            observateur(nom, succes)
+
+    # Fonction pour retrouver l'entrée d'une clé (dans le cache, ou parmi les tableaux évincés encore consultés)
+    def chercher(self, cle):
+        entree = self.entrees.get(cle)
+        if entree is None:
+            empreinte = self.partages.get(cle)
+            entree = empreinte.entree if empreinte is not None else None
+            if entree is None:
+                return None
+            self.entrees[cle] = entree
+        self.entrees.move_to_end(cle)
+        return entree
+
+    # Fonction pour enregistrer une entrée et évincer les moins récemment utilisées (rend aussi les résultats à libérer)
+    def enregistrer(self, cle, entree):
+        # Un calcul concurrent de la même clé garde le premier résultat enregistré
+        proposee = entree
+        entree = self.entrees.setdefault(cle, entree)
+        self.entrees.move_to_end(cle)
+        liberes = [proposee.valeur] if entree is not proposee else []
+        empreinte = entree.valeur.attrs.get('empreinte') if isinstance(entree.valeur, pd.DataFrame) else None
+        if isinstance(empreinte, EmpreinteDonnees) and empreinte.entree is None and empreinte.correspond(entree.valeur):
+            empreinte.entree = entree
+            self.partages[cle] = empreinte
+        while len(self.entrees) > self.nombre_max_entrees:
+            liberes.append(self.entrees.popitem(last=False)[1].valeur)
+        return entree, liberes
+
+    # Fonction pour obtenir le résultat d'une clé, en le calculant lors du premier appel
+    def obtenir(self, nom, cle, calcul):
+        with self.verrou:
+            entree = self.chercher(cle)
+            if entree is not None:
+                self.compter(nom, True, entree.duree)
+        if entree is None:
+            debut = time.perf_counter()
+            entree = EntreeCache(calcul(), time.perf_counter() - debut)
+            with self.verrou:
+                entree, liberes = self.enregistrer(cle, entree)
+                self.compter(nom, False, entree.duree)
+            for valeur in liberes:
+                liberer(valeur)
+        return partager(entree.valeur)
+
+    # Fonction pour résumer les compteurs par fonction
+    def statistiques(self):
+        with self.verrou:
+            statistiques = pd.DataFrame.from_dict(self.compteurs, orient='index', columns=['Succès', 'Échecs', 'Temps de calcul (s)', 'Temps économisé (s)'])
+        statistiques.index.name = 'Fonction'
+        appels = statistiques['Succès'] + statistiques['Échecs']
+        statistiques['Taux de succès (%)'] = (statistiques['Succès'] / appels.where(appels > 0) * 100).fillna(0)
+        return statistiques
+
+    # Fonction pour compter les tableaux partagés encore en mémoire (dans le cache ou consultés par une session)
+    def nombre_tableaux_partages(self):
+        with self.verrou:
+            return len(self.partages)
+
+    # Fonction pour vider le cache et remettre les compteurs à zéro
+    def vider(self):
+        with self.verrou:
+            liberes = [entree.valeur for entree in self.entrees.values()]
+            self.entrees.clear()
+            self.partages.clear()
+            self.compteurs.clear()
+        for valeur in liberes:
+            liberer(valeur)
+
+# Cache partagé par toutes les sessions du processus (les modules importés ne sont pas réexécutés à chaque session)
+CACHE = CacheEmpreintes()
+
+# Fonction pour mettre en cache une fonction selon l'empreinte de ses arguments (et non le hachage complet des tableaux)
+def cache_par_empreinte(fonction):
+    nom = fonction.__name__
+    # Fichier de définition dans la clé : les applications d'un même processus ont des fonctions homonymes différentes
+    origine = f"{fonction.__code__.co_filename}:{fonction.__qualname__}"
+
+    @functools.wraps(fonction)
+    def enveloppe(*args, **kwargs):
+        cle = (nom, origine, VERSION_CHARGEUR, cle_argument(args), cle_argument(tuple(sorted(kwargs.items()))))
+
+        # Les tableaux produits reçoivent l'empreinte de leur calcul pour que les fonctions suivantes la réutilisent
+        def calculer():
+            resultat = fonction(*args, **kwargs)
+            if isinstance(resultat, pd.DataFrame):
+                marquer_empreinte(resultat, hashlib.sha256(repr(cle).encode('utf-8')).hexdigest())
+            return resultat
+        return CACHE.obtenir(nom, cle, calculer)
+    return enveloppe
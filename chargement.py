@@ -0,0 +1,276 @@
+import io
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
+# Version du chargeur : à incrémenter dès que le typage des colonnes change
+VERSION_CHARGEUR = 2
+
+ENCODAGE = 'iso-8859-1'
+SEPARATEUR = ';'
+COLONNE_DATE = 'Date dépôt GED'
+
+# Noms de la colonne de numéro de document selon les exports
+COLONNES_NUMERO = ['Numéro', 'Numéro de document', '4 numéros', '3 caractère compris entre 0 & 9']
+
+# Colonnes lues comme texte, quel que soit le moteur de lecture
+COLONNES_TEXTE = [
+    'Date dépôt GED',
+    'TYPE DE DOCUMENT',
+    'PROJET',
+    'EMET',
+    'LOT',
+    'INDICE',
+    'Libellé du document',
+    'Catégories de documents'
+] + COLONNES_NUMERO
+
+# Dimensions à faible cardinalité converties en catégories
+COLONNES_CATEGORIELLES = ['PROJET', 'EMET', 'LOT', 'TYPE DE DOCUMENT', 'INDICE']
+
+# Colonnes nécessaires aux onglets du tableau de bord
+COLONNES_TABLEAU_DE_BORD = [
+    'PROJET',
+    'EMET',
+    'LOT',
+    'TYPE DE DOCUMENT',
+    'INDICE',
+    'Libellé du document',
+    'Date dépôt GED',
+    'Ajouté par',
+    'Catégories de documents'
+] + COLONNES_NUMERO
+
+# Taux de remplissage sous lequel une colonne de texte est stockée en format creux
+SEUIL_CREUX = 0.25
+
+# Fonction pour lire le contenu brut d'un fichier (chemin ou fichier téléchargé)
+def lire_octets(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, 'read'):
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        contenu = source.read()
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return contenu
+    with open(source, 'rb') as fichier:
+        return fichier.read()
+
+# Fonction pour lire l'en-tête d'un export sans parser le reste du fichier
+def lire_entete(contenu):
+    premiere_ligne = contenu.split(b'\n', 1)[0].decode(ENCODAGE).rstrip('\r')
+    return [colonne.strip('"') for colonne in premiere_ligne.split(SEPARATEUR)]
+
+# Fonction pour parser les dates au format fixe jj/mm/aaaa sans boucle Python
+def parser_dates_jjmmaaaa(valeurs):
+    valeurs = pd.Series(valeurs)
+    index = valeurs.index
+    presentes = valeurs.notna().to_numpy()
+    textes = valeurs.to_numpy(dtype=object)
+    textes = np.where(presentes, textes, '')
+    # Une colonne de plus que le format pour détecter les valeurs trop longues
+    codes = np.asarray(textes, dtype='U11').view(np.uint32).reshape(-1, 11).astype(np.int64)
+    chiffres = codes - ord('0')
+    positions_chiffres = [0, 1, 3, 4, 6, 7, 8, 9]
+    format_valide = (
+        (codes[:, 2] == ord('/')) & (codes[:, 5] == ord('/')) & (codes[:, 10] == 0)
+        & ((chiffres[:, positions_chiffres] >= 0) & (chiffres[:, positions_chiffres] <= 9)).all(axis=1)
+    )
+    jour = chiffres[:, 0] * 10 + chiffres[:, 1]
+    mois = chiffres[:, 3] * 10 + chiffres[:, 4]
+    annee = chiffres[:, 6] * 1000 + chiffres[:, 7] * 100 + chiffres[:, 8] * 10 + chiffres[:, 9]
+    format_valide &= (mois >= 1) & (mois <= 12) & (jour >= 1) & (jour <= 31)
+
+    annee = np.where(format_valide, annee, 1970)
+    mois = np.where(format_valide, mois, 1)
+    jour = np.where(format_valide, jour, 1)
+    debut_mois = (annee - 1970).astype('datetime64[Y]').astype('datetime64[M]') + (mois - 1).astype('timedelta64[M]')
+    dates = debut_mois.astype('datetime64[D]') + (jour - 1).astype('timedelta64[D]')
+    # Écarter les jours inexistants (31/04, 29/02 hors année bissextile...)
+    format_valide &= dates.astype('datetime64[M]') == debut_mois
+    dates = np.where(format_valide, dates, np.datetime64('NaT')).astype('datetime64[ns]')
+    resultat = pd.Series(dates, index=index)
+
+    # Les rares valeurs hors format fixe passent par le parseur générique
+    a_reprendre = presentes & ~format_valide
+    if a_reprendre.any():
+        resultat[a_reprendre] = pd.to_datetime(valeurs[a_reprendre], format='%d/%m/%Y', errors='coerce')
+    return resultat
+
+# Fonction pour lire un export avec le moteur pyarrow
+def _lire_avec_pyarrow(contenu, colonnes):
+    entete = lire_entete(contenu)
+    options_conversion = pa_csv.ConvertOptions(
+        column_types={colonne: pa.string() for colonne in COLONNES_TEXTE if colonne in entete},
+        include_columns=[colonne for colonne in entete if colonne in colonnes] if colonnes is not None else None
+    )
+    table = pa_csv.read_csv(
+        io.BytesIO(contenu),
+        read_options=pa_csv.ReadOptions(encoding='latin1'),
+        parse_options=pa_csv.ParseOptions(delimiter=SEPARATEUR, newlines_in_values=True),
+        convert_options=options_conversion
+    )
+    return table.to_pandas()
+
+# Fonction pour lire un export avec le moteur pandas habituel
+def _lire_avec_pandas(contenu, colonnes):
+    spec_types = {colonne: str for colonne in COLONNES_TEXTE}
+    colonnes_utiles = None
+    if colonnes is not None:
+        ensemble_colonnes = set(colonnes)
+        colonnes_utiles = lambda colonne: colonne in ensemble_colonnes
+    return pd.read_csv(io.BytesIO(contenu), encoding=ENCODAGE, sep=SEPARATEUR, dtype=spec_types, usecols=colonnes_utiles, low_memory=False)
+
+# Fonction pour charger un export GED typé (colonnes utiles, catégories et dates)
+def charger_export(source, colonnes=None, categoriser=True, moteur='auto', compacter=False):
+    contenu = lire_octets(source)
+    if moteur == 'auto':
+        moteur = 'pyarrow' if pa is not None else 'pandas'
+    if moteur == 'pyarrow':
+        if pa is None:
+            raise ImportError("Le moteur 'pyarrow' nécessite le paquet pyarrow.")
+        donnees = _lire_avec_pyarrow(contenu, colonnes)
+    elif moteur == 'pandas':
+        donnees = _lire_avec_pandas(contenu, colonnes)
+    else:
+        raise ValueError(f"Moteur de lecture inconnu : {moteur}")
+
+    if COLONNE_DATE in donnees.columns:
+        donnees[COLONNE_DATE] = parser_dates_jjmmaaaa(donnees[COLONNE_DATE])
+    if categoriser:
+        for colonne in COLONNES_CATEGORIELLES:
+            if colonne in donnees.columns:
+                donnees[colonne] = donnees[colonne].astype('category')
+    if compacter:
+        donnees, _ = compacter_colonnes(donnees)
+    return donnees
+
+# Fonction pour repérer les cellules vides (valeur manquante ou texte vide)
+def cellules_vides(serie):
+    vides = serie.isna().to_numpy()
+    if serie.dtype == object:
+        vides = vides | (serie.to_numpy() == '')
+    return vides
+
+# Fonction pour mesurer la mémoire de chaque colonne (valeurs et index creux compris pour les colonnes creuses)
+def memoire_colonnes(donnees):
+    memoires = {}
+    for colonne in donnees.columns:
+        serie = donnees[colonne]
+        if isinstance(serie.dtype, pd.SparseDtype):
+            valeurs = serie.array
+            memoires[colonne] = int(pd.Series(valeurs.sp_values).memory_usage(deep=True, index=False) + valeurs.sp_index.indices.nbytes)
+        else:
+            memoires[colonne] = int(serie.memory_usage(deep=True, index=False))
+    return pd.Series(memoires, index=donnees.columns, dtype=np.int64)
+
+# Fonction pour mesurer le taux de remplissage et la mémoire de chaque colonne
+def profiler_colonnes(donnees):
+    renseignees = {colonne: int(len(donnees) - cellules_vides(donnees[colonne]).sum()) for colonne in donnees.columns}
+    profil = pd.DataFrame({
+        'Valeurs renseignées': pd.Series(renseignees, dtype=np.int64),
+        'Taux de remplissage': pd.Series(renseignees, dtype=np.float64) / max(len(donnees), 1),
+        'Mémoire (octets)': memoire_colonnes(donnees)
+    })
+    profil.index.name = 'Colonne'
+    return profil
+
+# Fonction pour choisir la valeur de remplissage d'une colonne peu renseignée (la valeur vide la plus fréquente)
+def valeur_vide(serie):
+    if serie.dtype == object and (serie.to_numpy() == '').sum() >= serie.isna().sum():
+        return ''
+    return np.nan
+
+# Description d'un compactage (colonnes d'origine, colonnes supprimées, mémoire) conservée dans les attributs du tableau :
+# immuable, elle est partagée sans copie par les tableaux dérivés
+class DescriptionCompactage:
+    def __init__(self, ordre_colonnes, colonnes_vides, colonnes_creuses, octets_avant, octets_apres):
+        self.ordre_colonnes = tuple(ordre_colonnes)
+        self.colonnes_vides = dict(colonnes_vides)
+        self.colonnes_creuses = tuple(colonnes_creuses)
+        self.octets_avant = octets_avant
+        self.octets_apres = octets_apres
+
+    def __deepcopy__(self, memo):
+        return self
+
+    # Fonction pour obtenir la mémoire libérée par le compactage
+    @property
+    def octets_liberes(self):
+        return self.octets_avant - self.octets_apres
+
+# Fonction pour supprimer les colonnes vides et stocker les colonnes de texte peu renseignées en format creux
+def compacter_colonnes(donnees, seuil_creux=SEUIL_CREUX, conserver=COLONNES_TABLEAU_DE_BORD):
+    profil = profiler_colonnes(donnees)
+    conserver = set(conserver)
+    colonnes_vides = {}
+    colonnes_creuses = {}
+    for colonne, taux in profil['Taux de remplissage'].items():
+        if colonne in conserver:
+            continue
+        serie = donnees[colonne]
+        if taux == 0:
+            colonnes_vides[colonne] = (valeur_vide(serie), str(serie.dtype))
+        elif taux < seuil_creux and serie.dtype == object:
+            colonnes_creuses[colonne] = pd.arrays.SparseArray(serie.to_numpy(dtype=object), fill_value=valeur_vide(serie))
+
+    compact = donnees.drop(columns=list(colonnes_vides)).assign(**{colonne: pd.Series(valeurs, index=donnees.index) for colonne, valeurs in colonnes_creuses.items()})
+
+    profil['Stockage'] = 'dense'
+    profil.loc[list(colonnes_creuses), 'Stockage'] = 'creux'
+    profil.loc[list(colonnes_vides), 'Stockage'] = 'supprimée'
+    # Seule la mémoire des colonnes creuses est remesurée
+    profil['Mémoire compactée (octets)'] = profil['Mémoire (octets)'].where(profil['Stockage'] == 'dense', 0)
+    profil.loc[list(colonnes_creuses), 'Mémoire compactée (octets)'] = memoire_colonnes(compact[list(colonnes_creuses)])
+    # Colonnes supprimées mémorisées pour pouvoir les reconstituer à la demande
+    compact.attrs['compactage'] = DescriptionCompactage(
+        donnees.columns, colonnes_vides, colonnes_creuses,
+        int(profil['Mémoire (octets)'].sum()), int(profil['Mémoire compactée (octets)'].sum())
+    )
+    return compact, profil
+
+# Fonction pour lister toutes les colonnes de l'export, y compris celles supprimées au compactage
+def colonnes_chargees(donnees):
+    description = donnees.attrs.get('compactage')
+    return list(description.ordre_colonnes if description is not None else donnees.columns)
+
+# Fonction pour reconstituer à la demande des colonnes supprimées ou creuses sous leur forme dense d'origine
+def restaurer_colonnes(donnees, colonnes=None):
+    description = donnees.attrs.get('compactage')
+    colonnes_vides = description.colonnes_vides if description is not None else {}
+    colonnes = colonnes_chargees(donnees) if colonnes is None else list(colonnes)
+    restaurees = {}
+    for colonne in colonnes:
+        if colonne in colonnes_vides:
+            valeur, type_colonne = colonnes_vides[colonne]
+            restaurees[colonne] = pd.Series(valeur, index=donnees.index, dtype=type_colonne)
+        elif colonne in donnees.columns and isinstance(donnees[colonne].dtype, pd.SparseDtype):
+            restaurees[colonne] = donnees[colonne].sparse.to_dense()
+    if not restaurees:
+        return donnees
+    ordre = [colonne for colonne in colonnes_chargees(donnees) if colonne in donnees.columns or colonne in restaurees]
+    ordre += [colonne for colonne in donnees.columns if colonne not in ordre]
+    resultat = donnees.assign(**restaurees)[ordre]
+    if description is not None:
+        resultat.attrs['compactage'] = DescriptionCompactage(
+            description.ordre_colonnes,
+            {colonne: valeur for colonne, valeur in colonnes_vides.items() if colonne not in restaurees},
+            [colonne for colonne in description.colonnes_creuses if colonne not in restaurees],
+            description.octets_avant, description.octets_apres
+        )
+    return resultat
+
+# Fonction pour convertir les colonnes creuses en colonnes denses (formats de fichier sans type creux)
+def densifier_colonnes(donnees):
+    creuses = [colonne for colonne in donnees.columns if isinstance(donnees[colonne].dtype, pd.SparseDtype)]
+    if not creuses:
+        return donnees
+    return donnees.assign(**{colonne: donnees[colonne].sparse.to_dense() for colonne in creuses})
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from chargement import COLONNE_DATE
+from index_projet import IndexDates, entiers_dates, tranche_dates
+
+# Durée de chaque période d'analyse à partir du premier dépôt du projet (None : toute la période)
+PERIODES_MASSE = {'6m': 180, '12m': 365, 'all': None}
+
+# Fonction pour consolider plusieurs projets en une seule table (projet catégoriel, premier et dernier dépôt précalculés).
+# Les lignes de chaque projet se suivent, triées par date de dépôt (dates manquantes en dernier)
+def consolider_projets(projets, colonnes=(COLONNE_DATE,)):
+    noms = list(projets)
+    index_dates = [IndexDates(projets[nom]) for nom in noms]
+    codes_projet = np.repeat(np.arange(len(noms)), [len(projets[nom]) for nom in noms])
+    consolide = pd.DataFrame({'Projet': pd.Categorical.from_codes(codes_projet, categories=noms)})
+    for colonne in colonnes:
+        consolide[colonne] = np.concatenate([projets[nom][colonne].to_numpy()[index.ordre] for nom, index in zip(noms, index_dates)]) if noms else []
+
+    consolide['Premier dépôt'] = pd.DatetimeIndex([index.premier for index in index_dates], dtype='datetime64[ns]').to_numpy()[codes_projet]
+    consolide['Dernier dépôt'] = pd.DatetimeIndex([index.dernier for index in index_dates], dtype='datetime64[ns]').to_numpy()[codes_projet]
+    return consolide
+
+# Fonction pour calculer la masse de documents de chaque projet sur sa période d'analyse, avec la médiane.
+# La masse d'un projet est la tranche de ses dates triées comprise dans la période, trouvée par recherche dichotomique
+def masse_documents_par_projet(consolide, projets_selectionnes, periode_selectionnee):
+    jours = PERIODES_MASSE[periode_selectionnee]
+    projets = consolide['Projet'].cat.categories
+    bornes = np.searchsorted(consolide['Projet'].cat.codes.to_numpy(), np.arange(len(projets) + 1))
+    dates = entiers_dates(consolide[COLONNE_DATE].to_numpy())
+    masses, debuts, fins = [], [], []
+    for projet in projets_selectionnes:
+        code = projets.get_loc(projet) if projet in projets else None
+        if code is None or bornes[code] == bornes[code + 1]:
+            masses.append(0)
+            debuts.append(pd.NaT)
+            fins.append(pd.NaT)
+            continue
+        debut = consolide['Premier dépôt'].iat[bornes[code]]
+        fin = consolide['Dernier dépôt'].iat[bornes[code]] if jours is None else debut + pd.Timedelta(days=jours)
+        gauche, droite = tranche_dates(dates[bornes[code]:bornes[code + 1]], debut, fin)
+        masses.append(droite - gauche)
+        debuts.append(debut)
+        fins.append(fin)
+    df_barre = pd.DataFrame({
+        'Chantier': pd.Index(projets_selectionnes).astype(str),
+        'Masse de documents': np.asarray(masses, dtype=np.int64),
+        'Date début': pd.Series(debuts, dtype='datetime64[ns]').dt.strftime('%d %b %Y').to_numpy(),
+        'Date fin': pd.Series(fins, dtype='datetime64[ns]').dt.strftime('%d %b %Y').to_numpy()
+    })
+    df_barre = df_barre.sort_values(by='Masse de documents', ascending=False)
+    df_barre['mediane'] = df_barre['Masse de documents'].median()
+    return df_barre
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+# Étapes du diagramme de flux, de la source vers la cible
+ETAPES_FLUX = ['PROJET', 'EMET', 'TYPE DE DOCUMENT', 'INDICE']
+LIBELLE_AUTRES = 'Autres'
+
+# Fonction pour regrouper les valeurs les moins fréquentes d'une étape dans un nœud « Autres »
+def regrouper_valeurs_rares(valeurs, nombre_max_noeuds=None):
+    codes, uniques = pd.factorize(valeurs)
+    uniques = np.asarray(uniques, dtype=object)
+    if nombre_max_noeuds is None or len(uniques) <= nombre_max_noeuds:
+        return codes, uniques
+    effectifs = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    # Ordre stable : à effectif égal, la première valeur rencontrée est conservée
+    conservees = np.sort(np.argsort(-effectifs, kind='stable')[:nombre_max_noeuds - 1])
+    nouveaux_codes = np.full(len(uniques), nombre_max_noeuds - 1, dtype=np.int64)
+    nouveaux_codes[conservees] = np.arange(len(conservees))
+    codes = np.where(codes >= 0, nouveaux_codes[np.maximum(codes, 0)], -1)
+    return codes, np.append(uniques[conservees], LIBELLE_AUTRES)
+
+# Fonction pour agréger les flux entre étapes en liens uniques pondérés (sans modifier les données)
+def agreger_flux(donnees, etapes=ETAPES_FLUX, nombre_max_noeuds=None):
+    codes_etapes = []
+    etiquettes_etapes = []
+    for etape in etapes:
+        codes, etiquettes = regrouper_valeurs_rares(donnees[etape].to_numpy(dtype=object), nombre_max_noeuds)
+        codes_etapes.append(codes)
+        etiquettes_etapes.append(etiquettes)
+
+    # Pourcentage de chaque valeur de la dernière étape (indice) dans son étiquette
+    codes_dernier = codes_etapes[-1]
+    effectifs = np.bincount(codes_dernier[codes_dernier >= 0], minlength=len(etiquettes_etapes[-1]))
+    pourcentages = effectifs / max(effectifs.sum(), 1) * 100
+    etiquettes_etapes[-1] = np.array([f"{etiquette} ({pourcentage:.2f}%)" for etiquette, pourcentage in zip(etiquettes_etapes[-1], pourcentages)], dtype=object)
+
+    # Les nœuds sont numérotés étape par étape : un même libellé dans deux étapes reste deux nœuds
+    decalages = np.cumsum([0] + [len(etiquettes) for etiquettes in etiquettes_etapes])
+    source, cible, valeur = [], [], []
+    for numero in range(len(etapes) - 1):
+        codes_source, codes_cible = codes_etapes[numero], codes_etapes[numero + 1]
+        valides = (codes_source >= 0) & (codes_cible >= 0)
+        nombre_cibles = len(etiquettes_etapes[numero + 1])
+        liens = np.bincount(codes_source[valides] * nombre_cibles + codes_cible[valides], minlength=len(etiquettes_etapes[numero]) * nombre_cibles)
+        existants = np.flatnonzero(liens)
+        source.extend((existants // nombre_cibles + decalages[numero]).tolist())
+        cible.extend((existants % nombre_cibles + decalages[numero + 1]).tolist())
+        valeur.extend(liens[existants].tolist())
+
+    return {
+        'etiquettes': [str(etiquette) for etiquettes in etiquettes_etapes for etiquette in etiquettes],
+        'source': source,
+        'cible': cible,
+        'valeur': valeur
+    }
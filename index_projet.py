@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+from chargement import COLONNE_DATE
+from pretraitement import NAT_ENTIER, coder
+
+# Colonnes des filtres des onglets indexées par bitmaps
+COLONNES_INDEX = ['LOT', 'INDICE', 'TYPE DE DOCUMENT', 'EMET', 'Ajouté par']
+
+# Durée des périodes d'analyse à partir du premier dépôt (None : jusqu'au dernier dépôt)
+PERIODES_ANALYSE = {'6 mois': 180, '1 an': 365, 'Toute la période': None}
+
+# Valeur entière des dates manquantes dans les dates triées (après toutes les autres)
+DATE_MANQUANTE = np.iinfo(np.int64).max
+
+# Fonction pour obtenir les codes d'une colonne (valeurs manquantes : -1) et ses modalités
+def coder_colonne(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy().astype(np.int64), serie.cat.categories
+    codes, modalites = coder(serie)
+    return codes, pd.Index(modalites)
+
+# Fonction pour empaqueter les lignes de chaque valeur en bitmaps (un bit par ligne, huit lignes par octet, bit de poids
+# faible en premier). Les lignes sont parcourues triées par valeur puis par position : les bits d'un même octet se suivent
+def empaqueter_bitmaps(codes_tries, ordre, nombre_valeurs, nombre_lignes):
+    nombre_octets = (nombre_lignes + 7) // 8
+    bitmaps = np.zeros(nombre_valeurs * nombre_octets, dtype=np.uint8)
+    if nombre_lignes:
+        cles = codes_tries * nombre_octets + (ordre >> 3)
+        bits = np.left_shift(np.uint8(1), (ordre & 7).astype(np.uint8))
+        debuts = np.flatnonzero(np.r_[True, cles[1:] != cles[:-1]])
+        bitmaps[cles[debuts]] = np.bitwise_or.reduceat(bits, debuts)
+    return bitmaps.reshape(nombre_valeurs, nombre_octets)
+
+# Index des lignes d'un projet par valeur des colonnes filtrées : un bitmap par valeur (valeurs manquantes comprises,
+# en dernier), et la permutation des lignes triées par valeur dont chaque valeur est une tranche. Les filtres de plusieurs
+# valeurs sont l'union (OU) de leurs bitmaps, les filtres de plusieurs colonnes leur intersection (ET)
+class IndexBitmaps:
+    def __init__(self, donnees, colonnes=COLONNES_INDEX):
+        self.lignes = len(donnees)
+        self.modalites = {}
+        self.ordres = {}
+        self.bornes = {}
+        self.bitmaps = {}
+        for colonne in colonnes:
+            if colonne not in donnees.columns:
+                continue
+            codes, modalites = coder_colonne(donnees[colonne])
+            codes[codes < 0] = len(modalites)
+            ordre = np.argsort(codes, kind='stable').astype(np.int32)
+            codes_tries = codes[ordre]
+            ordre.flags.writeable = False
+            self.modalites[colonne] = modalites
+            self.ordres[colonne] = ordre
+            self.bornes[colonne] = np.searchsorted(codes_tries, np.arange(len(modalites) + 2))
+            self.bitmaps[colonne] = empaqueter_bitmaps(codes_tries, ordre, len(modalites) + 1, self.lignes)
+
+    # Fonction pour obtenir la mémoire occupée par les bitmaps et les permutations
+    def memoire(self):
+        return sum(bitmap.nbytes for bitmap in self.bitmaps.values()) + sum(ordre.nbytes for ordre in self.ordres.values())
+
+    # Fonction pour vérifier qu'une colonne est indexée
+    def couvre(self, colonne):
+        return colonne in self.bitmaps
+
+    # Fonction pour obtenir les codes des valeurs retenues d'une colonne (les valeurs absentes du projet sont ignorées)
+    def codes(self, colonne, valeurs):
+        valeurs = pd.Index(list(valeurs), dtype=object)
+        manquantes = valeurs.isna()
+        codes = self.modalites[colonne].get_indexer(valeurs[~manquantes])
+        codes = codes[codes >= 0]
+        if manquantes.any():
+            codes = np.append(codes, len(self.modalites[colonne]))
+        return np.unique(codes)
+
+    # Fonction pour obtenir le bitmap des valeurs retenues d'une colonne (union de leurs bitmaps)
+    def bitmap(self, colonne, valeurs):
+        return np.bitwise_or.reduce(self.bitmaps[colonne][self.codes(colonne, valeurs)], axis=0)
+
+    # Fonction pour combiner les filtres de plusieurs colonnes en un bitmap (None : aucun filtre actif)
+    def combiner(self, filtres):
+        resultat = None
+        for colonne, valeurs in filtres.items():
+            if valeurs is None:
+                continue
+            bitmap = self.bitmap(colonne, valeurs)
+            resultat = bitmap if resultat is None else resultat & bitmap
+        return resultat
+
+    # Fonction pour obtenir le masque booléen des lignes retenues par des filtres
+    def masque(self, filtres):
+        bitmap = self.combiner(filtres)
+        if bitmap is None:
+            return np.ones(self.lignes, dtype=bool)
+        return np.unpackbits(bitmap, count=self.lignes, bitorder='little').view(bool)
+
+    # Fonction pour obtenir les positions des lignes retenues, dans l'ordre du tableau. Une seule valeur d'une seule
+    # colonne est rendue sans copie (vue en lecture seule sur la permutation triée), les autres filtres par leur bitmap
+    def positions(self, filtres):
+        actifs = {colonne: valeurs for colonne, valeurs in filtres.items() if valeurs is not None}
+        if len(actifs) == 1:
+            (colonne, valeurs), = actifs.items()
+            codes = self.codes(colonne, valeurs)
+            if len(codes) == 1:
+                return self.ordres[colonne][self.bornes[colonne][codes[0]]:self.bornes[colonne][codes[0] + 1]]
+        bitmap = self.combiner(actifs)
+        if bitmap is None:
+            return np.arange(self.lignes)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.lignes, bitorder='little'))
+
+    # Fonction pour extraire les lignes retenues du tableau indexé (le tableau lui-même sans filtre actif). L'extraction
+    # copie les lignes retenues : seules les positions rendues par positions() sont une sélection sans copie
+    def filtrer(self, donnees, filtres):
+        if all(valeurs is None for valeurs in filtres.values()):
+            return donnees
+        return donnees.take(self.positions(filtres))
+
+# Fonction pour convertir des dates en entiers triables (nanosecondes, dates manquantes en dernier)
+def entiers_dates(dates):
+    entiers = np.asarray(dates, dtype='datetime64[ns]').view(np.int64)
+    return np.where(entiers == NAT_ENTIER, DATE_MANQUANTE, entiers)
+
+# Fonction pour trouver par recherche dichotomique la tranche des dates triées comprises entre deux bornes incluses.
+# Sans borne, la tranche s'étend au début ou jusqu'aux dates manquantes ; une borne manquante (NaT) ne retient aucune date
+def tranche_dates(dates, debut=None, fin=None):
+    if any(borne is not None and pd.isna(borne) for borne in (debut, fin)):
+        return 0, 0
+    gauche = 0 if debut is None else int(np.searchsorted(dates, pd.Timestamp(debut).value, 'left'))
+    if fin is None:
+        droite = int(np.searchsorted(dates, DATE_MANQUANTE, 'left'))
+    else:
+        droite = int(np.searchsorted(dates, pd.Timestamp(fin).value, 'right'))
+    return gauche, max(gauche, droite)
+
+# Index des dates de dépôt d'un projet : permutation des lignes triées par date, dates triées et premier et dernier
+# dépôt. Une période est une tranche de la permutation, trouvée en O(log n) sans comparer toutes les lignes
+class IndexDates:
+    def __init__(self, donnees, colonne=COLONNE_DATE):
+        entiers = entiers_dates(donnees[colonne].to_numpy(dtype='datetime64[ns]'))
+        self.ordre = np.argsort(entiers, kind='stable').astype(np.int32)
+        self.dates = entiers[self.ordre]
+        self.ordre.flags.writeable = False
+        self.dates.flags.writeable = False
+        self.lignes = len(donnees)
+        nombre_dates = tranche_dates(self.dates)[1]
+        self.premier = pd.Timestamp(self.dates[0]) if nombre_dates else pd.NaT
+        self.dernier = pd.Timestamp(self.dates[nombre_dates - 1]) if nombre_dates else pd.NaT
+
+    # Fonction pour obtenir les bornes d'une période commençant au premier dépôt (None : jusqu'au dernier dépôt)
+    def periode(self, jours=None):
+        return self.premier, self.dernier if jours is None else self.premier + pd.Timedelta(days=jours)
+
+    # Fonction pour compter les dépôts d'une période
+    def compter(self, debut=None, fin=None):
+        gauche, droite = tranche_dates(self.dates, debut, fin)
+        return droite - gauche
+
+    # Fonction pour obtenir les positions des lignes d'une période dans l'ordre des dates (vue sans copie)
+    def positions(self, debut=None, fin=None):
+        gauche, droite = tranche_dates(self.dates, debut, fin)
+        return self.ordre[gauche:droite]
+
+    # Fonction pour obtenir le masque booléen des lignes d'une période (toutes les lignes sans borne)
+    def masque(self, debut=None, fin=None):
+        if debut is None and fin is None:
+            return np.ones(self.lignes, dtype=bool)
+        masque = np.zeros(self.lignes, dtype=bool)
+        masque[self.positions(debut, fin)] = True
+        return masque
+
+    # Fonction pour extraire les lignes d'une période dans l'ordre du tableau (le tableau lui-même sans borne). Comme
+    # IndexBitmaps.filtrer, l'extraction copie les lignes retenues, positions() rendant la tranche sans copie
+    def filtrer(self, donnees, debut=None, fin=None):
+        if debut is None and fin is None:
+            return donnees
+        return donnees.take(np.sort(self.positions(debut, fin)))
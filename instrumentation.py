@@ -0,0 +1,177 @@
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+import pandas as pd
+import plotly.io
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from cache_memoire import CACHE
+
+# Journal des traces (une ligne JSON par mesure) et taille au-delà de laquelle il est archivé
+FICHIER_TRACES = os.environ.get('GED_FICHIER_TRACES', 'traces_ged.jsonl')
+TAILLE_MAX_TRACES = int(os.environ.get('GED_TRACES_TAILLE_MAX', 50 * 1024 * 1024))
+
+# Mesures d'une exécution du script (complète ou d'un fragment) pour une session
+class ExecutionTracee:
+    def __init__(self, session, type_execution):
+        self.identifiant = uuid.uuid4().hex[:12]
+        self.session = session
+        self.type_execution = type_execution
+        self.onglet = None
+        self.horodatage = time.time()
+        self.debut = time.perf_counter()
+        self.mesures = []
+        self.succes_cache = 0
+        self.echecs_cache = 0
+
+    # Fonction pour obtenir les mesures sous forme de tableau
+    def tableau(self):
+        colonnes = ['etape', 'onglet', 'duree_ms', 'lignes_entree', 'lignes_sortie', 'succes_cache', 'echecs_cache', 'octets_figure']
+        return pd.DataFrame(self.mesures, columns=colonnes)
+
+# Exécutions en cours par session (les threads de chargement d'une session partagent son contexte Streamlit)
+EXECUTIONS = {}
+VERROU_EXECUTIONS = threading.Lock()
+VERROU_JOURNAL = threading.Lock()
+# Compteurs du cache d'une exécution, incrémentés depuis les threads de chargement et de précalcul
+VERROU_COMPTEURS = threading.Lock()
+
+# Fonction pour identifier la session Streamlit du thread courant (None hors serveur Streamlit)
+def session_courante():
+    contexte = get_script_run_ctx(suppress_warning=True)
+    return contexte.session_id if contexte is not None else None
+
+# Fonction pour obtenir l'exécution en cours de la session courante
+def execution_courante():
+    with VERROU_EXECUTIONS:
+        return EXECUTIONS.get(session_courante())
+
+# Fonction pour attribuer les succès et échecs du cache à l'exécution en cours
+def compter_cache(nom, succes):
+    execution = EXECUTIONS.get(session_courante())
+    if execution is None:
+        return
+    with VERROU_COMPTEURS:
+        if succes:
+            execution.succes_cache += 1
+        else:
+            execution.echecs_cache += 1
+
+CACHE.observateurs.append(compter_cache)
+
+# Fonction pour lire les compteurs du cache d'une exécution (aucun compteur hors exécution suivie)
+def compteurs_cache(execution):
+    if execution is None:
+        return 0, 0
+    with VERROU_COMPTEURS:
+        return execution.succes_cache, execution.echecs_cache
+
+# Fonction pour calculer la taille d'une figure Plotly sérialisée comme le fait st.plotly_chart
+def taille_figure(figure):
+    return len(plotly.io.to_json(figure, validate=False))
+
+# Fonction pour suivre une exécution : une exécution déjà en cours pour la session est réutilisée, sinon une nouvelle
+# est ouverte puis écrite dans le journal à la fin (cas d'un fragment réexécuté seul)
+@contextmanager
+def suivre_execution(type_execution='complète'):
+    session = session_courante()
+    with VERROU_EXECUTIONS:
+        execution = EXECUTIONS.get(session)
+        nouvelle = execution is None
+        if nouvelle:
+            execution = EXECUTIONS[session] = ExecutionTracee(session, type_execution)
+    try:
+        yield execution
+    finally:
+        if nouvelle:
+            with VERROU_EXECUTIONS:
+                EXECUTIONS.pop(session, None)
+            ecrire_traces(execution)
+
+# Fonction pour compter les lignes d'un tableau (None pour les autres valeurs)
+def nombre_lignes(valeur):
+    return len(valeur) if isinstance(valeur, pd.DataFrame) else None
+
+# Fonction pour mesurer une étape : durée et succès et échecs du cache pendant l'étape (la taille des figures envoyées
+# est renseignée par l'appelant dans la mesure rendue)
+@contextmanager
+def mesurer(etape, onglet=None, lignes_entree=None):
+    execution = execution_courante()
+    mesure = {'etape': etape, 'onglet': onglet, 'lignes_entree': lignes_entree, 'lignes_sortie': None, 'octets_figure': None}
+    succes_avant, echecs_avant = compteurs_cache(execution)
+    debut = time.perf_counter()
+    try:
+        yield mesure
+    finally:
+        mesure['duree_ms'] = round((time.perf_counter() - debut) * 1000, 2)
+        if execution is not None:
+            succes_apres, echecs_apres = compteurs_cache(execution)
+            mesure['succes_cache'] = succes_apres - succes_avant
+            mesure['echecs_cache'] = echecs_apres - echecs_avant
+            mesure['onglet'] = mesure['onglet'] or execution.onglet
+            execution.mesures.append(mesure)
+
+# Fonction pour instrumenter une fonction de traitement (lignes du premier tableau reçu et du tableau rendu)
+def instrumenter(etape):
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            entree = next((argument for argument in args if isinstance(argument, pd.DataFrame)), None)
+            with mesurer(etape, lignes_entree=nombre_lignes(entree)) as mesure:
+                resultat = fonction(*args, **kwargs)
+                mesure['lignes_sortie'] = nombre_lignes(resultat)
+            return resultat
+        return enveloppe
+    return decorateur
+
+# Fonction pour ajouter les mesures d'une exécution au journal (archivé en .1 au-delà de la taille maximale)
+def ecrire_traces(execution, fichier=None):
+    fichier = fichier or FICHIER_TRACES
+    if not fichier:
+        return
+    commun = {
+        'horodatage': execution.horodatage,
+        'session': execution.session,
+        'execution': execution.identifiant,
+        'type': execution.type_execution
+    }
+    succes, echecs = compteurs_cache(execution)
+    total = {'etape': 'exécution', 'onglet': execution.onglet, 'duree_ms': round((time.perf_counter() - execution.debut) * 1000, 2),
+             'succes_cache': succes, 'echecs_cache': echecs}
+    lignes = [json.dumps({**commun, **mesure}, ensure_ascii=False, default=str) for mesure in execution.mesures + [total]]
+    with VERROU_JOURNAL:
+        try:
+            if os.path.getsize(fichier) > TAILLE_MAX_TRACES:
+                os.replace(fichier, fichier + '.1')
+        except FileNotFoundError:
+            pass
+        with open(fichier, 'a', encoding='utf-8') as journal:
+            journal.write('\n'.join(lignes) + '\n')
+
+# Fonction pour lire un journal de traces
+def lire_traces(fichier=None):
+    with open(fichier or FICHIER_TRACES, encoding='utf-8') as journal:
+        return pd.DataFrame([json.loads(ligne) for ligne in journal if ligne.strip()])
+
+# Fonction pour calculer les latences médiane et au 95e centile par onglet et par étape
+def latences_par_onglet(traces):
+    traces = traces.assign(onglet=traces['onglet'].fillna('-'))
+    groupes = traces.groupby(['onglet', 'etape', 'type'])['duree_ms']
+    latences = groupes.agg(nombre='count', p50=lambda durees: durees.quantile(0.5), p95=lambda durees: durees.quantile(0.95), max='max')
+    return latences.round(1).reset_index()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Agrégation des traces de performance du tableau de bord")
+    parser.add_argument('fichiers', nargs='*', default=[FICHIER_TRACES], help="Journaux de traces JSONL")
+    parser.add_argument('--etape', default=None, help="Ne garder qu'une étape (ex. onglet, figure, exécution)")
+    arguments = parser.parse_args()
+
+    traces = pd.concat([lire_traces(fichier) for fichier in arguments.fichiers], ignore_index=True)
+    if arguments.etape:
+        traces = traces[traces['etape'] == arguments.etape]
+    print(f"{len(traces)} mesures, {traces['session'].nunique(dropna=False)} sessions")
+    print(latences_par_onglet(traces).to_string(index=False))
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from chargement import memoire_colonnes
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Part maximale de valeurs distinctes pour qu'une colonne de texte devienne catégorielle
+SEUIL_CATEGORIES = 0.1
+
+# Colonnes de texte long, toujours stockées en chaînes pyarrow
+COLONNES_TEXTE_LONG = ['Libellé du document', 'Chemin vers le fichier']
+
+# Type des chaînes de texte long (pyarrow si disponible)
+TYPE_TEXTE = pd.StringDtype('pyarrow') if pyarrow is not None else None
+
+# Rapport mémoire d'un tableau optimisé conservé dans ses attributs : immuable, il est partagé sans copie par les tableaux dérivés
+class RapportMemoire:
+    def __init__(self, rapport):
+        self.rapport = rapport
+
+    def __deepcopy__(self, memo):
+        return self
+
+    # Fonction pour obtenir la mémoire totale avant et après optimisation
+    def totaux(self):
+        return int(self.rapport['Octets avant'].sum()), int(self.rapport['Octets après'].sum())
+
+# Fonction pour choisir le plus petit type entier nullable contenant toutes les valeurs
+def type_entier(minimum, maximum, nullable=True):
+    for bits in (8, 16, 32, 64):
+        borne = np.iinfo(f'int{bits}')
+        if borne.min <= minimum and maximum <= borne.max:
+            return f'Int{bits}' if nullable else f'int{bits}'
+    return 'Int64' if nullable else 'int64'
+
+# Fonction pour déterminer le type optimisé d'une colonne (None : type conservé)
+def type_optimise(serie, seuil_categories=SEUIL_CATEGORIES, colonnes_texte_long=COLONNES_TEXTE_LONG):
+    type_colonne = serie.dtype
+    if isinstance(type_colonne, (pd.SparseDtype, pd.CategoricalDtype)) or not isinstance(type_colonne, np.dtype):
+        return None
+    valeurs = serie.dropna()
+    if type_colonne == object:
+        if pd.api.types.infer_dtype(valeurs, skipna=True) not in ('string', 'empty'):
+            return None
+        if serie.name in colonnes_texte_long or valeurs.nunique() > seuil_categories * max(len(valeurs), 1):
+            return TYPE_TEXTE
+        return 'category'
+    if type_colonne.kind == 'f':
+        # Nombres de jours : entiers nullables de la plus petite taille possible
+        if len(valeurs) == 0 or not np.array_equal(valeurs.to_numpy(), np.round(valeurs.to_numpy())):
+            return None
+        return type_entier(valeurs.min(), valeurs.max())
+    if type_colonne.kind == 'i':
+        if len(valeurs) == 0:
+            return None
+        return type_entier(valeurs.min(), valeurs.max(), nullable=False)
+    return None
+
+# Fonction pour convertir chaque colonne dans son type le plus compact et mesurer la mémoire avant et après
+def optimiser_types(donnees, seuil_categories=SEUIL_CATEGORIES, colonnes_texte_long=COLONNES_TEXTE_LONG):
+    types_optimises = {}
+    for colonne in donnees.columns:
+        nouveau_type = type_optimise(donnees[colonne], seuil_categories, colonnes_texte_long)
+        if nouveau_type is not None and nouveau_type != donnees[colonne].dtype:
+            types_optimises[colonne] = nouveau_type
+
+    # Les colonnes déjà optimisées par une étape précédente gardent leur mémoire d'origine dans le rapport
+    precedent = donnees.attrs.get('optimisation')
+    avant = memoire_colonnes(donnees)
+    types_avant = donnees.dtypes.astype(str)
+    if precedent is not None:
+        connues = precedent.rapport.index.intersection(donnees.columns).difference(list(types_optimises))
+        avant[connues] = precedent.rapport.loc[connues, 'Octets avant']
+        types_avant[connues] = precedent.rapport.loc[connues, 'Type avant']
+
+    optimise = donnees.astype(types_optimises) if types_optimises else donnees.copy(deep=False)
+    apres = memoire_colonnes(optimise)
+    rapport = pd.DataFrame({
+        'Type avant': types_avant,
+        'Type après': optimise.dtypes.astype(str),
+        'Octets avant': avant,
+        'Octets après': apres
+    })
+    rapport['Gain (%)'] = (1 - rapport['Octets après'] / rapport['Octets avant'].replace(0, np.nan)).fillna(0) * 100
+    rapport.index.name = 'Colonne'
+    optimise.attrs = dict(donnees.attrs)
+    optimise.attrs['optimisation'] = RapportMemoire(rapport)
+    return optimise
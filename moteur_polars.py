@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from chargement import COLONNE_DATE, COLONNES_CATEGORIELLES, ENCODAGE, SEPARATEUR, densifier_colonnes, lire_entete, lire_octets
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+COLONNE_LIBELLE = 'Libellé du document'
+CLES_DOCUMENT = ['TYPE DE DOCUMENT', 'LOT', COLONNE_LIBELLE]
+
+# Fonction pour vérifier que le paquet polars est installé
+def verifier_polars():
+    if pl is None:
+        raise ImportError("Le moteur 'polars' nécessite le paquet polars.")
+
+# Fonction pour lire un export en LazyFrame (colonnes utiles uniquement, texte puis dates typées)
+def charger_export_polars(source, colonnes=None):
+    verifier_polars()
+    contenu = lire_octets(source)
+    entete = lire_entete(contenu)
+    colonnes = [colonne for colonne in entete if colonnes is None or colonne in set(colonnes)]
+    donnees = pl.read_csv(
+        contenu,
+        separator=SEPARATEUR,
+        encoding=ENCODAGE,
+        columns=colonnes,
+        infer_schema=False
+    ).lazy()
+    if COLONNE_DATE in colonnes:
+        donnees = donnees.with_columns(pl.col(COLONNE_DATE).str.strip_chars().str.to_datetime('%d/%m/%Y', time_unit='ns', strict=False))
+    return donnees
+
+# Fonction pour obtenir un LazyFrame à partir de données pandas ou polars (catégories converties en texte)
+def vers_lazyframe(donnees):
+    verifier_polars()
+    if isinstance(donnees, pd.DataFrame):
+        donnees = pl.from_pandas(densifier_colonnes(donnees))
+    donnees = donnees.lazy()
+    categorielles = [nom for nom, type_colonne in donnees.collect_schema().items() if type_colonne in (pl.Categorical, pl.Enum)]
+    return donnees.with_columns(pl.col(categorielles).cast(pl.String)) if categorielles else donnees
+
+# Fonction pour tester qu'aucune des colonnes n'est manquante
+def cles_presentes(colonnes):
+    return pl.all_horizontal([pl.col(colonne).is_not_null() for colonne in colonnes])
+
+# Fonction pour construire le plan de prétraitement (mêmes colonnes et même ordre que pretraiter_donnees_vectorise)
+def pretraiter_donnees_polars(donnees, colonne_nombre_indices='Nombre d\'indices', dates_lot=True,
+                              remplir_durees=False, duree_moyenne_par_type=False):
+    donnees = vers_lazyframe(donnees)
+    colonnes_origine = list(donnees.collect_schema().names())
+    date = pl.col(COLONNE_DATE)
+    jours = lambda ecart: ecart.dt.total_nanoseconds().floordiv(86400 * 10**9).cast(pl.Float64)
+
+    # Tri stable par (libellé, date, type), valeurs manquantes en dernier
+    donnees = donnees.sort([COLONNE_LIBELLE, COLONNE_DATE, 'TYPE DE DOCUMENT'], nulls_last=True, maintain_order=True)
+
+    # Agrégats par document, rattachés à chaque ligne par jointure (les lignes sans document complet restent vides)
+    documents = donnees.filter(cles_presentes(CLES_DOCUMENT)).group_by(CLES_DOCUMENT).agg(
+        date.min().alias('Date première version'),
+        date.max().alias('Date dernière version'),
+        pl.col('INDICE').drop_nulls().n_unique().cast(pl.Float64).alias(colonne_nombre_indices),
+        pl.col('INDICE').fill_null('').unique().sort().str.join(', ').alias('Indices utilisés')
+    ).with_columns(
+        jours(pl.col('Date dernière version') - pl.col('Date première version')).alias('Différence en jours')
+    )
+    donnees = donnees.join(documents, on=CLES_DOCUMENT, how='left', maintain_order='left')
+
+    if dates_lot:
+        lots = donnees.filter(pl.col('LOT').is_not_null()).group_by('LOT').agg(
+            date.min().alias('Date début'),
+            date.max().alias('Date fin')
+        )
+        donnees = donnees.join(lots, on='LOT', how='left', maintain_order='left')
+
+    # Durée entre deux versions consécutives d'un même libellé (lignes déjà triées par date)
+    libelle = pl.col(COLONNE_LIBELLE)
+    suivantes = (libelle == libelle.shift(1)) & libelle.is_not_null() & date.is_not_null() & date.shift(1).is_not_null()
+    durees = pl.when(suivantes).then(jours(date - date.shift(1)))
+    if remplir_durees:
+        durees = durees.otherwise(0.0)
+    donnees = donnees.with_columns(durees.alias('Durée entre versions'), pl.col('INDICE').fill_null(''))
+
+    colonnes = colonnes_origine + ['Date première version', 'Date dernière version', 'Différence en jours', colonne_nombre_indices, 'Indices utilisés']
+    colonnes += ['Date début', 'Date fin'] if dates_lot else []
+    colonnes += ['Durée entre versions']
+    if duree_moyenne_par_type:
+        moyenne = pl.col('Durée entre versions').mean().over('TYPE DE DOCUMENT')
+        donnees = donnees.with_columns(pl.when(pl.col('TYPE DE DOCUMENT').is_not_null()).then(moyenne).alias('Durée moyenne entre versions'))
+        colonnes += ['Durée moyenne entre versions']
+    return donnees.select(colonnes)
+
+# Fonction pour typer en entiers les colonnes d'une table sans valeur manquante (comme diffuser_nombres côté pandas)
+def entiers_complets(donnees, colonnes=('Différence en jours', 'Nombre d\'indices')):
+    completes = [colonne for colonne in colonnes if colonne in donnees.columns and donnees[colonne].null_count() == 0]
+    return donnees.with_columns(pl.col(completes).cast(pl.Int64)) if completes else donnees
+
+# Fonction pour convertir le résultat d'un plan en données pandas (à la frontière de l'affichage Plotly)
+def vers_pandas(donnees, entiers_si_complets=('Différence en jours', 'Nombre d\'indices'), categoriser=True):
+    if isinstance(donnees, pl.LazyFrame):
+        donnees = donnees.collect()
+    resultat = entiers_complets(donnees, entiers_si_complets).to_pandas()
+    if categoriser:
+        for colonne in COLONNES_CATEGORIELLES:
+            if colonne in resultat.columns:
+                resultat[colonne] = resultat[colonne].astype('category')
+    for colonne in resultat.columns:
+        if resultat[colonne].dtype == np.dtype('datetime64[us]'):
+            resultat[colonne] = resultat[colonne].astype('datetime64[ns]')
+    return resultat
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Un seul thread de précalcul : les onglets sont calculés l'un après l'autre sans concurrencer l'affichage en cours
+NOMBRE_WORKERS = 1
+
+# File de précalcul partagée par tous les projets et toutes les sessions du processus
+EXECUTEUR = ThreadPoolExecutor(max_workers=NOMBRE_WORKERS, thread_name_prefix='precalcul')
+
+# Nombre maximal de précalculs conservés (un par projet et moteur de calcul)
+NOMBRE_MAX_PRECALCULS = 16
+
+# États d'un onglet pendant le précalcul
+EN_ATTENTE = 'en attente'
+EN_COURS = 'en cours'
+TERMINE = 'terminé'
+ERREUR = 'erreur'
+ANNULE = 'annulé'
+
+# États après lesquels un onglet n'évolue plus (un onglet annulé n'a jamais commencé et ne sera pas calculé)
+ETATS_FINAUX = (TERMINE, ERREUR, ANNULE)
+
+# Précalcul en arrière-plan des données de chaque onglet : les résultats sont rangés dans les caches utilisés par les
+# onglets, qui les retrouvent dès que l'utilisateur y accède
+class PrecalculOnglets:
+    def __init__(self, taches):
+        self.etats = {onglet: EN_ATTENTE for onglet in taches}
+        self.durees = {}
+        self.erreurs = {}
+        self.verrou = threading.Lock()
+        self.futurs = {onglet: EXECUTEUR.submit(self.executer, onglet, tache) for onglet, tache in taches.items()}
+
+    # Fonction pour calculer les données d'un onglet en notant son état et sa durée
+    def executer(self, onglet, tache):
+        with self.verrou:
+            self.etats[onglet] = EN_COURS
+        debut = time.perf_counter()
+        try:
+            tache()
+            etat = TERMINE
+        except Exception as erreur:
+            etat = ERREUR
+            message = f"{type(erreur).__name__} : {erreur}"
+        with self.verrou:
+            if etat == ERREUR:
+                self.erreurs[onglet] = message
+            self.etats[onglet] = etat
+            self.durees[onglet] = time.perf_counter() - debut
+
+    # Fonction pour obtenir l'état et la durée de chaque onglet
+    def avancement(self):
+        with self.verrou:
+            return [(onglet, etat, self.durees.get(onglet)) for onglet, etat in self.etats.items()]
+
+    # Fonction pour obtenir le message d'erreur des onglets dont le précalcul a échoué
+    def erreurs_par_onglet(self):
+        with self.verrou:
+            return dict(self.erreurs)
+
+    # Fonction pour obtenir la part des onglets dont le précalcul est fini
+    def fraction_terminee(self):
+        with self.verrou:
+            return sum(etat in ETATS_FINAUX for etat in self.etats.values()) / max(len(self.etats), 1)
+
+    # Fonction pour savoir si tous les onglets ont été précalculés
+    def termine(self):
+        return self.fraction_terminee() == 1
+
+    # Fonction pour attendre la fin du précalcul
+    def attendre(self, delai=None):
+        wait(self.futurs.values(), timeout=delai)
+        return self.termine()
+
+    # Fonction pour retirer de la file les onglets pas encore commencés (précalcul oublié). Un futur annulé ne sera
+    # jamais exécuté : son onglet passe à l'état final annulé pour que le précalcul soit considéré comme terminé
+    def annuler(self):
+        with self.verrou:
+            for onglet, futur in self.futurs.items():
+                if futur.cancel():
+                    self.etats[onglet] = ANNULE
+
+# Précalculs lancés dans le processus, partagés par les sessions
+PRECALCULS = OrderedDict()
+VERROU_PRECALCULS = threading.Lock()
+
+# Fonction pour lancer le précalcul des onglets d'un projet (une seule fois par clé, les tâches sont construites à la demande)
+def lancer_precalcul(cle, construire_taches):
+    with VERROU_PRECALCULS:
+        precalcul = PRECALCULS.get(cle)
+        if precalcul is None:
+            precalcul = PRECALCULS[cle] = PrecalculOnglets(construire_taches())
+            while len(PRECALCULS) > NOMBRE_MAX_PRECALCULS:
+                PRECALCULS.popitem(last=False)[1].annuler()
+        PRECALCULS.move_to_end(cle)
+    return precalcul
+
+# Fonction pour attendre la fin de tous les précalculs lancés
+def attendre_precalculs(delai=None):
+    with VERROU_PRECALCULS:
+        precalculs = list(PRECALCULS.values())
+    return all(precalcul.attendre(delai) for precalcul in precalculs)
+
+# Fonction pour oublier les précalculs lancés (les résultats restent dans les caches, les onglets en attente sont retirés de la file)
+def vider_precalculs():
+    with VERROU_PRECALCULS:
+        for precalcul in PRECALCULS.values():
+            precalcul.annuler()
+        PRECALCULS.clear()
@@ -0,0 +1,385 @@
+import numpy as np
+import pandas as pd
+from chargement import COLONNE_DATE, COLONNES_NUMERO
+
+COLONNE_LIBELLE = 'Libellé du document'
+NAT_ENTIER = np.iinfo(np.int64).min
+NANOSECONDES_PAR_JOUR = 86400 * 10**9
+
+# Au-delà de cette part de lignes à recalculer, le prétraitement complet est plus rapide
+PART_MAX_INCREMENTALE = 0.5
+
+# En dessous de ce nombre de lignes, le prétraitement complet est aussi rapide (mesuré par banc_essai incremental)
+LIGNES_MIN_INCREMENTALES = 10000
+
+# Fonction pour obtenir des codes de groupe dans l'ordre de tri (valeurs manquantes : -1)
+def coder(valeurs):
+    codes, uniques = pd.factorize(valeurs, sort=True)
+    return codes.astype(np.int64), uniques
+
+# Fonction pour combiner plusieurs codes de groupe en un code unique (-1 si une clé manque)
+def combiner_codes(liste_codes):
+    combine = np.zeros(len(liste_codes[0]), dtype=np.int64)
+    manquant = np.zeros(len(liste_codes[0]), dtype=bool)
+    for codes in liste_codes:
+        manquant |= codes < 0
+        combine = combine * (codes.max(initial=0) + 1) + np.maximum(codes, 0)
+    codes_combines, _ = pd.factorize(combine)
+    codes_combines = codes_combines.astype(np.int64)
+    codes_combines[manquant] = -1
+    return codes_combines
+
+# Fonction pour calculer le minimum et le maximum d'entiers par segment
+def min_max_par_groupe(codes, valeurs, nombre_groupes):
+    valides = (codes >= 0) & (valeurs != NAT_ENTIER)
+    minimums = np.full(nombre_groupes, np.iinfo(np.int64).max, dtype=np.int64)
+    maximums = np.full(nombre_groupes, NAT_ENTIER, dtype=np.int64)
+    np.minimum.at(minimums, codes[valides], valeurs[valides])
+    np.maximum.at(maximums, codes[valides], valeurs[valides])
+    vides = np.bincount(codes[valides], minlength=nombre_groupes) == 0
+    minimums[vides] = NAT_ENTIER
+    maximums[vides] = NAT_ENTIER
+    return minimums, maximums
+
+# Fonction pour diffuser un agrégat de groupe sur les lignes (NaT pour les lignes sans groupe)
+def diffuser_dates(codes, valeurs_groupes):
+    valeurs_groupes = np.append(valeurs_groupes, NAT_ENTIER)
+    return valeurs_groupes[np.where(codes >= 0, codes, len(valeurs_groupes) - 1)].view('datetime64[ns]')
+
+# Fonction pour rendre des nombres entiers lorsqu'aucune valeur ne manque
+def entiers_si_complets(valeurs):
+    valeurs = np.asarray(valeurs, dtype=np.float64)
+    if not np.isnan(valeurs).any():
+        return valeurs.astype(np.int64)
+    return valeurs
+
+# Fonction pour diffuser un agrégat numérique (NaN pour les lignes sans groupe, entier si complet)
+def diffuser_nombres(codes, valeurs_groupes):
+    valeurs_groupes = np.append(np.asarray(valeurs_groupes, dtype=np.float64), np.nan)
+    return entiers_si_complets(valeurs_groupes[np.where(codes >= 0, codes, len(valeurs_groupes) - 1)])
+
+# Fonction pour remplacer les indices manquants par une chaîne vide (catégorie ajoutée si besoin)
+def completer_indices(indices):
+    if isinstance(indices.dtype, pd.CategoricalDtype) and '' not in indices.cat.categories:
+        indices = indices.cat.add_categories([''])
+    return indices.fillna('')
+
+# Fonction pour calculer la moyenne des durées entre versions par type de document
+def moyenne_par_type(codes_type, durees):
+    connues = (codes_type >= 0) & ~np.isnan(durees)
+    nombre_types = codes_type.max(initial=-1) + 1
+    sommes = np.bincount(codes_type[connues], weights=durees[connues], minlength=nombre_types)
+    effectifs = np.bincount(codes_type[connues], minlength=nombre_types)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        moyennes = np.append(sommes / effectifs, np.nan)
+    return moyennes[np.where(codes_type >= 0, codes_type, len(moyennes) - 1)]
+
+# Fonction pour lister les indices utilisés par document sans lambda Python par groupe
+def indices_utilises(codes_document, nombre_documents, indices, remplir_indices):
+    textes = pd.Series(indices, dtype=object)
+    if remplir_indices:
+        textes = textes.fillna('')
+    codes_indice, valeurs_indice = coder(textes.to_numpy())
+    nombre_valeurs = max(len(valeurs_indice), 1)
+    valides = (codes_document >= 0) & (codes_indice >= 0)
+    presence = np.zeros(nombre_documents * nombre_valeurs, dtype=bool)
+    presence[codes_document[valides] * nombre_valeurs + codes_indice[valides]] = True
+    presence = presence.reshape(nombre_documents, nombre_valeurs)
+
+    # Les combinaisons d'indices sont peu nombreuses : une chaîne par combinaison distincte
+    motifs, motif_par_document = np.unique(np.packbits(presence, axis=1), axis=0, return_inverse=True)
+    motif_par_document = np.asarray(motif_par_document).reshape(-1)
+    libelles_motifs = np.empty(len(motifs), dtype=object)
+    for numero, motif in enumerate(np.unpackbits(motifs, axis=1, count=nombre_valeurs).astype(bool)):
+        libelles_motifs[numero] = ', '.join(sorted(str(valeur) for valeur in valeurs_indice[motif]))
+    par_document = np.append(libelles_motifs[motif_par_document], np.nan)
+    resultat = par_document[np.where(codes_document >= 0, codes_document, len(par_document) - 1)]
+    return resultat, presence.sum(axis=1)
+
+# Fonction pour construire le tableau des durées entre indices successifs de chaque document, par type de document
+def durees_entre_indices(donnees, exclure_durees_negatives=False):
+    codes_type, types = coder(donnees['TYPE DE DOCUMENT'])
+    codes_libelle, _ = coder(donnees[COLONNE_LIBELLE])
+    codes_indice, valeurs_indice = coder(donnees['INDICE'])
+    dates = donnees[COLONNE_DATE].to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+    # Même ordre que le tri par (libellé, indice) de chaque groupe de type, valeurs manquantes en dernier
+    cle_type = np.where(codes_type >= 0, codes_type, np.iinfo(np.int64).max)
+    cle_libelle = np.where(codes_libelle >= 0, codes_libelle, np.iinfo(np.int64).max)
+    cle_indice = np.where(codes_indice >= 0, codes_indice, np.iinfo(np.int64).max)
+    ordre = np.lexsort((cle_indice, cle_libelle, cle_type))
+    codes_type, codes_libelle, codes_indice, dates = codes_type[ordre], codes_libelle[ordre], codes_indice[ordre], dates[ordre]
+
+    # Une ligne est retenue si la précédente porte le même type et le même libellé, avec deux dates connues
+    retenues = np.zeros(len(ordre), dtype=bool)
+    if len(ordre) > 1:
+        retenues[1:] = (
+            (codes_type[1:] == codes_type[:-1]) & (codes_type[1:] >= 0)
+            & (codes_libelle[1:] == codes_libelle[:-1]) & (codes_libelle[1:] >= 0)
+            & (dates[1:] != NAT_ENTIER) & (dates[:-1] != NAT_ENTIER)
+        )
+    positions = np.flatnonzero(retenues)
+    durees = ((dates[positions] - dates[positions - 1]) // NANOSECONDES_PAR_JOUR).astype(np.float64)
+    if exclure_durees_negatives:
+        positives = durees >= 0
+        positions, durees = positions[positives], durees[positives]
+
+    # Libellé de passage construit une seule fois par couple (indice précédent, indice)
+    nombre_indices = len(valeurs_indice)
+    precedents = np.where(codes_indice[positions - 1] >= 0, codes_indice[positions - 1], nombre_indices)
+    suivants = np.where(codes_indice[positions] >= 0, codes_indice[positions], nombre_indices)
+    couples, couple_par_ligne = np.unique(precedents * (nombre_indices + 1) + suivants, return_inverse=True)
+    valeurs_indice = np.append(np.asarray(valeurs_indice, dtype=object), None)
+    libelles_couples = np.array([
+        f"{valeurs_indice[couple // (nombre_indices + 1)]} à {valeurs_indice[couple % (nombre_indices + 1)]}"
+        if couple // (nombre_indices + 1) < nombre_indices and couple % (nombre_indices + 1) < nombre_indices else np.nan
+        for couple in couples
+    ], dtype=object)
+
+    lignes = ordre[positions]
+    return pd.DataFrame({
+        'Type de Document': np.asarray(types, dtype=object)[codes_type[positions]],
+        'Document': donnees[COLONNE_LIBELLE].to_numpy(dtype=object)[lignes],
+        'Passage indice': libelles_couples[np.asarray(couple_par_ligne).reshape(-1)],
+        'Durée entre indices (jours)': durees
+    })
+
+# Fonction pour prétraiter les données en un seul tri et des réductions NumPy par segment
+def pretraiter_donnees_vectorise(donnees, colonne_nombre_indices='Nombre d\'indices', dates_lot=True,
+                                 remplir_durees=False, duree_moyenne_par_type=False):
+    dates = donnees[COLONNE_DATE].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    codes_type, _ = coder(donnees['TYPE DE DOCUMENT'])
+    codes_libelle, _ = coder(donnees[COLONNE_LIBELLE])
+
+    # Ordre final identique aux deux tris successifs : (Libellé, date) puis (type, date) à égalité
+    cle_libelle = np.where(codes_libelle >= 0, codes_libelle, np.iinfo(np.int64).max)
+    cle_date = np.where(dates != NAT_ENTIER, dates, np.iinfo(np.int64).max)
+    cle_type = np.where(codes_type >= 0, codes_type, np.iinfo(np.int64).max)
+    ordre = np.lexsort((cle_type, cle_date, cle_libelle))
+
+    resultat = donnees.take(ordre)
+    dates = dates[ordre]
+    codes_type = codes_type[ordre]
+    codes_libelle = codes_libelle[ordre]
+    codes_lot, _ = coder(resultat['LOT'])
+    codes_document = combiner_codes([codes_type, codes_lot, codes_libelle])
+    nombre_documents = codes_document.max(initial=-1) + 1
+
+    # Première et dernière version de chaque document
+    premieres, dernieres = min_max_par_groupe(codes_document, dates, nombre_documents)
+    resultat['Date première version'] = diffuser_dates(codes_document, premieres)
+    resultat['Date dernière version'] = diffuser_dates(codes_document, dernieres)
+    connues = dernieres != NAT_ENTIER
+    ecarts = np.full(nombre_documents, np.nan)
+    ecarts[connues] = (dernieres[connues] - premieres[connues]) // NANOSECONDES_PAR_JOUR
+    resultat['Différence en jours'] = diffuser_nombres(codes_document, ecarts)
+
+    # Nombre d'indices distincts et liste des indices utilisés par document
+    indices = resultat['INDICE']
+    _, nombre_indices = indices_utilises(codes_document, nombre_documents, indices, remplir_indices=False)
+    resultat[colonne_nombre_indices] = diffuser_nombres(codes_document, nombre_indices)
+    indices = completer_indices(indices)
+    resultat['INDICE'] = indices
+    liste_indices, _ = indices_utilises(codes_document, nombre_documents, indices, remplir_indices=True)
+    resultat['Indices utilisés'] = liste_indices
+
+    # Date de début et de fin de chaque LOT
+    if dates_lot:
+        debuts_lot, fins_lot = min_max_par_groupe(codes_lot, dates, codes_lot.max(initial=-1) + 1)
+        resultat['Date début'] = diffuser_dates(codes_lot, debuts_lot)
+        resultat['Date fin'] = diffuser_dates(codes_lot, fins_lot)
+
+    # Durée entre deux versions consécutives d'un même libellé (lignes déjà triées par date)
+    durees = np.full(len(resultat), np.nan)
+    if len(resultat) > 1:
+        meme_libelle = (codes_libelle[1:] == codes_libelle[:-1]) & (codes_libelle[1:] >= 0)
+        dates_connues = (dates[1:] != NAT_ENTIER) & (dates[:-1] != NAT_ENTIER)
+        suivantes = meme_libelle & dates_connues
+        durees[1:][suivantes] = (dates[1:][suivantes] - dates[:-1][suivantes]) // NANOSECONDES_PAR_JOUR
+    if remplir_durees:
+        durees = np.where(np.isnan(durees), 0.0, durees)
+    resultat['Durée entre versions'] = durees
+
+    # Durée moyenne entre versions par type de document
+    if duree_moyenne_par_type:
+        resultat['Durée moyenne entre versions'] = moyenne_par_type(codes_type, durees)
+
+    return resultat
+
+# Fonction pour lister les colonnes de la clé métier d'une ligne (projet, numéro, indice et date de dépôt)
+def colonnes_cle(donnees):
+    colonne_numero = next((colonne for colonne in COLONNES_NUMERO if colonne in donnees.columns), COLONNE_LIBELLE)
+    return [colonne for colonne in ['PROJET', colonne_numero, 'INDICE', COLONNE_DATE] if colonne in donnees.columns]
+
+# Fonction pour calculer l'empreinte de chaque valeur d'une colonne en ne hachant que ses valeurs distinctes : le
+# résultat ne dépend pas du type de la colonne de texte (objet, catégorie ou chaîne pyarrow)
+def empreintes_colonne(valeurs):
+    if isinstance(valeurs.dtype, np.dtype) and valeurs.dtype.kind in 'biufmM':
+        return pd.util.hash_pandas_object(valeurs, index=False).to_numpy()
+    codes, uniques = pd.factorize(valeurs)
+    empreintes = pd.util.hash_array(np.asarray(uniques, dtype=object), categorize=False)
+    return np.append(empreintes, np.uint64(0))[codes]
+
+# Fonction pour combiner les empreintes de plusieurs colonnes en une empreinte par ligne
+def combiner_empreintes(liste_empreintes):
+    return pd.util.hash_pandas_object(pd.DataFrame(dict(enumerate(liste_empreintes))), index=False).to_numpy()
+
+# Fonction pour calculer l'empreinte de la clé métier de chaque ligne, celle de son libellé et celle de tout ce que lit
+# le prétraitement (clé, type, LOT et libellé) : deux lignes de même empreinte reçoivent les mêmes colonnes dérivées
+def empreintes_lignes(donnees):
+    cles = combiner_empreintes([empreintes_colonne(donnees[colonne]) for colonne in colonnes_cle(donnees)])
+    libelles = empreintes_colonne(donnees[COLONNE_LIBELLE])
+    empreintes = combiner_empreintes([cles, libelles, empreintes_colonne(donnees['TYPE DE DOCUMENT']), empreintes_colonne(donnees['LOT'])])
+    return empreintes, cles, libelles
+
+# Fonction pour repérer le début de chaque bloc de valeurs égales consécutives
+def debuts_blocs(valeurs):
+    if len(valeurs) == 0:
+        return np.array([], dtype=np.int64)
+    return np.flatnonzero(np.append(True, valeurs[1:] != valeurs[:-1]))
+
+# Fonction pour retrouver chaque ligne de l'export précédent dans le nouvel export (-1 si elle a disparu). Avec des
+# lignes de même empreinte, les deux suites sont triées de façon stable : la k-ième occurrence d'une empreinte dans
+# l'export précédent est appariée à sa k-ième occurrence dans le nouvel export
+def apparier_lignes(empreintes_precedentes, empreintes):
+    index = pd.Index(empreintes)
+    if index.is_unique and pd.Index(empreintes_precedentes).is_unique:
+        return index.get_indexer(empreintes_precedentes)
+    ordre = np.argsort(empreintes, kind='stable')
+    ordre_precedent = np.argsort(empreintes_precedentes, kind='stable')
+    triees, triees_precedentes = empreintes[ordre], empreintes_precedentes[ordre_precedent]
+    debuts = debuts_blocs(triees_precedentes)
+    rangs = np.arange(len(triees_precedentes)) - np.repeat(debuts, np.diff(np.append(debuts, len(triees_precedentes))))
+    positions = np.searchsorted(triees, triees_precedentes, side='left') + rangs
+    trouvees = positions < np.searchsorted(triees, triees_precedentes, side='right')
+    appariement = np.empty(len(empreintes_precedentes), dtype=np.int64)
+    appariement[ordre_precedent] = np.append(ordre, -1)[np.where(trouvees, positions, len(ordre))]
+    return appariement
+
+# Fonction pour calculer l'ordre qui insère des blocs de libellés triés dans une suite de lignes déjà triée par
+# libellé (libellés manquants en dernier), connue par le début et le libellé de chacun de ses blocs : rend des
+# positions dans la concaténation des deux suites
+def ordre_par_libelle(debuts, libelles_debuts, nombre_conserves, libelles_recalcules):
+    nombre_connus = int(pd.notna(libelles_debuts).sum())
+    connus = pd.notna(libelles_recalcules)
+    bornes = np.append(debuts, nombre_conserves)
+    positions = np.full(len(libelles_recalcules), nombre_conserves, dtype=np.int64)
+    positions[connus] = bornes[np.searchsorted(libelles_debuts[:nombre_connus], libelles_recalcules[connus])]
+    destinations = positions + np.arange(len(libelles_recalcules))
+    places = np.zeros(nombre_conserves + len(libelles_recalcules), dtype=bool)
+    places[destinations] = True
+    ordre = np.empty(len(places), dtype=np.int64)
+    ordre[~places] = np.arange(nombre_conserves)
+    ordre[destinations] = nombre_conserves + np.arange(len(libelles_recalcules))
+    return ordre
+
+# Fonction pour lister les valeurs d'une colonne prises par les lignes ajoutées ou disparues
+def valeurs_touchees(donnees, nouvelles, precedent, disparues, colonne):
+    return pd.unique(np.concatenate([
+        donnees[colonne][nouvelles].to_numpy(dtype=object),
+        precedent[colonne][disparues].to_numpy(dtype=object)
+    ]))
+
+# Fonction pour recalculer un agrégat par LOT ou par type sur les seuls groupes touchés : les autres lignes sont
+# inchangées depuis l'export précédent et reprennent leur valeur de l'état
+def recalculer_groupes_touches(groupes, groupes_touches, anciennes, valeurs_precedentes, calculer):
+    touchees = groupes.isin(groupes_touches).to_numpy()
+    valeurs = valeurs_precedentes[np.where(touchees, 0, anciennes)]
+    if touchees.any():
+        codes, _ = coder(groupes[touchees])
+        valeurs[touchees] = calculer(codes, touchees)
+    return valeurs
+
+# Fonction pour prétraiter un nouvel export en ne recalculant que ce que les lignes ajoutées, modifiées ou supprimées
+# depuis l'export précédent touchent : les documents de ces libellés, les dates des LOT et les moyennes des types
+# concernés. L'état ne garde que les colonnes dérivées, le type, le LOT et les empreintes : les autres colonnes viennent
+# du nouvel export
+def pretraiter_donnees_incremental(donnees, etat_precedent=None, lignes_min=LIGNES_MIN_INCREMENTALES, **options):
+    if not donnees.index.is_unique:
+        donnees = donnees.reset_index(drop=True)
+    empreintes, cles, libelles = empreintes_lignes(donnees)
+    statistiques = {'lignes': len(donnees), 'nouvelles': len(donnees), 'modifiees': 0, 'supprimees': 0, 'recalculees': len(donnees)}
+
+    incremental = (
+        etat_precedent is not None
+        and len(donnees) >= lignes_min
+        and etat_precedent['options'] == options
+        and etat_precedent['colonnes'] == colonnes_cle(donnees)
+    )
+    if incremental:
+        precedent = etat_precedent['derivees']
+        positions_precedentes = apparier_lignes(etat_precedent['empreintes'], empreintes)
+        disparues = positions_precedentes < 0
+        nouvelles = np.ones(len(donnees), dtype=bool)
+        nouvelles[positions_precedentes[~disparues]] = False
+
+        # Les agrégats par document et les durées ne dépendent que du libellé : seuls ces blocs sont recalculés
+        libelles_touches = np.unique(np.concatenate([libelles[nouvelles], etat_precedent['libelles'][disparues]]))
+        a_recalculer = pd.Series(libelles).isin(libelles_touches).to_numpy()
+        incremental = a_recalculer.sum() <= PART_MAX_INCREMENTALE * len(donnees)
+
+    if not incremental:
+        derive = pretraiter_donnees_vectorise(donnees, **options)
+        positions = donnees.index.get_indexer(derive.index)
+        colonnes_derivees = [colonne for colonne in derive.columns if colonne not in donnees.columns]
+    else:
+        cles_nouvelles = cles[nouvelles]
+        cles_disparues = etat_precedent['cles'][disparues]
+        statistiques['modifiees'] = int(np.isin(cles_nouvelles, cles_disparues).sum())
+        statistiques['nouvelles'] = len(cles_nouvelles) - statistiques['modifiees']
+        statistiques['supprimees'] = int((~np.isin(cles_disparues, cles_nouvelles)).sum())
+        statistiques['recalculees'] = int(a_recalculer.sum())
+
+        # Lignes des libellés non touchés : colonnes dérivées reprises de l'état, dans l'ordre déjà trié. Seul le premier
+        # libellé de chaque bloc est lu pour y insérer les libellés recalculés
+        conserves = ~pd.Series(etat_precedent['libelles']).isin(libelles_touches).to_numpy()
+        colonnes_lues = [colonne for colonne in ['TYPE DE DOCUMENT', 'LOT', COLONNE_LIBELLE, 'INDICE', COLONNE_DATE] if colonne in donnees.columns]
+        recalcules = pretraiter_donnees_vectorise(donnees[colonnes_lues][a_recalculer], **options)
+        positions_conservees = positions_precedentes[conserves]
+        debuts = debuts_blocs(etat_precedent['libelles'][conserves])
+        ordre = ordre_par_libelle(debuts, donnees[COLONNE_LIBELLE].take(positions_conservees[debuts]).to_numpy(dtype=object),
+                                  len(positions_conservees), recalcules[COLONNE_LIBELLE].to_numpy(dtype=object))
+        positions = np.concatenate([positions_conservees, donnees.index.get_indexer(recalcules.index)])[ordre]
+
+        # Les colonnes de l'export sont reprises du nouvel export, les colonnes dérivées de l'état ou du recalcul
+        derive = donnees.take(positions)
+        derive['INDICE'] = completer_indices(derive['INDICE'])
+        colonnes_derivees = [colonne for colonne in precedent.columns if colonne not in ['TYPE DE DOCUMENT', 'LOT']]
+        for colonne in colonnes_derivees:
+            valeurs = np.concatenate([precedent[colonne].to_numpy()[conserves], recalcules[colonne].to_numpy()])[ordre]
+            if colonne in ['Différence en jours', options.get('colonne_nombre_indices', 'Nombre d\'indices')]:
+                valeurs = entiers_si_complets(valeurs)
+            derive[colonne] = valeurs
+
+        # Agrégats sur tout l'export, recalculés pour les LOT et les types touchés seulement
+        anciennes = np.full(len(donnees), -1, dtype=np.int64)
+        anciennes[positions_precedentes[~disparues]] = np.flatnonzero(~disparues)
+        anciennes = anciennes[positions]
+        if options.get('dates_lot', True):
+            dates = derive[COLONNE_DATE].to_numpy(dtype='datetime64[ns]').view(np.int64)
+            lots_touches = valeurs_touchees(donnees, nouvelles, precedent, disparues, 'LOT')
+            for colonne, rang in [('Date début', 0), ('Date fin', 1)]:
+                derive[colonne] = recalculer_groupes_touches(
+                    derive['LOT'], lots_touches, anciennes, precedent[colonne].to_numpy(dtype='datetime64[ns]'),
+                    lambda codes, touchees: diffuser_dates(codes, min_max_par_groupe(codes, dates[touchees], codes.max(initial=-1) + 1)[rang]))
+        if options.get('duree_moyenne_par_type', False):
+            durees = derive['Durée entre versions'].to_numpy(dtype=np.float64)
+            types_touches = pd.unique(np.concatenate([
+                recalcules['TYPE DE DOCUMENT'].to_numpy(dtype=object),
+                precedent['TYPE DE DOCUMENT'][~conserves].to_numpy(dtype=object)
+            ]))
+            derive['Durée moyenne entre versions'] = recalculer_groupes_touches(
+                derive['TYPE DE DOCUMENT'], types_touches, anciennes, precedent['Durée moyenne entre versions'].to_numpy(dtype=np.float64),
+                lambda codes, touchees: moyenne_par_type(codes, durees[touchees]))
+
+    derive.attrs = dict(donnees.attrs)
+    etat = {
+        'derivees': derive[['TYPE DE DOCUMENT', 'LOT'] + colonnes_derivees],
+        'empreintes': empreintes[positions],
+        'cles': cles[positions],
+        'libelles': libelles[positions],
+        'options': options,
+        'colonnes': colonnes_cle(donnees),
+        'statistiques': statistiques
+    }
+    return derive, etat
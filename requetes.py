@@ -0,0 +1,401 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from agregats import EnsemblesRegroupement, colonnes_mesurees
+from chargement import COLONNE_DATE
+from index_projet import IndexBitmaps, IndexDates
+from cache_memoire import CACHE, EmpreinteDonnees, cle_argument
+from moteur_polars import pl, entiers_complets, vers_lazyframe, vers_pandas
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Moteurs de calcul disponibles pour les agrégations des onglets
+MOTEURS_REQUETES = ['pandas'] + (['duckdb'] if duckdb is not None else []) + (['polars'] if pl is not None else [])
+
+# Colonnes chargées dans la base DuckDB d'un projet (les autres colonnes restent dans pandas)
+COLONNES_REQUETES = [
+    'PROJET',
+    'EMET',
+    'LOT',
+    'TYPE DE DOCUMENT',
+    'INDICE',
+    'Libellé du document',
+    COLONNE_DATE,
+    'Ajouté par',
+    'Nombre d\'indices',
+    'Durée entre versions'
+]
+
+# Tables polars des projets (prétraitées par polars directement depuis l'export), rangées par empreinte du tableau pandas
+# du même projet : le moteur polars les interroge sans convertir le tableau pandas
+TABLES_POLARS = OrderedDict()
+NOMBRE_MAX_TABLES_POLARS = 16
+VERROU_TABLES_POLARS = threading.Lock()
+
+# Fonction pour obtenir l'empreinte conservée dans les attributs d'un tableau (None si elle manque ou n'est plus valable)
+def empreinte_attributs(donnees):
+    empreinte = donnees.attrs.get('empreinte')
+    return empreinte.valeur if isinstance(empreinte, EmpreinteDonnees) and empreinte.correspond(donnees) else None
+
+# Fonction pour associer à un tableau pandas la table polars du même projet
+def enregistrer_table_polars(donnees, table):
+    empreinte = empreinte_attributs(donnees)
+    if empreinte is None:
+        return
+    with VERROU_TABLES_POLARS:
+        TABLES_POLARS[empreinte] = table
+        TABLES_POLARS.move_to_end(empreinte)
+        while len(TABLES_POLARS) > NOMBRE_MAX_TABLES_POLARS:
+            TABLES_POLARS.popitem(last=False)
+
+# Fonction pour retrouver la table polars associée à un tableau pandas (None si aucune n'a été enregistrée)
+def table_polars(donnees):
+    empreinte = empreinte_attributs(donnees)
+    with VERROU_TABLES_POLARS:
+        return TABLES_POLARS.get(empreinte) if empreinte is not None else None
+
+# Dimensions des ensembles de regroupement d'un projet pour le moteur pandas
+DIMENSIONS_REQUETES = ['LOT', 'TYPE DE DOCUMENT', 'INDICE', 'EMET', 'Ajouté par', 'Mois']
+
+# Fonction pour filtrer les données selon des valeurs par colonne et une période de dépôt. Les colonnes couvertes par
+# l'index bitmap du projet sont filtrées par ses bitmaps et la période par l'index des dates (tranche des dates triées),
+# les lignes étant extraites par leurs positions lorsqu'un seul des deux index suffit
+def filtrer_donnees(donnees, filtres=None, index=None, index_dates=None):
+    if not filtres:
+        return donnees
+    indexes = {colonne: valeurs for colonne, valeurs in filtres.items() if index is not None and index.couvre(colonne)}
+    periode = filtres.get('periode') if index_dates is not None else None
+    autres = [colonne for colonne in filtres if colonne not in indexes and not (colonne == 'periode' and periode is not None)]
+    if not autres and periode is None:
+        return index.filtrer(donnees, indexes)
+    if not autres and not indexes:
+        return index_dates.filtrer(donnees, *periode)
+    masque = index.masque(indexes) if indexes else np.ones(len(donnees), dtype=bool)
+    if periode is not None:
+        masque &= index_dates.masque(*periode)
+    for colonne in autres:
+        valeurs = filtres[colonne]
+        if colonne == 'periode':
+            debut, fin = valeurs
+            if debut is not None:
+                masque &= (donnees[COLONNE_DATE] >= pd.Timestamp(debut)).to_numpy()
+            if fin is not None:
+                masque &= (donnees[COLONNE_DATE] <= pd.Timestamp(fin)).to_numpy()
+        elif valeurs is not None:
+            masque &= donnees[colonne].isin(list(valeurs)).to_numpy()
+    return donnees[masque]
+
+# Agrégations des onglets calculées avec pandas sur la table du projet : toutes passent par les ensembles de
+# regroupement du projet, construits en un seul passage sur les lignes lors du premier appel, et les lignes filtrées
+# par l'index bitmap et l'index des dates du projet, construits lors du premier filtre. Le moteur est partagé par
+# les sessions et les threads du précalcul : chaque structure n'est construite qu'une fois, sous verrou
+class RequetesPandas:
+    moteur = 'pandas'
+
+    def __init__(self, donnees):
+        self.donnees = donnees
+        self.regroupement = None
+        self.index = None
+        self.index_dates = None
+        self.verrou = threading.Lock()
+
+    # Fonction pour obtenir les lignes du projet retenues par des filtres
+    def lignes(self, filtres=None):
+        if not filtres:
+            return self.donnees
+        if self.index is None:
+            with self.verrou:
+                if self.index is None:
+                    self.index_dates = IndexDates(self.donnees)
+                    self.index = IndexBitmaps(self.donnees)
+        return filtrer_donnees(self.donnees, filtres, self.index, self.index_dates)
+
+    # Fonction pour obtenir les ensembles de regroupement d'un calcul et les filtres qui leur restent à appliquer
+    # (ceux du projet, ou ceux des lignes filtrées lorsqu'un filtre porte sur la période ou une autre colonne)
+    def ensembles(self, colonnes, filtres=None, mesures=None):
+        if self.regroupement is None:
+            with self.verrou:
+                if self.regroupement is None:
+                    self.regroupement = EnsemblesRegroupement(self.donnees, DIMENSIONS_REQUETES)
+        if self.regroupement.couvre(colonnes, filtres, mesures):
+            return self.regroupement, filtres
+        donnees = self.lignes(filtres)
+        return EnsemblesRegroupement(donnees, colonnes, colonnes_mesurees(mesures)), None
+
+    # Fonction pour agréger les documents selon des colonnes et des mesures nommées
+    def agreger(self, colonnes, mesures=None, filtres=None):
+        regroupement, filtres = self.ensembles(colonnes, filtres, mesures)
+        return regroupement.agreger(colonnes, mesures, filtres)
+
+    # Fonction pour compter les documents selon une ou plusieurs colonnes
+    def comptages(self, colonnes, filtres=None):
+        return self.agreger(list(colonnes), filtres=filtres)
+
+    # Fonction pour compter les documents par mois de dépôt et type de document
+    def evolution_mensuelle(self, filtres=None):
+        return self.agreger(['Mois', 'TYPE DE DOCUMENT'], filtres=filtres).rename(columns={'Mois': COLONNE_DATE})
+
+    # Fonction pour calculer la moyenne ou le maximum d'une colonne par catégorie
+    def indicateur_par_categorie(self, categorie, colonne, type_calcul='mean', filtres=None):
+        return self.agreger([categorie], {colonne: type_calcul}, filtres)
+
+    # Fonction pour préparer le calendrier (début, fin, nombre de documents et types utilisés) par catégorie
+    def calendrier(self, categorie, filtres=None):
+        donnees_gantt = self.agreger([categorie], {
+            'Date début': (COLONNE_DATE, 'min'),
+            'Date fin': (COLONNE_DATE, 'max'),
+            'Nombre de documents': ('Libellé du document', 'count')
+        }, filtres)
+        donnees_gantt['Durée en jours'] = (donnees_gantt['Date fin'] - donnees_gantt['Date début']).dt.days
+
+        # Types de documents de chaque catégorie dans l'ordre de leur premier dépôt (liste de texte, calculée sur les lignes)
+        donnees = self.lignes(filtres)
+        donnees_sorted = donnees.sort_values(by=COLONNE_DATE, kind='stable')
+        donnees_gantt['Types de documents'] = donnees_sorted.groupby(categorie, observed=True)['TYPE DE DOCUMENT'].apply(lambda x: ', '.join(x.drop_duplicates())).reset_index(drop=True)
+        return donnees_gantt
+
+# Fonction pour citer un nom de colonne dans une requête SQL
+def citer(colonne):
+    return '"' + colonne.replace('"', '""') + '"'
+
+# Fonction pour traduire les filtres en clause WHERE paramétrée (appliquée dès la lecture de la table)
+def clause_filtres(filtres=None, types=None):
+    conditions = []
+    parametres = []
+    types = types or {}
+    for colonne, valeurs in (filtres or {}).items():
+        if colonne == 'periode':
+            debut, fin = valeurs
+            if debut is not None:
+                conditions.append(f"{citer(COLONNE_DATE)} >= ?")
+                parametres.append(pd.Timestamp(debut).to_pydatetime())
+            if fin is not None:
+                conditions.append(f"{citer(COLONNE_DATE)} <= ?")
+                parametres.append(pd.Timestamp(fin).to_pydatetime())
+        elif valeurs is not None:
+            # Valeurs liées au type de la colonne : la comparaison reste sur la colonne (filtre poussé dans la lecture)
+            type_sql, membres = types.get(colonne, ('VARCHAR', None))
+            valeurs = [str(valeur) if membres is not None or type_sql == 'VARCHAR' else valeur for valeur in valeurs]
+            if membres is not None:
+                # Une valeur absente de l'énumération ne peut correspondre à aucune ligne (et ne se convertit pas)
+                valeurs = [valeur for valeur in valeurs if valeur in membres]
+            if not valeurs:
+                conditions.append("FALSE")
+                continue
+            conditions.append(f"{citer(colonne)} IN ({', '.join([f'CAST(? AS {type_sql})'] * len(valeurs))})")
+            parametres.extend(valeurs)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), parametres
+
+# Agrégations des onglets exprimées en SQL sur une base DuckDB embarquée (exécution multithread).
+# La base est fermée par fermer(), en sortie de bloc with, ou par le cache lorsqu'il évince ou remplace le moteur
+class RequetesDuckDB:
+    moteur = 'duckdb'
+
+    def __init__(self, donnees, nombre_threads=None):
+        if duckdb is None:
+            raise ImportError("Le moteur 'duckdb' nécessite le paquet duckdb.")
+        self.connexion = duckdb.connect(database=':memory:')
+        if nombre_threads:
+            self.connexion.execute(f"SET threads = {int(nombre_threads)}")
+        colonnes = [colonne for colonne in COLONNES_REQUETES if colonne in donnees.columns]
+        # Le numéro de ligne conserve l'ordre d'origine pour départager les dépôts du même jour
+        source = donnees[colonnes].assign(_ligne=np.arange(len(donnees)))
+        self.connexion.register('source_documents', source)
+        self.connexion.execute("CREATE TABLE documents AS SELECT * FROM source_documents")
+        self.connexion.unregister('source_documents')
+        self.colonnes = colonnes
+        # Type de chaque colonne (et valeurs des énumérations) pour lier les valeurs des filtres sans conversion de la colonne
+        self.types = {}
+        for nom, type_sql, *_ in self.connexion.execute("DESCRIBE documents").fetchall():
+            membres = set(source[nom].cat.categories.astype(str)) if type_sql.startswith('ENUM') else None
+            self.types[nom] = (type_sql, membres)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.fermer()
+
+    # Fonction pour exécuter une requête sur un curseur dédié (une connexion DuckDB n'est pas partagée entre threads)
+    def executer(self, requete, parametres=None):
+        return self.connexion.cursor().execute(requete, parametres or []).df()
+
+    # Fonction pour compter les documents selon une ou plusieurs colonnes
+    def comptages(self, colonnes, filtres=None):
+        colonnes_sql = ', '.join(citer(colonne) for colonne in colonnes)
+        non_nulles = ' AND '.join(f"{citer(colonne)} IS NOT NULL" for colonne in colonnes)
+        where, parametres = clause_filtres(filtres, self.types)
+        where = (where + " AND " if where else " WHERE ") + non_nulles
+        return self.executer(f"""
+            SELECT {colonnes_sql}, COUNT(*) AS "Nombre de documents"
+            FROM documents{where}
+            GROUP BY {colonnes_sql}
+            ORDER BY {colonnes_sql}
+        """, parametres)
+
+    # Fonction pour compter les documents par mois de dépôt et type de document
+    def evolution_mensuelle(self, filtres=None):
+        date = citer(COLONNE_DATE)
+        where, parametres = clause_filtres(filtres, self.types)
+        where = (where + " AND " if where else " WHERE ") + f"{date} IS NOT NULL AND \"TYPE DE DOCUMENT\" IS NOT NULL"
+        resultats = self.executer(f"""
+            SELECT CAST(date_trunc('month', {date}) AS TIMESTAMP) AS {date}, "TYPE DE DOCUMENT", COUNT(*) AS "Nombre de documents"
+            FROM documents{where}
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        """, parametres)
+        resultats[COLONNE_DATE] = resultats[COLONNE_DATE].astype('datetime64[ns]')
+        return resultats
+
+    # Fonction pour calculer la moyenne ou le maximum d'une colonne par catégorie
+    def indicateur_par_categorie(self, categorie, colonne, type_calcul='mean', filtres=None):
+        fonctions = {'mean': 'AVG', 'max': 'MAX', 'min': 'MIN', 'sum': 'SUM'}
+        where, parametres = clause_filtres(filtres, self.types)
+        where = (where + " AND " if where else " WHERE ") + f"{citer(categorie)} IS NOT NULL"
+        return self.executer(f"""
+            SELECT {citer(categorie)}, {fonctions[type_calcul]}({citer(colonne)}) AS {citer(colonne)}
+            FROM documents{where}
+            GROUP BY 1
+            ORDER BY 1
+        """, parametres)
+
+    # Fonction pour préparer le calendrier (début, fin, nombre de documents et types utilisés) par catégorie
+    def calendrier(self, categorie, filtres=None):
+        date = citer(COLONNE_DATE)
+        categorie_sql = citer(categorie)
+        where, parametres = clause_filtres(filtres, self.types)
+        where = (where + " AND " if where else " WHERE ") + f"{categorie_sql} IS NOT NULL"
+        # Rang de chaque dépôt dans l'ordre chronologique (dates manquantes en dernier, ordre d'origine à date égale)
+        donnees_gantt = self.executer(f"""
+            WITH filtrees AS (
+                SELECT *, ROW_NUMBER() OVER (ORDER BY {date} NULLS LAST, _ligne) AS rang
+                FROM documents{where}
+            ),
+            types AS (
+                SELECT {categorie_sql} AS categorie, CAST("TYPE DE DOCUMENT" AS VARCHAR) AS type_document, MIN(rang) AS premier_rang
+                FROM filtrees
+                GROUP BY 1, 2
+            ),
+            types_par_categorie AS (
+                SELECT categorie, string_agg(type_document, ', ' ORDER BY premier_rang) AS types_documents
+                FROM types
+                GROUP BY 1
+            )
+            SELECT
+                f.{categorie_sql},
+                MIN(f.{date}) AS "Date début",
+                MAX(f.{date}) AS "Date fin",
+                COUNT(f."Libellé du document") AS "Nombre de documents",
+                ANY_VALUE(t.types_documents) AS "Types de documents"
+            FROM filtrees f
+            JOIN types_par_categorie t ON t.categorie = f.{categorie_sql}
+            GROUP BY 1
+            ORDER BY 1
+        """, parametres)
+        donnees_gantt['Durée en jours'] = (donnees_gantt['Date fin'] - donnees_gantt['Date début']).dt.days
+        return donnees_gantt[[categorie, 'Date début', 'Date fin', 'Nombre de documents', 'Durée en jours', 'Types de documents']]
+
+    # Fonction pour libérer la base du projet
+    def fermer(self):
+        self.connexion.close()
+
+# Fonction pour traduire les filtres en expression polars (évaluée pendant la lecture du plan)
+def expression_filtres(filtres=None):
+    conditions = []
+    for colonne, valeurs in (filtres or {}).items():
+        if colonne == 'periode':
+            debut, fin = valeurs
+            if debut is not None:
+                conditions.append(pl.col(COLONNE_DATE) >= pd.Timestamp(debut))
+            if fin is not None:
+                conditions.append(pl.col(COLONNE_DATE) <= pd.Timestamp(fin))
+        elif valeurs is not None:
+            conditions.append(pl.col(colonne).is_in([str(valeur) for valeur in valeurs]))
+    return pl.all_horizontal(conditions) if conditions else pl.lit(True)
+
+# Agrégations des onglets exprimées en plans polars paresseux (exécution multithread, conversion pandas en sortie).
+# Une table polars est interrogée telle quelle ; un tableau pandas n'est converti qu'à défaut de table polars
+class RequetesPolars:
+    moteur = 'polars'
+
+    def __init__(self, donnees):
+        noms = donnees.collect_schema().names() if isinstance(donnees, pl.LazyFrame) else donnees.columns
+        colonnes = [colonne for colonne in COLONNES_REQUETES if colonne in noms]
+        if isinstance(donnees, pd.DataFrame):
+            table = vers_lazyframe(donnees[colonnes]).collect()
+        else:
+            table = donnees.lazy().select(colonnes).collect()
+        self.donnees = entiers_complets(table).lazy()
+        self.colonnes = colonnes
+
+    # Fonction pour obtenir le plan filtré, restreint aux lignes dont les colonnes de regroupement sont connues
+    def filtrees(self, filtres, colonnes):
+        return self.donnees.filter(expression_filtres(filtres), *[pl.col(colonne).is_not_null() for colonne in colonnes])
+
+    # Fonction pour compter les documents selon une ou plusieurs colonnes
+    def comptages(self, colonnes, filtres=None):
+        colonnes = list(colonnes)
+        plan = self.filtrees(filtres, colonnes).group_by(colonnes).agg(pl.len().cast(pl.Int64).alias('Nombre de documents')).sort(colonnes)
+        return vers_pandas(plan, entiers_si_complets=(), categoriser=False)
+
+    # Fonction pour compter les documents par mois de dépôt et type de document
+    def evolution_mensuelle(self, filtres=None):
+        plan = self.filtrees(filtres, [COLONNE_DATE, 'TYPE DE DOCUMENT']).group_by(
+            pl.col(COLONNE_DATE).dt.truncate('1mo'), 'TYPE DE DOCUMENT'
+        ).agg(pl.len().cast(pl.Int64).alias('Nombre de documents')).sort([COLONNE_DATE, 'TYPE DE DOCUMENT'])
+        return vers_pandas(plan, entiers_si_complets=(), categoriser=False)
+
+    # Fonction pour calculer la moyenne ou le maximum d'une colonne par catégorie
+    def indicateur_par_categorie(self, categorie, colonne, type_calcul='mean', filtres=None):
+        agregat = getattr(pl.col(colonne), type_calcul)()
+        plan = self.filtrees(filtres, [categorie]).group_by(categorie).agg(agregat).sort(categorie)
+        return vers_pandas(plan, entiers_si_complets=(), categoriser=False)
+
+    # Fonction pour préparer le calendrier (début, fin, nombre de documents et types utilisés) par catégorie
+    def calendrier(self, categorie, filtres=None):
+        date = pl.col(COLONNE_DATE)
+        # Ordre chronologique stable (dates manquantes en dernier) pour lister les types dans l'ordre de leur premier dépôt
+        filtrees = self.filtrees(filtres, [categorie]).sort(COLONNE_DATE, nulls_last=True, maintain_order=True).with_row_index('rang')
+        types = filtrees.filter(pl.col('TYPE DE DOCUMENT').is_not_null()).group_by(categorie, pl.col('TYPE DE DOCUMENT').alias('type_document')).agg(
+            pl.col('rang').min()
+        ).sort('rang').group_by(categorie, maintain_order=True).agg(pl.col('type_document').str.join(', ').alias('Types de documents'))
+        plan = filtrees.group_by(categorie).agg(
+            date.min().alias('Date début'),
+            date.max().alias('Date fin'),
+            pl.col('Libellé du document').count().cast(pl.Int64).alias('Nombre de documents')
+        ).join(types, on=categorie, how='left').with_columns(
+            (pl.col('Date fin') - pl.col('Date début')).dt.total_days().alias('Durée en jours')
+        ).sort(categorie)
+        return vers_pandas(plan.select(categorie, 'Date début', 'Date fin', 'Nombre de documents', 'Durée en jours', 'Types de documents'), entiers_si_complets=(), categoriser=False)
+
+# Moteur de calcul dont les résultats sont conservés dans le cache par empreinte (partagés par les sessions et le précalcul)
+class RequetesMemorisees:
+    def __init__(self, requetes, cle):
+        self.requetes = requetes
+        self.cle = cle
+
+    def __getattr__(self, nom):
+        methode = getattr(self.requetes, nom)
+        if not callable(methode) or nom == 'fermer':
+            return methode
+
+        # Fonction pour obtenir le résultat d'une requête, calculé lors de son premier appel
+        def memorisee(*args, **kwargs):
+            cle = (self.cle, nom, cle_argument(args), cle_argument(tuple(sorted(kwargs.items()))))
+            return CACHE.obtenir(f'requetes.{nom}', cle, lambda: methode(*args, **kwargs))
+        return memorisee
+
+# Fonction pour créer les agrégations d'un projet avec le moteur choisi
+def creer_requetes(donnees, moteur='pandas'):
+    if moteur == 'pandas':
+        return RequetesPandas(donnees)
+    if moteur == 'duckdb':
+        return RequetesDuckDB(donnees)
+    if moteur == 'polars':
+        table = table_polars(donnees) if isinstance(donnees, pd.DataFrame) else None
+        return RequetesPolars(donnees if table is None else table)
+    raise ValueError(f"Moteur de calcul inconnu : {moteur}")
@@ -2,11 +2,16 @@ import pandas as pd
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-from sklearn.cluster import KMeans
 from sklearn.ensemble import IsolationForest
 from datetime import datetime
 from PIL import Image
 import os
+from chargement import charger_export
+from pretraitement import pretraiter_donnees_vectorise
+from segmentation import SegmentationDates
+from index_projet import IndexBitmaps
+from affichage import charger_fichiers_en_parallele, choisir_nombre_classes
+from cache_memoire import cache_par_empreinte
 
 # Configurer le thème Streamlit
 st.set_page_config(layout="wide")
@@ -36,62 +41,34 @@ def afficher_logo():
     except FileNotFoundError:
         st.error(f"Le fichier logo n'a pas été trouvé à l'emplacement : {chemin_logo}")
 
-# Fonction pour charger les données depuis un fichier
-@st.cache_data
+# Fonction pour charger les données depuis un fichier (mis en cache selon l'empreinte du contenu)
+@cache_par_empreinte
 def charger_donnees(chemin_fichier):
-    spec_types = {
-        'Date dépôt GED': str,
-        'TYPE DE DOCUMENT': str,
-        'PROJET': str,
-        'EMET': str,
-        'LOT': str,
-        'INDICE': str,
-        'Libellé du document': str
-    }
-    donnees = pd.read_csv(chemin_fichier, encoding='iso-8859-1', sep=';', dtype=spec_types, low_memory=False)
-    donnees['Date dépôt GED'] = pd.to_datetime(donnees['Date dépôt GED'], format='%d/%m/%Y', errors='coerce')
-    return donnees
+    return charger_export(chemin_fichier, categoriser=False)
 
 # Fonction pour charger les données depuis un fichier téléchargé
-@st.cache_data
 def charger_donnees_uploaded(file):
     return charger_donnees(file)
 
 # Fonction pour prétraiter les données
-@st.cache_data
+@cache_par_empreinte
 def pretraiter_donnees(donnees):
-    donnees = donnees.sort_values(by=['TYPE DE DOCUMENT', 'Date dépôt GED'])
-    group = donnees.groupby(['TYPE DE DOCUMENT', 'LOT', 'Libellé du document'])
-    donnees['Date première version'] = group['Date dépôt GED'].transform('min')
-    donnees['Date dernière version'] = group['Date dépôt GED'].transform('max')
-    donnees['Différence en jours'] = (donnees['Date dernière version'] - donnees['Date première version']).dt.days
-    donnees['Nombre d\'indices'] = group['INDICE'].transform('nunique')
-    
-    # Remplir les valeurs manquantes avant la transformation
-    donnees['INDICE'] = donnees['INDICE'].fillna('')
-    donnees['Indices utilisés'] = group['INDICE'].transform(lambda x: ', '.join(sorted(set(x))))
+    return pretraiter_donnees_vectorise(donnees, remplir_durees=True)
 
-    # Ajouter les colonnes Date début et Date fin pour chaque LOT
-    donnees['Date début'] = donnees.groupby('LOT')['Date dépôt GED'].transform('min')
-    donnees['Date fin'] = donnees.groupby('LOT')['Date dépôt GED'].transform('max')
-    
-    # Calculer les durées entre chaque version pour chaque document
-    donnees = donnees.sort_values(by=['Libellé du document', 'Date dépôt GED'])
-    donnees['Durée entre versions'] = donnees.groupby('Libellé du document')['Date dépôt GED'].diff().dt.days
-
-    # Remplacer les valeurs manquantes dans 'Durée entre versions' par 0
-    donnees['Durée entre versions'] = donnees['Durée entre versions'].fillna(0)
+# Fonction pour segmenter les dates de dépôt d'un lot (segmentation optimale calculée une fois par lot pour tous les nombres de classes)
+@cache_par_empreinte
+def segmenter_dates(dates):
+    return SegmentationDates(dates)
 
-    return donnees
+# Fonction pour indexer les lignes du projet par valeur des colonnes filtrées (un bitmap par valeur, calculé une fois par projet)
+@cache_par_empreinte
+def indexer_lignes(donnees):
+    return IndexBitmaps(donnees)
 
 # Fonction pour gérer le téléchargement de fichiers
 def gerer_telechargement():
     uploaded_files = st.file_uploader("Téléchargez vos fichiers CSV", type=["csv"], accept_multiple_files=True)
-    projets = {}
-    if uploaded_files:
-        for uploaded_file in uploaded_files:
-            projets[uploaded_file.name] = charger_donnees_uploaded(uploaded_file)
-    return projets
+    return charger_fichiers_en_parallele(uploaded_files, charger_donnees_uploaded)
 
 # Fonction pour synchroniser les filtres entre les onglets
 def synchroniser_filtres(projets):
@@ -118,11 +95,11 @@ def detecter_anomalies(donnees):
     return donnees
 
 # Fonction pour afficher les graphiques selon l'onglet sélectionné
-def afficher_graphique(donnees, moyenne_dates):
+def afficher_graphique(donnees, moyenne_dates, index_lignes):
     st.header("Analyse séquentielle des documents")
     
     lot_selectionne = st.selectbox('Sélectionnez un Lot', donnees['LOT'].unique(), key='analyse_lot')
-    donnees_lot = donnees[donnees['LOT'] == lot_selectionne]
+    donnees_lot = index_lignes.filtrer(donnees, {'LOT': [lot_selectionne]})
 
     st.subheader(f"Analyse séquentielle des documents pour le Lot {lot_selectionne}")
 
@@ -143,10 +120,10 @@ def afficher_graphique(donnees, moyenne_dates):
                                       title='Séquence moyenne de diffusion des documents', labels={'Date Moyenne de Dépôt GED': 'Date Moyenne de Dépôt GED'})
     st.plotly_chart(fig_sequence_moyenne, use_container_width=True)
 
-    # Analyse par clustering
-    donnees_lot['Timestamp'] = donnees_lot['Date dépôt GED'].map(pd.Timestamp.timestamp)
-    kmeans = KMeans(n_clusters=3)
-    donnees_lot['Cluster'] = kmeans.fit_predict(donnees_lot[['Timestamp']])
+    # Analyse par clustering : segmentation exacte et déterministe des dates de dépôt (nombre de classes choisi, ou coude)
+    segmentation = segmenter_dates(donnees_lot['Date dépôt GED'].to_numpy(dtype='datetime64[ns]'))
+    nombre_classes = choisir_nombre_classes(segmentation, 'clustering_classes')
+    donnees_lot['Cluster'] = segmentation.classes(nombre_classes)
     fig_clustering = px.scatter(donnees_lot, x='Date dépôt GED', y='TYPE DE DOCUMENT', color='Cluster', 
                                 title='Clustering des documents par date de dépôt', hover_data=['Libellé du document'])
     st.plotly_chart(fig_clustering, use_container_width=True)
@@ -180,7 +157,8 @@ if __name__ == '__main__':
     if projets:
         donnees, projet_selectionne = synchroniser_filtres(projets)
         donnees = pretraiter_donnees(donnees)
+        index_lignes = indexer_lignes(donnees)
         moyenne_dates = calculer_sequence_moyenne(donnees)
-        afficher_graphique(donnees, moyenne_dates)
+        afficher_graphique(donnees, moyenne_dates, index_lignes)
     else:
         st.write("Veuillez télécharger des fichiers CSV pour continuer.")
@@ -1,11 +1,17 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
 import plotly.express as px
-from sklearn.cluster import KMeans
 from sklearn.ensemble import IsolationForest
-from datetime import datetime, timedelta
+from datetime import datetime
 from PIL import Image
 import os
+from chargement import charger_export
+from pretraitement import pretraiter_donnees_vectorise
+from index_projet import IndexBitmaps, IndexDates, PERIODES_ANALYSE
+from segmentation import SegmentationDates
+from affichage import charger_fichiers_en_parallele, choisir_plage_dates, choisir_nombre_classes
+from cache_memoire import cache_par_empreinte
 
 # Configurer le thème Streamlit
 st.set_page_config(layout="wide")
@@ -35,62 +41,30 @@ def afficher_logo():
     except FileNotFoundError:
         st.error(f"Le fichier logo n'a pas été trouvé à l'emplacement : {chemin_logo}")
 
-# Fonction pour charger les données depuis un fichier
-@st.cache_data
+# Fonction pour charger les données depuis un fichier (mis en cache selon l'empreinte du contenu)
+@cache_par_empreinte
 def charger_donnees(chemin_fichier):
-    spec_types = {
-        'Date dépôt GED': str,
-        'TYPE DE DOCUMENT': str,
-        'PROJET': str,
-        'EMET': str,
-        'LOT': str,
-        'INDICE': str,
-        'Libellé du document': str
-    }
-    donnees = pd.read_csv(chemin_fichier, encoding='iso-8859-1', sep=';', dtype=spec_types, low_memory=False)
-    donnees['Date dépôt GED'] = pd.to_datetime(donnees['Date dépôt GED'], format='%d/%m/%Y', errors='coerce')
-    return donnees
+    return charger_export(chemin_fichier, categoriser=False)
 
 # Fonction pour charger les données depuis un fichier téléchargé
-@st.cache_data
 def charger_donnees_uploaded(file):
     return charger_donnees(file)
 
-# Fonction pour prétraiter les données
-@st.cache_data
+# Fonction pour prétraiter les données et indexer leurs dates de dépôt et leurs valeurs (index conservés en cache avec les données)
+@cache_par_empreinte
 def pretraiter_donnees(donnees):
-    donnees = donnees.sort_values(by=['TYPE DE DOCUMENT', 'Date dépôt GED'])
-    group = donnees.groupby(['TYPE DE DOCUMENT', 'LOT', 'Libellé du document'])
-    donnees['Date première version'] = group['Date dépôt GED'].transform('min')
-    donnees['Date dernière version'] = group['Date dépôt GED'].transform('max')
-    donnees['Différence en jours'] = (donnees['Date dernière version'] - donnees['Date première version']).dt.days
-    donnees['Nombre d\'indices'] = group['INDICE'].transform('nunique')
-    
-    # Remplir les valeurs manquantes avant la transformation
-    donnees['INDICE'] = donnees['INDICE'].fillna('')
-    donnees['Indices utilisés'] = group['INDICE'].transform(lambda x: ', '.join(sorted(set(x))))
-
-    # Ajouter les colonnes Date début et Date fin pour chaque LOT
-    donnees['Date début'] = donnees.groupby('LOT')['Date dépôt GED'].transform('min')
-    donnees['Date fin'] = donnees.groupby('LOT')['Date dépôt GED'].transform('max')
-    
-    # Calculer les durées entre chaque version pour chaque document
-    donnees = donnees.sort_values(by=['Libellé du document', 'Date dépôt GED'])
-    donnees['Durée entre versions'] = donnees.groupby('Libellé du document')['Date dépôt GED'].diff().dt.days
+    donnees = pretraiter_donnees_vectorise(donnees, remplir_durees=True)
+    return donnees, IndexDates(donnees), IndexBitmaps(donnees)
 
-    # Remplacer les valeurs manquantes dans 'Durée entre versions' par 0
-    donnees['Durée entre versions'] = donnees['Durée entre versions'].fillna(0)
-
-    return donnees
+# Fonction pour segmenter les dates de dépôt d'un lot (segmentation optimale calculée une fois par lot pour tous les nombres de classes)
+@cache_par_empreinte
+def segmenter_dates(dates):
+    return SegmentationDates(dates)
 
 # Fonction pour gérer le téléchargement de fichiers
 def gerer_telechargement():
     uploaded_files = st.file_uploader("Téléchargez vos fichiers CSV", type=["csv"], accept_multiple_files=True)
-    projets = {}
-    if uploaded_files:
-        for uploaded_file in uploaded_files:
-            projets[uploaded_file.name] = charger_donnees_uploaded(uploaded_file)
-    return projets
+    return charger_fichiers_en_parallele(uploaded_files, charger_donnees_uploaded)
 
 # Fonction pour synchroniser les filtres entre les onglets
 def synchroniser_filtres(projets):
@@ -100,17 +74,11 @@ def synchroniser_filtres(projets):
     st.session_state['projet_selectionne'] = projet_selectionne
     return projets[projet_selectionne], projet_selectionne
 
-# Filtrer les données par période
-def filtrer_donnees_par_periode(donnees, periode):
-    date_debut = donnees['Date dépôt GED'].min()
-    if periode == '6 mois':
-        date_fin = date_debut + timedelta(days=180)
-    elif periode == '1 an':
-        date_fin = date_debut + timedelta(days=365)
-    else:
-        date_fin = donnees['Date dépôt GED'].max()
-    
-    return donnees[(donnees['Date dépôt GED'] >= date_debut) & (donnees['Date dépôt GED'] <= date_fin)]
+# Positions des lignes de la période (plage choisie, ou période comptée depuis le premier dépôt) dans l'ordre du tableau :
+# tranche de l'index des dates
+def positions_periode(index_dates, periode, plage=None):
+    date_debut, date_fin = plage if plage is not None else index_dates.periode(PERIODES_ANALYSE.get(periode))
+    return np.sort(index_dates.positions(date_debut, date_fin))
 
 # Calculer la séquence moyenne des documents par type
 def calculer_sequence_moyenne(donnees):
@@ -129,16 +97,19 @@ def detecter_anomalies(donnees):
     return donnees
 
 # Fonction pour afficher les graphiques selon l'onglet sélectionné
-def afficher_graphique(donnees):
+def afficher_graphique(donnees, index_dates, index_lignes):
     st.header("Analyse séquentielle des documents")
     
     # Sélection de la période d'analyse
-    periode = st.radio('Sélectionnez la période d\'analyse', ('6 mois', '1 an', 'Toute la période'), index=0)
+    periode = st.radio('Sélectionnez la période d\'analyse', ('6 mois', '1 an', 'Toute la période', 'Période personnalisée'), index=0)
+    plage = choisir_plage_dates(index_dates, 'analyse_plage') if periode == 'Période personnalisée' else None
     
-    donnees_filtrees = filtrer_donnees_par_periode(donnees, periode)
+    positions = positions_periode(index_dates, periode, plage)
+    donnees_filtrees = donnees.take(positions)
     
     lot_selectionne = st.selectbox('Sélectionnez un Lot', donnees_filtrees['LOT'].unique(), key='analyse_lot')
-    donnees_lot = donnees_filtrees[donnees_filtrees['LOT'] == lot_selectionne]
+    # Lignes du lot sur la période : intersection de la tranche de dates et des lignes du bitmap du lot
+    donnees_lot = donnees.take(np.intersect1d(positions, index_lignes.positions({'LOT': [lot_selectionne]}), assume_unique=True))
 
     st.subheader(f"Analyse séquentielle des documents pour le Lot {lot_selectionne} sur {periode}")
 
@@ -160,10 +131,10 @@ def afficher_graphique(donnees):
                                       title='Séquence moyenne de diffusion des documents', labels={'Date Moyenne de Dépôt GED': 'Date Moyenne de Dépôt GED'})
     st.plotly_chart(fig_sequence_moyenne, use_container_width=True)
 
-    # Analyse par clustering
-    donnees_lot['Timestamp'] = donnees_lot['Date dépôt GED'].map(pd.Timestamp.timestamp)
-    kmeans = KMeans(n_clusters=3)
-    donnees_lot['Cluster'] = kmeans.fit_predict(donnees_lot[['Timestamp']])
+    # Analyse par clustering : segmentation exacte et déterministe des dates de dépôt (nombre de classes choisi, ou coude)
+    segmentation = segmenter_dates(donnees_lot['Date dépôt GED'].to_numpy(dtype='datetime64[ns]'))
+    nombre_classes = choisir_nombre_classes(segmentation, 'clustering_classes')
+    donnees_lot['Cluster'] = segmentation.classes(nombre_classes)
     fig_clustering = px.scatter(donnees_lot, x='Date dépôt GED', y='TYPE DE DOCUMENT', color='Cluster', 
                                 title='Clustering des documents par date de dépôt', hover_data=['Libellé du document'])
     st.plotly_chart(fig_clustering, use_container_width=True)
@@ -196,7 +167,7 @@ if __name__ == '__main__':
     projets = gerer_telechargement()
     if projets:
         donnees, projet_selectionne = synchroniser_filtres(projets)
-        donnees = pretraiter_donnees(donnees)
-        afficher_graphique(donnees)
+        donnees, index_dates, index_lignes = pretraiter_donnees(donnees)
+        afficher_graphique(donnees, index_dates, index_lignes)
     else:
         st.write("Veuillez télécharger des fichiers CSV pour continuer.")
@@ -0,0 +1,84 @@
+import numpy as np
+from pretraitement import NAT_ENTIER, NANOSECONDES_PAR_JOUR
+
+# Nombre maximal de classes proposées pour la segmentation des dates de dépôt
+NOMBRE_MAX_CLASSES = 10
+
+# Nombre maximal de coûts calculés à la fois par la programmation dynamique (mémoire bornée)
+TAILLE_BLOC_SEGMENTATION = 1 << 20
+
+# Fonction pour calculer l'inertie (somme pondérée des carrés des écarts à la moyenne) des segments [debut, fin] de
+# valeurs triées à partir des sommes cumulées des poids, des valeurs et de leurs carrés (infinie si le segment est vide)
+def inertie_segments(cumuls, debuts, fins):
+    poids, sommes, carres = (cumul[fins + 1] - cumul[debuts] for cumul in cumuls)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inerties = np.maximum(carres - sommes ** 2 / poids, 0)
+    return np.where(debuts <= fins, inerties, np.inf)
+
+# Fonction pour calculer les segmentations optimales de valeurs triées et pondérées en 1 à nombre_max_classes classes
+# (k-moyennes exact en une dimension par programmation dynamique, comme Ckmeans.1d.dp). Rend le coût optimal de chaque
+# préfixe pour chaque nombre de classes et le début de la dernière classe de la segmentation correspondante
+def segmentations_optimales(valeurs, poids, nombre_max_classes):
+    nombre_valeurs = len(valeurs)
+    cumuls = [np.r_[0, np.cumsum(somme)] for somme in (poids, poids * valeurs, poids * valeurs ** 2)]
+    indices = np.arange(nombre_valeurs)
+    couts = np.empty((nombre_max_classes, nombre_valeurs))
+    debuts = np.zeros((nombre_max_classes, nombre_valeurs), dtype=np.int64)
+    couts[0] = inertie_segments(cumuls, np.zeros(nombre_valeurs, dtype=np.int64), indices)
+    taille_bloc = max(TAILLE_BLOC_SEGMENTATION // max(nombre_valeurs, 1), 1)
+    candidats = indices[:, None]
+    for classe in range(1, nombre_max_classes):
+        # Coût des classes précédentes sur [0, debut - 1], plus l'inertie de la dernière classe [debut, fin]
+        precedents = np.r_[np.inf, couts[classe - 1][:-1]][:, None]
+        precedents[:classe] = np.inf
+        for premier in range(0, nombre_valeurs, taille_bloc):
+            fins = indices[premier:premier + taille_bloc][None, :]
+            totaux = precedents + inertie_segments(cumuls, candidats, fins)
+            debuts[classe, premier:premier + taille_bloc] = np.argmin(totaux, axis=0)
+            couts[classe, premier:premier + taille_bloc] = np.min(totaux, axis=0)
+    return couts, debuts
+
+# Segmentation optimale et déterministe des dates de dépôt : les dates distinctes (en jours, pondérées par leur nombre de
+# dépôts) sont segmentées une fois pour tous les nombres de classes jusqu'à nombre_max_classes. Les classes sont
+# numérotées dans l'ordre chronologique, les dates manquantes ont la classe -1
+class SegmentationDates:
+    def __init__(self, dates, nombre_max_classes=NOMBRE_MAX_CLASSES):
+        entiers = np.asarray(dates, dtype='datetime64[ns]').view(np.int64)
+        self.valides = entiers != NAT_ENTIER
+        valeurs, self.inverses, poids = np.unique(entiers[self.valides], return_inverse=True, return_counts=True)
+        self.nombre_max_classes = max(min(nombre_max_classes, len(valeurs)), 1)
+        if len(valeurs):
+            # Jours centrés sur la moyenne, pour la précision des sommes de carrés
+            jours = (valeurs - valeurs[0]) / NANOSECONDES_PAR_JOUR
+            jours -= np.average(jours, weights=poids)
+            self.couts, self.debuts = segmentations_optimales(jours, poids.astype(np.float64), self.nombre_max_classes)
+        else:
+            self.couts, self.debuts = np.zeros((1, 1)), np.zeros((1, 1), dtype=np.int64)
+        self.nombre_valeurs = len(valeurs)
+
+    # Fonction pour obtenir l'inertie optimale (en jours²) de chaque nombre de classes, de 1 à nombre_max_classes
+    def inerties(self):
+        return self.couts[:, -1]
+
+    # Fonction pour choisir le nombre de classes au coude de la courbe d'inertie : le point le plus éloigné de la droite
+    # joignant l'inertie d'une classe à celle du nombre maximal de classes (courbes normalisées)
+    def coude(self):
+        inerties = self.inerties()
+        if self.nombre_max_classes <= 2 or inerties[0] <= inerties[-1]:
+            return self.nombre_max_classes if inerties[0] > inerties[-1] else 1
+        abscisses = np.linspace(0, 1, self.nombre_max_classes)
+        ordonnees = (inerties - inerties[-1]) / (inerties[0] - inerties[-1])
+        return int(np.argmax(1 - abscisses - ordonnees)) + 1
+
+    # Fonction pour obtenir la classe de chaque date pour un nombre de classes (remontée de la programmation dynamique)
+    def classes(self, nombre_classes):
+        nombre_classes = min(max(int(nombre_classes), 1), self.nombre_max_classes)
+        classes_valeurs = np.empty(self.nombre_valeurs, dtype=np.int64)
+        fin = self.nombre_valeurs - 1
+        for classe in range(nombre_classes - 1, -1, -1):
+            debut = self.debuts[classe, fin] if classe > 0 and fin >= 0 else 0
+            classes_valeurs[debut:fin + 1] = classe
+            fin = debut - 1
+        classes = np.full(len(self.valides), -1, dtype=np.int64)
+        classes[self.valides] = classes_valeurs[self.inverses]
+        return classes
@@ -6,6 +6,12 @@ from streamlit_option_menu import option_menu
 from datetime import timedelta
 from PIL import Image
 import os
+from chargement import charger_export
+from pretraitement import pretraiter_donnees_vectorise
+from affichage import charger_fichiers_en_parallele
+from agregats import EnsemblesRegroupement
+from flux import agreger_flux
+from cache_memoire import cache_par_empreinte
 
 # Configurer le thème Streamlit
 st.set_page_config(layout="wide")
@@ -62,50 +68,24 @@ def style_entete():
         </div>
         """, unsafe_allow_html=True)
 
-# Fonction pour charger les données depuis un fichier
-@st.cache_data
+# Fonction pour charger les données depuis un fichier (mis en cache selon l'empreinte du contenu)
+@cache_par_empreinte
 def charger_donnees(chemin_fichier):
-    spec_types = {
-        'Date dépôt GED': str,
-        'TYPE DE DOCUMENT': str,
-        'PROJET': str,
-        'EMET': str,
-        'LOT': str,
-        'INDICE': str,
-        'Libellé du document': str
-    }
-    donnees = pd.read_csv(chemin_fichier, encoding='iso-8859-1', sep=';', dtype=spec_types, low_memory=False)
-    donnees['Date dépôt GED'] = pd.to_datetime(donnees['Date dépôt GED'], format='%d/%m/%Y', errors='coerce')
-    return donnees
+    return charger_export(chemin_fichier, categoriser=False)
 
 # Fonction pour charger les données depuis un fichier téléchargé
-@st.cache_data
 def charger_donnees_uploaded(file):
     return charger_donnees(file)
 
 # Fonction pour prétraiter les données
-@st.cache_data
+@cache_par_empreinte
 def pretraiter_donnees(donnees):
-    donnees = donnees.sort_values(by=['TYPE DE DOCUMENT', 'Date dépôt GED'])
-    group = donnees.groupby(['TYPE DE DOCUMENT', 'LOT', 'Libellé du document'])
-    donnees['Date première version'] = group['Date dépôt GED'].transform('min')
-    donnees['Date dernière version'] = group['Date dépôt GED'].transform('max')
-    donnees['Différence en jours'] = (donnees['Date dernière version'] - donnees['Date première version']).dt.days
-    donnees['Nombre d\'indices'] = group['INDICE'].transform('nunique')
-    
-    # Remplir les valeurs manquantes avant la transformation
-    donnees['INDICE'] = donnees['INDICE'].fillna('')
-    donnees['Indices utilisés'] = group['INDICE'].transform(lambda x: ', '.join(sorted(set(x))))
+    return pretraiter_donnees_vectorise(donnees)
 
-    # Ajouter les colonnes Date début et Date fin pour chaque LOT
-    donnees['Date début'] = donnees.groupby('LOT')['Date dépôt GED'].transform('min')
-    donnees['Date fin'] = donnees.groupby('LOT')['Date dépôt GED'].transform('max')
-    
-    # Calculer les durées entre chaque version pour chaque document
-    donnees = donnees.sort_values(by=['Libellé du document', 'Date dépôt GED'])
-    donnees['Durée entre versions'] = donnees.groupby('Libellé du document')['Date dépôt GED'].diff().dt.days
-
-    return donnees
+# Fonction pour agréger les flux du diagramme de Sankey (par projet et nombre de valeurs affichées)
+@cache_par_empreinte
+def calculer_flux(donnees, nombre_max_noeuds):
+    return agreger_flux(donnees, nombre_max_noeuds=nombre_max_noeuds)
 
 # Fonction pour afficher le menu latéral
 def afficher_menu():
@@ -123,11 +103,7 @@ def afficher_menu():
 # Fonction pour gérer le téléchargement de fichiers
 def gerer_telechargement():
     uploaded_files = st.file_uploader("Téléchargez vos fichiers CSV", type=["csv"], accept_multiple_files=True)
-    projets = {}
-    if uploaded_files:
-        for uploaded_file in uploaded_files:
-            projets[uploaded_file.name] = charger_donnees_uploaded(uploaded_file)
-    return projets
+    return charger_fichiers_en_parallele(uploaded_files, charger_donnees_uploaded)
 
 # Fonction pour synchroniser les filtres entre les onglets
 def synchroniser_filtres(projets):
@@ -138,18 +114,24 @@ def synchroniser_filtres(projets):
     return projets[projet_selectionne], projet_selectionne
 
 # Fonction pour calculer les statistiques descriptives et le résumé
-def calculer_statistiques_descriptives(donnees):
+def calculer_statistiques_descriptives(regroupements):
+    # Mesures par type de document, lues dans les ensembles de regroupement de l'onglet
+    par_type = regroupements.agreger(['TYPE DE DOCUMENT'], {
+        'Libellé du document': 'count',
+        'Nombre d\'indices': 'mean',
+        'Durée entre versions': 'mean'
+    }).set_index('TYPE DE DOCUMENT')
     # Nombre total de documents
-    total_documents = len(donnees)
+    total_documents = regroupements.lignes
     
     # Nombre moyen d'indices par type de document
-    moyennes_indices = donnees.groupby('TYPE DE DOCUMENT')['Nombre d\'indices'].mean()
+    moyennes_indices = par_type['Nombre d\'indices']
     
     # Durée moyenne entre versions de documents par type de document
-    duree_moyenne_versions = donnees.groupby('TYPE DE DOCUMENT')['Durée entre versions'].mean()
+    duree_moyenne_versions = par_type['Durée entre versions']
 
     # Résumé des trois variables
-    stats_nombre_documents = donnees.groupby('TYPE DE DOCUMENT')['Libellé du document'].count().describe()
+    stats_nombre_documents = par_type['Libellé du document'].describe()
     stats_moyenne_indices = moyennes_indices.describe()
     stats_duree_versions = duree_moyenne_versions.describe()
 
@@ -168,37 +150,33 @@ def calculer_statistiques_descriptives(donnees):
     st.dataframe(duree_moyenne_versions.reset_index())
 
 # Fonction pour visualiser les tendances de révision
-def visualiser_tendances_revision(donnees):
+def visualiser_tendances_revision(regroupements):
     st.header("Visualisation des tendances de révision")
     
     # Tendances de révision par type de document
-    donnees_groupees = donnees.groupby([donnees['Date dépôt GED'].dt.to_period("M"), 'TYPE DE DOCUMENT']).size().reset_index(name='Nombre de documents')
-    donnees_groupees['Date dépôt GED'] = donnees_groupees['Date dépôt GED'].dt.to_timestamp()
+    donnees_groupees = regroupements.agreger(['Mois', 'TYPE DE DOCUMENT']).rename(columns={'Mois': 'Date dépôt GED'})
 
     fig = px.line(donnees_groupees, x='Date dépôt GED', y='Nombre de documents', color='TYPE DE DOCUMENT',
                   title="Tendances de révision par Type de Document")
     st.plotly_chart(fig, use_container_width=True)
 
     # Tendances de révision par lot de projet
-    donnees_groupees_lot = donnees.groupby([donnees['Date dépôt GED'].dt.to_period("M"), 'LOT']).size().reset_index(name='Nombre de documents')
-    donnees_groupees_lot['Date dépôt GED'] = donnees_groupees_lot['Date dépôt GED'].dt.to_timestamp()
+    donnees_groupees_lot = regroupements.agreger(['Mois', 'LOT']).rename(columns={'Mois': 'Date dépôt GED'})
 
     fig2 = px.line(donnees_groupees_lot, x='Date dépôt GED', y='Nombre de documents', color='LOT',
                   title="Tendances de révision par Lot de Projet")
     st.plotly_chart(fig2, use_container_width=True)
 
 # Fonction pour identifier les corrélations entre les variables
-def identifier_correlations(donnees):
+def identifier_correlations(regroupements):
     st.header("Identification des Corrélations")
 
     # Calcul des statistiques nécessaires
-    stats_corr = donnees.groupby('TYPE DE DOCUMENT').agg({
-        'Libellé du document': 'count',
-        'Nombre d\'indices': 'mean',
-        'Durée entre versions': 'mean'
-    }).rename(columns={'Libellé du document': 'Nombre de documents',
-                       'Nombre d\'indices': 'Moyenne des indices',
-                       'Durée entre versions': 'Durée moyenne entre versions'})
+    stats_corr = regroupements.agreger(['TYPE DE DOCUMENT'], {
+        'Nombre de documents': ('Libellé du document', 'count'),
+        'Moyenne des indices': ('Nombre d\'indices', 'mean'),
+        'Durée moyenne entre versions': ('Durée entre versions', 'mean')
+    }).set_index('TYPE DE DOCUMENT')
     
     # Calcul de la matrice de corrélation
     correlation_matrix = stats_corr.corr()
@@ -214,26 +192,18 @@ def identifier_correlations(donnees):
 # Fonction pour afficher les graphiques selon l'onglet sélectionné
 def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
     if selectionne == "Analyse Exploratoire":
-        calculer_statistiques_descriptives(donnees)
-        visualiser_tendances_revision(donnees)
-        identifier_correlations(donnees)
+        # Regroupements de l'onglet (par type, par mois et type, par mois et lot) lus dans un seul passage sur les lignes
+        regroupements = EnsemblesRegroupement(donnees)
+        calculer_statistiques_descriptives(regroupements)
+        visualiser_tendances_revision(regroupements)
+        identifier_correlations(regroupements)
     elif selectionne == "Flux des documents":
         st.header("Flux des documents")
-        total_par_indice = donnees['INDICE'].value_counts(normalize=True) * 100
-        total_par_indice = total_par_indice.reset_index()
-        total_par_indice.columns = ['INDICE', 'Pourcentage']
-        etiquettes_indices_avec_pourcentage = total_par_indice.apply(lambda row: f"{row['INDICE']} ({row['Pourcentage']:.2f}%)", axis=1)
-        map_pourcentage_indice = dict(zip(total_par_indice['INDICE'], etiquettes_indices_avec_pourcentage))
-        donnees['INDICE'] = donnees['INDICE'].map(map_pourcentage_indice)
-        tous_les_noeuds = pd.concat([donnees['PROJET'], donnees['EMET'], donnees['TYPE DE DOCUMENT'], donnees['INDICE']]).unique()
-        tous_les_noeuds = pd.Series(index=tous_les_noeuds, data=range(len(tous_les_noeuds)))
-        source = tous_les_noeuds[donnees['PROJET']].tolist() + tous_les_noeuds[donnees['EMET']].tolist() + tous_les_noeuds[donnees['TYPE DE DOCUMENT']].tolist()
-        cible = tous_les_noeuds[donnees['EMET']].tolist() + tous_les_noeuds[donnees['TYPE DE DOCUMENT']].tolist() + tous_les_noeuds[donnees['INDICE']].tolist()
-        valeur = [1] * len(donnees['PROJET']) + [1] * len(donnees['EMET']) + [1] * len(donnees['TYPE DE DOCUMENT'])
-        etiquettes_noeuds = tous_les_noeuds.index.tolist()
+        nombre_max_noeuds = st.slider('Nombre maximum de valeurs par étape (les autres sont regroupées dans « Autres »)', min_value=5, max_value=100, value=30, key='flux_nombre_max_noeuds')
+        flux = calculer_flux(donnees, nombre_max_noeuds)
         fig = go.Figure(data=[go.Sankey(
-            node=dict(pad=15, thickness=20, line=dict(color='black', width=0.5), label=etiquettes_noeuds),
-            link=dict(source=source, target=cible, value=valeur)
+            node=dict(pad=15, thickness=20, line=dict(color='black', width=0.5), label=flux['etiquettes']),
+            link=dict(source=flux['source'], target=flux['cible'], value=flux['valeur'])
         )])
         fig.add_annotation(x=0.1, y=1.1, text="Projet", showarrow=False, font=dict(size=12, color="blue"))
         fig.add_annotation(x=0.35, y=1.1, text="Émetteur", showarrow=False, font=dict(size=12, color="blue"))
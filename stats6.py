@@ -5,6 +5,11 @@ import plotly.graph_objects as go
 from PIL import Image
 import os
 from streamlit_option_menu import option_menu
+from chargement import charger_export
+from pretraitement import pretraiter_donnees_vectorise
+from affichage import charger_fichiers_en_parallele
+from agregats import EnsemblesRegroupement
+from cache_memoire import cache_par_empreinte
 
 # Configurer le thème Streamlit
 st.set_page_config(layout="wide")
@@ -61,50 +66,19 @@ def style_entete():
         </div>
         """, unsafe_allow_html=True)
 
-# Fonction pour charger les données depuis un fichier
-@st.cache_data
+# Fonction pour charger les données depuis un fichier (mis en cache selon l'empreinte du contenu)
+@cache_par_empreinte
 def charger_donnees(chemin_fichier):
-    spec_types = {
-        'Date dépôt GED': str,
-        'TYPE DE DOCUMENT': str,
-        'PROJET': str,
-        'EMET': str,
-        'LOT': str,
-        'INDICE': str,
-        'Libellé du document': str
-    }
-    donnees = pd.read_csv(chemin_fichier, encoding='iso-8859-1', sep=';', dtype=spec_types, low_memory=False)
-    donnees['Date dépôt GED'] = pd.to_datetime(donnees['Date dépôt GED'], format='%d/%m/%Y', errors='coerce')
-    return donnees
+    return charger_export(chemin_fichier, categoriser=False)
 
 # Fonction pour charger les données depuis un fichier téléchargé
-@st.cache_data
 def charger_donnees_uploaded(file):
     return charger_donnees(file)
 
 # Fonction pour prétraiter les données
-@st.cache_data
+@cache_par_empreinte
 def pretraiter_donnees(donnees):
-    donnees = donnees.sort_values(by=['TYPE DE DOCUMENT', 'Date dépôt GED'])
-    group = donnees.groupby(['TYPE DE DOCUMENT', 'LOT', 'Libellé du document'])
-    donnees['Date première version'] = group['Date dépôt GED'].transform('min')
-    donnees['Date dernière version'] = group['Date dépôt GED'].transform('max')
-    donnees['Différence en jours'] = (donnees['Date dernière version'] - donnees['Date première version']).dt.days
-    donnees['Nombre d\'indices'] = group['INDICE'].transform('nunique')
-    
-    # Remplir les valeurs manquantes avant la transformation
-    donnees['INDICE'] = donnees['INDICE'].fillna('')
-    donnees['Indices utilisés'] = group['INDICE'].transform(lambda x: ', '.join(sorted(set(x))))
-
-    # Ajouter les colonnes Date début et Date fin pour chaque LOT
-    donnees['Date début'] = donnees.groupby('LOT')['Date dépôt GED'].transform('min')
-    donnees['Date fin'] = donnees.groupby('LOT')['Date dépôt GED'].transform('max')
-    
-    # Calculer les durées entre chaque version pour chaque document
-    donnees = donnees.sort_values(by=['Libellé du document', 'Date dépôt GED'])
-    donnees['Durée entre versions'] = donnees.groupby('Libellé du document')['Date dépôt GED'].diff().dt.days
-
-    return donnees
+    return pretraiter_donnees_vectorise(donnees)
 
 # Fonction pour afficher le menu latéral
 def afficher_menu():
@@ -122,11 +96,7 @@ def afficher_menu():
 # Fonction pour gérer le téléchargement de fichiers
 def gerer_telechargement():
     uploaded_files = st.file_uploader("Téléchargez vos fichiers CSV", type=["csv"], accept_multiple_files=True)
-    projets = {}
-    if uploaded_files:
-        for uploaded_file in uploaded_files:
-            projets[uploaded_file.name] = charger_donnees_uploaded(uploaded_file)
-    return projets
+    return charger_fichiers_en_parallele(uploaded_files, charger_donnees_uploaded)
 
 # Fonction pour synchroniser les filtres entre les onglets
 def synchroniser_filtres(projets):
@@ -137,17 +107,23 @@ def synchroniser_filtres(projets):
     return projets[projet_selectionne], projet_selectionne
 
 # Fonction pour calculer les statistiques descriptives et corrélations
-def calculer_statistiques_et_correls(donnees):
+def calculer_statistiques_et_correls(regroupements):
+    # Mesures par type de document, lues dans les ensembles de regroupement de l'onglet
+    par_type = regroupements.agreger(['TYPE DE DOCUMENT'], {
+        'Libellé du document': 'count',
+        'Nombre d\'indices': 'mean',
+        'Durée entre versions': 'mean'
+    }).set_index('TYPE DE DOCUMENT')
     st.header("Statistiques Descriptives et Corrélations")
 
     # Calcul du nombre de documents par type de document
-    stats_nombre_documents = donnees.groupby('TYPE DE DOCUMENT')['Libellé du document'].count()
+    stats_nombre_documents = par_type['Libellé du document']
 
     # Calcul de la moyenne des indices par type de document
-    moyennes_indices = donnees.groupby('TYPE DE DOCUMENT')['Nombre d\'indices'].mean()
+    moyennes_indices = par_type['Nombre d\'indices']
 
     # Calcul de la durée moyenne entre les versions par type de document
-    duree_moyenne_versions = donnees.groupby('TYPE DE DOCUMENT')['Durée entre versions'].mean()
+    duree_moyenne_versions = par_type['Durée entre versions']
 
     # Ajout du calcul de l'écart-type
     ecart_type_documents = stats_nombre_documents.std()
@@ -185,20 +161,18 @@ def calculer_statistiques_et_correls(donnees):
     st.plotly_chart(fig, use_container_width=True)
 
 # Fonction pour visualiser les tendances de révision
-def visualiser_tendances_revision(donnees):
+def visualiser_tendances_revision(regroupements):
     st.header("Visualisation des tendances de révision")
     
     # Tendances de révision par type de document
-    donnees_groupees = donnees.groupby([donnees['Date dépôt GED'].dt.to_period("M"), 'TYPE DE DOCUMENT']).size().reset_index(name='Nombre de documents')
-    donnees_groupees['Date dépôt GED'] = donnees_groupees['Date dépôt GED'].dt.to_timestamp()
+    donnees_groupees = regroupements.agreger(['Mois', 'TYPE DE DOCUMENT']).rename(columns={'Mois': 'Date dépôt GED'})
 
     fig = px.line(donnees_groupees, x='Date dépôt GED', y='Nombre de documents', color='TYPE DE DOCUMENT',
                   title="Tendances de révision par Type de Document")
     st.plotly_chart(fig, use_container_width=True)
 
     # Tendances de révision par lot de projet
-    donnees_groupees_lot = donnees.groupby([donnees['Date dépôt GED'].dt.to_period("M"), 'LOT']).size().reset_index(name='Nombre de documents')
-    donnees_groupees_lot['Date dépôt GED'] = donnees_groupees_lot['Date dépôt GED'].dt.to_timestamp()
+    donnees_groupees_lot = regroupements.agreger(['Mois', 'LOT']).rename(columns={'Mois': 'Date dépôt GED'})
 
     fig2 = px.line(donnees_groupees_lot, x='Date dépôt GED', y='Nombre de documents', color='LOT',
                   title="Tendances de révision par Lot de Projet")
@@ -207,8 +181,10 @@ def visualiser_tendances_revision(donnees):
 # Fonction pour afficher les graphiques selon l'onglet sélectionné
 def afficher_graphique(selectionne, donnees, projets, projet_selectionne):
     if selectionne == "Analyse Exploratoire":
-        calculer_statistiques_et_correls(donnees)
-        visualiser_tendances_revision(donnees)
+        # Regroupements de l'onglet (par type, par mois et type, par mois et lot) lus dans un seul passage sur les lignes
+        regroupements = EnsemblesRegroupement(donnees)
+        calculer_statistiques_et_correls(regroupements)
+        visualiser_tendances_revision(regroupements)
     # Les autres onglets restent inchangés et peuvent être ajoutés ici...
 
 # Exécution principale de l'application
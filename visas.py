@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from chargement import COLONNES_TABLEAU_DE_BORD, colonnes_chargees, lire_entete, lire_octets, parser_dates_jjmmaaaa
+
+# Préfixe commun aux blocs de visa : chaque colonne 'Date demande visa<intervenant>' ouvre un bloc
+PREFIXE_DEMANDE = 'Date demande visa'
+
+# Préfixes des colonnes d'un bloc de visa et nom du champ correspondant dans le format long
+PREFIXES_VISA = {
+    'Date demande visa': 'Date demande',
+    'Visa prévu': 'Date prévue',
+    'Date visa': 'Date visa',
+    'Visa': 'Statut',
+    'Retard visa': 'Retard'
+}
+CHAMPS_DATE = ['Date demande', 'Date prévue', 'Date visa']
+
+# Colonnes du document reprises dans le format long
+COLONNES_DOCUMENT = ['Libellé du document', 'INDICE', 'LOT', 'TYPE DE DOCUMENT']
+
+# États d'un visa selon sa réponse et son échéance
+ETATS_VISA = ['Répondu', 'En attente', 'En retard']
+
+# Fonction pour détecter les blocs de visa d'un export : {intervenant: {champ: colonne}}
+def detecter_blocs_visa(colonnes):
+    presentes = set(colonnes)
+    blocs = {}
+    for colonne in colonnes:
+        if colonne.startswith(PREFIXE_DEMANDE):
+            intervenant = colonne[len(PREFIXE_DEMANDE):]
+            blocs[intervenant] = {
+                champ: prefixe + intervenant
+                for prefixe, champ in PREFIXES_VISA.items()
+                if prefixe + intervenant in presentes
+            }
+    return blocs
+
+# Fonction pour lister les colonnes de visa utiles d'un export
+def colonnes_visa(colonnes):
+    return [colonne for bloc in detecter_blocs_visa(colonnes).values() for colonne in bloc.values()]
+
+# Fonction pour obtenir les colonnes du tableau de bord complétées des colonnes de visa d'un export
+def colonnes_avec_visas(source, colonnes=COLONNES_TABLEAU_DE_BORD):
+    return list(colonnes) + colonnes_visa(lire_entete(lire_octets(source)))
+
+# Fonction pour lire une colonne de visa (vide si elle a été supprimée au compactage faute de valeurs)
+def valeurs_colonne(donnees, colonne):
+    if colonne is None or colonne not in donnees.columns:
+        return np.full(len(donnees), None, dtype=object)
+    return donnees[colonne].to_numpy(dtype=object)
+
+# Fonction pour extraire un champ de tous les blocs aux positions (ligne, intervenant) retenues
+def extraire_champ(donnees, blocs, champ, lignes, codes_intervenant):
+    matrice = np.column_stack([valeurs_colonne(donnees, bloc.get(champ)) for bloc in blocs.values()])
+    return matrice[lignes, codes_intervenant]
+
+# Fonction pour convertir des valeurs répétitives en ne traitant qu'une fois chaque valeur distincte
+def convertir_par_valeur(valeurs, conversion):
+    codes, uniques = pd.factorize(valeurs)
+    uniques = np.asarray(uniques, dtype=object)
+    uniques[uniques == ''] = None
+    converties = pd.Series(conversion(pd.Series(np.append(uniques, None))))
+    return converties.take(np.where(codes >= 0, codes, len(uniques))).reset_index(drop=True)
+
+# Fonction pour séparer les statuts de visa des compteurs de jours affichés tant que le visa est en attente
+def statuts_visa(valeurs):
+    compteurs = pd.to_numeric(valeurs, errors='coerce').notna()
+    return valeurs.where(~compteurs).astype(object)
+
+# Fonction pour transformer les blocs de visa en une table longue (une ligne par document et intervenant sollicité)
+def visas_format_long(donnees, colonnes_document=COLONNES_DOCUMENT):
+    blocs = detecter_blocs_visa(colonnes_chargees(donnees))
+    colonnes_document = [colonne for colonne in colonnes_document if colonne in donnees.columns]
+    if not blocs:
+        return pd.DataFrame(columns=['Ligne'] + colonnes_document + ['Intervenant'] + list(PREFIXES_VISA.values()) + ['Délai de réponse (jours)'])
+
+    # Seules les cellules où un visa a été demandé sont conservées
+    demandes = np.column_stack([valeurs_colonne(donnees, bloc['Date demande']) for bloc in blocs.values()])
+    lignes, codes_intervenant = np.nonzero(pd.notna(demandes) & (demandes != ''))
+
+    long = donnees[colonnes_document].take(lignes).reset_index(drop=True)
+    long.insert(0, 'Ligne', donnees.index.to_numpy()[lignes])
+    long['Intervenant'] = pd.Categorical.from_codes(codes_intervenant, categories=list(blocs))
+    for champ in CHAMPS_DATE:
+        long[champ] = convertir_par_valeur(extraire_champ(donnees, blocs, champ, lignes, codes_intervenant), parser_dates_jjmmaaaa)
+    statuts = convertir_par_valeur(extraire_champ(donnees, blocs, 'Statut', lignes, codes_intervenant), statuts_visa)
+    long['Statut'] = statuts.astype('category')
+    retards = convertir_par_valeur(extraire_champ(donnees, blocs, 'Retard', lignes, codes_intervenant), lambda valeurs: pd.to_numeric(valeurs, errors='coerce'))
+    long['Retard'] = retards.astype(np.float64)
+    long['Délai de réponse (jours)'] = (long['Date visa'] - long['Date demande']).dt.days
+    return long
+
+# Fonction pour déterminer la date de référence des échéances (par défaut, la dernière date connue de l'export)
+def date_reference_visas(long, date_reference=None):
+    if date_reference is not None:
+        return pd.Timestamp(date_reference)
+    return pd.concat([long['Date demande'], long['Date visa']]).max()
+
+# Fonction pour déterminer l'état de chaque visa (répondu, en attente ou en retard)
+def etats_visas(long, date_reference=None):
+    date_reference = date_reference_visas(long, date_reference)
+    repondus = long['Date visa'].notna().to_numpy()
+    echus = (long['Date prévue'] < date_reference).to_numpy()
+    codes = np.where(repondus, 0, np.where(echus, 2, 1))
+    return pd.Series(pd.Categorical.from_codes(codes, categories=ETATS_VISA), index=long.index, name='État')
+
+# Fonction pour calculer les délais de réponse et les retards par intervenant
+def statistiques_visas(long, date_reference=None):
+    etats = etats_visas(long, date_reference)
+    indicateurs = pd.DataFrame({
+        'Intervenant': long['Intervenant'],
+        'Demandes': 1,
+        'Répondus': etats == 'Répondu',
+        'En attente': etats == 'En attente',
+        'En retard': etats == 'En retard',
+        'Répondus hors délai': (long['Date visa'] > long['Date prévue']),
+        'Délai de réponse (jours)': long['Délai de réponse (jours)']
+    })
+    statistiques = indicateurs.groupby('Intervenant', observed=True).agg(
+        **{
+            'Demandes': ('Demandes', 'sum'),
+            'Répondus': ('Répondus', 'sum'),
+            'En attente': ('En attente', 'sum'),
+            'En retard': ('En retard', 'sum'),
+            'Répondus hors délai': ('Répondus hors délai', 'sum'),
+            'Délai moyen (jours)': ('Délai de réponse (jours)', 'mean'),
+            'Délai médian (jours)': ('Délai de réponse (jours)', 'median')
+        }
+    )
+    statistiques['Taux de réponse (%)'] = statistiques['Répondus'] / statistiques['Demandes'] * 100
+    return statistiques.reset_index()
+
+# Fonction pour calculer la répartition des statuts de visa par intervenant
+def repartition_statuts(long):
+    return long.groupby(['Intervenant', 'Statut'], observed=True).size().unstack(fill_value=0)